@@ -0,0 +1,145 @@
+"""Benchmark do pipeline com dados sinteticos.
+
+Uso: python -m benchmarks.bench_pipeline [--scales 2x1000,50x2500]
+     [--portfolios N] [--output resultado.json] [--compare base.json]
+
+Mede DataService.load (reader fake), CDataFramesJoined.join e calculate
+em cada escala (tickers x dias) e grava um JSON com tempo, throughput e
+pico de memoria (tracemalloc) para comparar entre commits.
+"""
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+import click
+from core.cdataframe import CDataFramesJoined
+from core.data_service import DataService, DataServiceParams
+from core.markowitz import calculate
+from core.synthetic import synthetic_yahoo_frame
+
+DEFAULT_SCALES = "2x1000,10x1000,50x2500,100x2500,500x5000"
+
+
+def parse_scales(scales):
+    return [tuple(int(value) for value in scale.split("x"))
+            for scale in scales.split(",")]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, track_memory):
+    # tempo sem tracemalloc; pico de memoria numa segunda execucao
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def stage_result(name, elapsed, peak, items, unit):
+    return {
+        "stage": name,
+        "seconds": elapsed,
+        "throughput": items / elapsed if elapsed else None,
+        "throughput_unit": unit,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_scale(num_tickers, num_days, num_portfolios, track_memory):
+    frame = synthetic_yahoo_frame(num_tickers, num_days)
+    tickers = list(frame["Close"].columns)
+
+    def load():
+        params = DataServiceParams(tickers=tickers, start_date=date.today())
+        data_service = DataService(params=params)
+        data_service.build_callbacks(data_reader_func=lambda t, s: frame)
+        data_service.load()
+        return data_service.cdataframes
+
+    cdataframes, load_seconds, load_peak = measure(load, track_memory)
+    joined, join_seconds, join_peak = measure(
+        lambda: CDataFramesJoined(cdataframes).join(), track_memory
+    )
+
+    def run_calculate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return calculate(joined, tickers, num_portfolios=num_portfolios,
+                             seed=0, plot=False)
+
+    _, calc_seconds, calc_peak = measure(run_calculate, track_memory)
+    cells = num_tickers * num_days
+    return {
+        "tickers": num_tickers,
+        "days": num_days,
+        "portfolios": num_portfolios,
+        "stages": [
+            stage_result("load", load_seconds, load_peak, cells, "cells/s"),
+            stage_result("join", join_seconds, join_peak, cells, "cells/s"),
+            stage_result("calculate", calc_seconds, calc_peak,
+                         num_portfolios, "portfolios/s"),
+        ],
+    }
+
+
+def compare(current, baseline):
+    def key(run, stage):
+        return (run["tickers"], run["days"], stage["stage"])
+
+    previous = {key(run, stage): stage["seconds"]
+                for run in baseline["runs"] for stage in run["stages"]}
+    for run in current["runs"]:
+        for stage in run["stages"]:
+            before = previous.get(key(run, stage))
+            if before:
+                print(f"{run['tickers']}x{run['days']} {stage['stage']}: "
+                      f"{before:.4f}s -> {stage['seconds']:.4f}s "
+                      f"({before / stage['seconds']:.2f}x)")
+
+
+@click.command()
+@click.option("--scales", "scales", default=DEFAULT_SCALES,
+              help="lista de TICKERSxDIAS separada por virgula")
+@click.option("--portfolios", "num_portfolios", default=25000, type=int)
+@click.option("--no-memory", "no_memory", is_flag=True, default=False)
+@click.option("--output", "output", default=None)
+@click.option("--compare", "baseline_file", default=None)
+def main(scales, num_portfolios, no_memory, output, baseline_file):
+    results = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "runs": [bench_scale(num_tickers, num_days, num_portfolios,
+                             not no_memory)
+                 for num_tickers, num_days in parse_scales(scales)],
+    }
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    if baseline_file:
+        with open(baseline_file) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Tempo de import/startup do CLI.
+
+Uso: python -m benchmarks.bench_startup [--repeat N] [--max-seconds S]
+
+Imprime um JSON com a mediana (s) de cada comando; com --max-seconds sai
+com codigo 1 se algum passar do limite.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+import click
+
+COMMANDS = {
+    "cli_help": [sys.executable, "main.py", "--help"],
+    "markowitz_help": [sys.executable, "main.py", "markowitz", "--help"],
+    "import_main": [sys.executable, "-c", "import main"],
+    "import_markowitz": [sys.executable, "-c", "import core.markowitz"],
+    "import_data_service": [sys.executable, "-c",
+                            "import core.data_service"],
+}
+
+
+def measure(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+@click.command()
+@click.option("--repeat", "repeat", default=5, type=int)
+@click.option("--max-seconds", "max_seconds", default=None, type=float)
+def main(repeat, max_seconds):
+    results = {name: measure(command, repeat)
+               for name, command in COMMANDS.items()}
+    print(json.dumps({"benchmark": "startup", "repeat": repeat,
+                      "median_seconds": results}, indent=2))
+    if max_seconds is not None and max(results.values()) > max_seconds:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
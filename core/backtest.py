@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from core.cdataframe import TRADING_DAYS
+from core.instrumentation import Profiler
+from core.markowitz import load_close_prices
+from core.optimizer import max_sharpe_weights, min_variance_weights
+from core.stats_index import RollingStats, returns_matrix
+
+DEFAULT_LOOKBACK = 252
+FREQUENCIES = {"weekly": "W", "monthly": "M", "quarterly": "Q"}
+OBJECTIVES = {
+    "max_sharpe": lambda mean, cov, previous: max_sharpe_weights(
+        mean, cov, initial_weights=previous),
+    "min_vol": lambda mean, cov, previous: min_variance_weights(
+        cov, initial_weights=previous),
+}
+
+
+@dataclass
+class BacktestResult:
+    returns: pd.Series
+    equity: pd.Series
+    weights: pd.DataFrame
+    turnover: pd.Series
+
+    def summary(self, periods=TRADING_DAYS):
+        total = self.equity.iloc[-1] - 1.0
+        years = len(self.returns) / periods
+        annual_return = (1.0 + total) ** (1.0 / years) - 1.0
+        annual_stdev = self.returns.std() * np.sqrt(periods)
+        return {
+            "total_return": total,
+            "annual_return": annual_return,
+            "annual_stdev": annual_stdev,
+            "sharpe": annual_return / annual_stdev if annual_stdev else np.nan,
+            "rebalances": len(self.weights),
+            "mean_turnover": self.turnover.mean(),
+        }
+
+    def to_frame(self):
+        frame = pd.DataFrame({"return": self.returns, "equity": self.equity})
+        frame["turnover"] = self.turnover.reindex(frame.index)
+        return frame
+
+
+def rebalance_positions(index, frequency="monthly"):
+    """Posicoes do primeiro pregao de cada periodo (semana/mes/trimestre)."""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequencia desconhecida: {frequency}")
+    periods = pd.DatetimeIndex(index).to_period(FREQUENCIES[frequency])
+    codes = periods.asi8
+    return np.flatnonzero(np.diff(codes) != 0) + 1
+
+
+def walk_forward(close_prices_df, lookback=DEFAULT_LOOKBACK,
+                 frequency="monthly", objective="max_sharpe",
+                 profiler=None):
+    """Backtest walk-forward: reotimiza por periodo e segura fora da amostra.
+
+    Em cada data de rebalanceamento os pesos saem do otimizador com os
+    `lookback` retornos anteriores (sem olhar o dia corrente) e ficam
+    parados ate o proximo rebalanceamento (buy and hold, os pesos derivam
+    com os precos). As somas da janela sao atualizadas so com as linhas
+    que entram e saem. `turnover` e sum(|w_novo - w_derivado|) em cada
+    rebalanceamento (1.0 na primeira alocacao).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objetivo desconhecido: {objective}")
+    optimize = OBJECTIVES[objective]
+    profiler = profiler or Profiler()
+    returns_df = returns_matrix(close_prices_df)
+    returns = returns_df.to_numpy(dtype=np.float64)
+    positions = rebalance_positions(returns_df.index, frequency)
+    positions = positions[positions >= lookback]
+    if len(positions) == 0:
+        raise ValueError("historico curto demais para o lookback pedido")
+    stops = np.append(positions[1:], len(returns))
+
+    num_stocks = returns.shape[1]
+    window = RollingStats(returns)
+    portfolio_returns = np.empty(len(returns) - positions[0])
+    all_weights = np.empty((len(positions), num_stocks))
+    turnover = np.empty(len(positions))
+    drifted = np.zeros(num_stocks)
+    previous = None
+    with profiler.stage("backtest", rebalances=len(positions),
+                        tickers=num_stocks, rows=len(returns)):
+        for k, (start, stop) in enumerate(zip(positions, stops)):
+            mean, cov = window.move(start - lookback, start).stats()
+            weights = optimize(mean, cov, previous)
+            all_weights[k] = previous = weights
+            turnover[k] = np.abs(weights - drifted).sum()
+
+            # buy and hold ate o proximo rebalanceamento
+            growth = np.cumprod(1.0 + returns[start:stop], axis=0)
+            values = growth @ weights
+            period_returns = np.diff(values, prepend=1.0)
+            period_returns[1:] /= values[:-1]
+            portfolio_returns[start - positions[0]:stop - positions[0]] = (
+                period_returns)
+            drifted = weights * growth[-1] / values[-1]
+
+    index = returns_df.index[positions[0]:]
+    portfolio_returns = pd.Series(portfolio_returns, index=index,
+                                  name="return")
+    rebalance_dates = returns_df.index[positions]
+    return BacktestResult(
+        returns=portfolio_returns,
+        equity=(1.0 + portfolio_returns).cumprod().rename("equity"),
+        weights=pd.DataFrame(all_weights, index=rebalance_dates,
+                             columns=returns_df.columns),
+        turnover=pd.Series(turnover, index=rebalance_dates,
+                           name="turnover"),
+    )
+
+
+def run_backtest_from_data_service(stocks, start_date=None, cache_dir=None,
+                                   source="yfinance", data_dir=None,
+                                   profiler=None, join_how="inner",
+                                   min_coverage=None, chunk_size=None,
+                                   download_workers=4, **backtest_options):
+    profiler = profiler or Profiler()
+    close_prices_df, _ = load_close_prices(
+        stocks, start_date, cache_dir=cache_dir, source=source,
+        data_dir=data_dir, profiler=profiler, join_how=join_how,
+        min_coverage=min_coverage, chunk_size=chunk_size,
+        download_workers=download_workers,
+    )
+    return walk_forward(close_prices_df, profiler=profiler,
+                        **backtest_options)
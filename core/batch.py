@@ -0,0 +1,166 @@
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import List
+import pandas as pd
+from core.instrumentation import Profiler
+from core.markowitz import load_close_prices, run_method
+
+PORTFOLIOS = ["max_sharpe", "min_vol"]
+
+
+@dataclass
+class Basket:
+    name: str
+    tickers: List[str] = field(default_factory=list)
+
+
+def read_baskets(filename):
+    """Le as cestas de um YAML ou CSV.
+
+    YAML: `{nome: [tickers]}` ou lista de `{name: ..., tickers: [...]}`.
+    CSV: uma cesta por linha, `nome,TICKER1,TICKER2,...`.
+    """
+    if os.path.splitext(filename)[1].lower() in (".yaml", ".yml"):
+        import yaml
+
+        with open(filename) as file:
+            data = yaml.safe_load(file)
+        if isinstance(data, dict):
+            return [Basket(str(name), list(tickers))
+                    for name, tickers in data.items()]
+        return [Basket(str(item["name"]), list(item["tickers"]))
+                for item in data]
+    baskets = []
+    with open(filename, newline="") as file:
+        for row in csv.reader(file):
+            row = [cell.strip() for cell in row if cell.strip()]
+            if not row or row[0].lower() == "name":
+                continue
+            baskets.append(Basket(row[0], row[1:]))
+    return baskets
+
+
+def union_tickers(baskets):
+    return list(dict.fromkeys(
+        ticker for basket in baskets for ticker in basket.tickers
+    ))
+
+
+def optimize_basket(task):
+    # roda em outro processo: recebe so o pedaco (k, k) da covariancia
+    name, mean_daily_returns, cov_matrix, options = task
+    simulation = run_method(options["method"], mean_daily_returns,
+                            cov_matrix, options["num_portfolios"],
+                            seed=options["seed"], stream=True)
+    tickers = list(mean_daily_returns.index)
+    rows = []
+    for portfolio, candidate in zip(PORTFOLIOS, [simulation.max_sharpe,
+                                                 simulation.min_vol]):
+        row = {"basket": name, "portfolio": portfolio,
+               "ret": candidate.ret, "stdev": candidate.stdev,
+               "sharpe": candidate.sharpe}
+        row.update(zip(tickers, candidate.weights))
+        rows.append(row)
+    return rows
+
+
+def inner_rows(close_prices_df, baskets):
+    """Datas em que todos os tickers tem preco (join inner da uniao).
+
+    Avisa as cestas que perdem historico com isso: um ticker listado ha
+    pouco em qualquer cesta encurta todas as outras.
+    """
+    present = close_prices_df.notna()
+    common = present.all(axis=1)
+    for basket in baskets:
+        tickers = [ticker for ticker in basket.tickers
+                   if ticker in present.columns]
+        own = int(present[tickers].all(axis=1).sum()) if tickers else 0
+        if own > common.sum():
+            print(f"aviso: cesta {basket.name}: o join inner da uniao "
+                  f"encurta o historico de {own} para {common.sum()} datas")
+    return close_prices_df[common]
+
+
+def run_batch(close_prices_df, baskets, method="optimizer",
+              num_portfolios=25000, seed=None, workers=None, profiler=None):
+    """Otimiza varias cestas sobre um unico calculo de media/covariancia.
+
+    Cada cesta usa o recorte da media e da covariancia do universo todo;
+    com `workers` as cestas sao repartidas entre processos. Precos podem
+    ter NaN (join outer sem forward-fill): uma cesta com buracos usa so as
+    datas em que todos os seus tickers tem preco, como o `markowitz`
+    rodado so com ela. Devolve uma tabela (cesta, carteira) com ret,
+    stdev, sharpe e os pesos por ticker (NaN para tickers fora da cesta).
+    """
+    profiler = profiler or Profiler()
+    with profiler.stage("returns", rows=len(close_prices_df),
+                        tickers=close_prices_df.shape[1]):
+        returns = close_prices_df.pct_change(fill_method=None).iloc[1:]
+        mean_daily_returns = returns.mean()
+        cov_matrix = returns.cov()
+        complete = close_prices_df.notna()
+
+    options = {"method": method, "num_portfolios": num_portfolios,
+               "seed": seed}
+    tasks = []
+    for basket in baskets:
+        tickers = [ticker for ticker in basket.tickers
+                   if ticker in mean_daily_returns.index]
+        missing = sorted(set(basket.tickers) - set(tickers))
+        if missing:
+            print(f"cesta {basket.name}: sem dados para {missing}")
+        if not tickers:
+            continue
+        present = complete[tickers].all(axis=1)
+        if present.all():
+            mean, cov = (mean_daily_returns[tickers],
+                         cov_matrix.loc[tickers, tickers])
+        else:
+            # retornos sobre as linhas da propria cesta: depois de um
+            # buraco o retorno vem do ultimo preco que a cesta tem
+            basket_returns = close_prices_df.loc[present, tickers] \
+                .pct_change().iloc[1:]
+            mean, cov = basket_returns.mean(), basket_returns.cov()
+        tasks.append((basket.name, mean, cov, options))
+
+    with profiler.stage("batch", baskets=len(tasks), method=method):
+        if workers is None or workers <= 1:
+            results = map(optimize_basket, tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(tasks) // (4 * workers))
+                results = list(executor.map(optimize_basket, tasks,
+                                            chunksize=chunksize))
+        rows = [row for basket_rows in results for row in basket_rows]
+
+    columns = ["basket", "portfolio", "ret", "stdev", "sharpe"]
+    columns += list(close_prices_df.columns)
+    table = pd.DataFrame(rows, columns=columns)
+    return table.set_index(["basket", "portfolio"])
+
+
+def run_batch_from_data_service(baskets, start_date=None, cache_dir=None,
+                                source="yfinance", data_dir=None,
+                                profiler=None, join_how="outer",
+                                min_coverage=None, chunk_size=None,
+                                download_workers=4, **batch_options):
+    """Carrega a uniao das cestas uma vez e roda `run_batch`.
+
+    Carrega sempre com join outer sem forward-fill, entao cada cesta fica
+    com o proprio calendario; `join_how="inner"` corta a uniao inteira nas
+    datas comuns, avisando as cestas que perdem historico.
+    """
+    profiler = profiler or Profiler()
+    close_prices_df, _ = load_close_prices(
+        union_tickers(baskets), start_date, cache_dir=cache_dir,
+        source=source, data_dir=data_dir, profiler=profiler,
+        join_how="outer", min_coverage=min_coverage, chunk_size=chunk_size,
+        download_workers=download_workers, fill=False,
+    )
+    if join_how == "inner":
+        close_prices_df = inner_rows(close_prices_df, baskets)
+    return run_batch(close_prices_df, baskets, profiler=profiler,
+                     **batch_options)
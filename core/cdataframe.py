@@ -1,35 +1,103 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
 from typing import List
 
 DATAFRAME_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+TRADING_DAYS = 252
+
+# timeframes no padrao do MetaTrader e a duracao nominal em minutos
+TIMEFRAMES = {
+    "M1": 1, "M5": 5, "M15": 15, "M30": 30,
+    "H1": 60, "H4": 240,
+    "D1": 24 * 60, "W1": 7 * 24 * 60, "MN1": 30 * 24 * 60,
+}
+DEFAULT_TIMEFRAME = "D1"
+# pregao da B3 (10h as 17h): quantas barras intraday cabem num dia
+SESSION_MINUTES = 7 * 60
+MINUTE_NS = 60 * 10 ** 9
+DAY_NS = 24 * 60 * MINUTE_NS
+
+
+def check_timeframe(timeframe):
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"timeframe desconhecido: {timeframe}")
+    return timeframe
+
+
+def annualization_periods(timeframe=DEFAULT_TIMEFRAME):
+    """Barras por ano para anualizar retorno e volatilidade."""
+    minutes = TIMEFRAMES[check_timeframe(timeframe)]
+    if timeframe == "W1":
+        return 52
+    if timeframe == "MN1":
+        return 12
+    if minutes >= TIMEFRAMES["D1"]:
+        return TRADING_DAYS
+    # barra incompleta no fim do pregao tambem conta (H4: 2 por dia)
+    return TRADING_DAYS * int(np.ceil(SESSION_MINUTES / minutes))
+
+
+def timeframe_keys(time, timeframe):
+    """Abertura da barra de `timeframe` de cada instante (int64 ns).
+
+    Semanas comecam na segunda e meses no dia 1, entao tickers
+    diferentes caem nas mesmas chaves e o join continua alinhado.
+    """
+    time = np.asarray(time, dtype=np.int64)
+    if timeframe == "MN1":
+        months = time.view("datetime64[ns]").astype("datetime64[M]")
+        return months.astype("datetime64[ns]").view(np.int64)
+    if timeframe == "W1":
+        # 1970-01-01 foi quinta: a segunda mais proxima e o dia 4
+        days = time // DAY_NS
+        return ((days - 4) // 7 * 7 + 4) * DAY_NS
+    step = TIMEFRAMES[check_timeframe(timeframe)] * MINUTE_NS
+    return time - time % step
 
 
 class CDataFrame(ABC):
-    def __init__(self, dataframe, info={}):
-        self.__dataframe = dataframe
-        self._info = info
+    __slots__ = ("_frame", "_info", "source")
+
+    def __init__(self, dataframe, info=None):
+        self._frame = dataframe
+        self._info = {} if info is None else info
         self.source = None
         if self.is_valid():
             self.parse()
 
     @property
     def index(self):
-        return self.__dataframe.index
+        return self.dataframe.index
 
     @property
     def dataframe(self):
-        return self.__dataframe
+        return self._frame
 
     @property
     def info(self):
         return self._info
 
     def get(self):
-        return self.__dataframe.copy()
+        return self.dataframe.copy()
 
     def set(self, dataframe):
-        self.__dataframe = dataframe
+        self._frame = dataframe
+
+    @staticmethod
+    def to_time_keys(time):
+        # int64 (ns, sem timezone) para alinhar calendarios diferentes
+        index = pd.DatetimeIndex(time)
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        return index.values.astype("datetime64[ns]").view(np.int64)
+
+    @property
+    def time(self):
+        return self.to_time_keys(self.dataframe["time"])
+
+    def view(self, column):
+        return self.dataframe[column].to_numpy()
 
     @property
     def ticker(self):
@@ -41,8 +109,7 @@ class CDataFrame(ABC):
 
     def is_valid(self):
         return all(
-            [len(set(DATAFRAME_COLUMNS) - set(list(self.dataframe.columns)))
-             == 0]
+            [len(set(DATAFRAME_COLUMNS) - set(self.columns)) == 0]
         )
 
     @property
@@ -56,16 +123,165 @@ class CDataFrame(ABC):
         return any(rules)
 
 
+def readonly(array):
+    array = array.view()
+    array.flags.writeable = False
+    return array
+
+
 class COHLCDataFrame(CDataFrame):
+    """OHLCV guardado em arrays numpy contiguos.
+
+    `time` e int64 (ns) e `values` e uma matriz (5, n) com open, high,
+    low, close e volume, cada linha contigua, em float64 ou float32
+    (`dtype`). `view(coluna)` devolve uma view somente leitura sem copia;
+    `dataframe` continua disponivel e e montado sob demanda, mas tambem e
+    somente leitura: escrever nos valores levanta ValueError e trocar
+    colunas nao chega a `view()`. Para editar use `get()`, que devolve uma
+    copia, e grave de volta com `set()`.
+    """
+
+    __slots__ = ("_time", "_values", "_labels", "_dtype", "_resampled")
+
+    def __init__(self, dataframe, info=None, dtype=np.float64):
+        self._time = None
+        self._values = None
+        self._labels = None
+        self._dtype = dtype
+        self._resampled = {}
+        super().__init__(dataframe, info=info)
+
+    @classmethod
+    def from_arrays(cls, time, values, labels=None, info=None):
+        """Cria sem validar/ordenar: `time` ordenado e `values` (5, n)."""
+        cdf = cls.__new__(cls)
+        cdf._frame = None
+        cdf._info = {} if info is None else info
+        cdf.source = None
+        cdf._dtype = values.dtype
+        cdf._time = readonly(time)
+        cdf._values = readonly(values)
+        cdf._labels = labels
+        cdf._resampled = {}
+        return cdf
+
     def parse(self):
-        if "ticker" in self.dataframe.columns:
-            self._info["ticker"] = self.dataframe.ticker.iloc[0]
-        if "timeframe" in self.dataframe.columns:
-            self._info["timeframe"] = self.dataframe.timeframe.iloc[0]
-        self.set(
-            self.dataframe[DATAFRAME_COLUMNS]
-                .sort_values(["time"], ascending=True)
+        dataframe = self._frame
+        if "ticker" in dataframe.columns:
+            self._info["ticker"] = dataframe.ticker.iloc[0]
+        if "timeframe" in dataframe.columns:
+            self._info["timeframe"] = dataframe.timeframe.iloc[0]
+        time = super().time
+        labels = dataframe.index
+        values = dataframe[DATAFRAME_COLUMNS[1:]].to_numpy(
+            dtype=self._dtype).T
+        if len(time) > 1 and (np.diff(time) < 0).any():
+            order = np.argsort(time, kind="stable")
+            time, labels, values = time[order], labels[order], values[:, order]
+        self._time = readonly(time)
+        self._values = readonly(np.ascontiguousarray(values))
+        self._labels = labels
+        self._frame = None
+
+    @property
+    def parsed(self):
+        return self._values is not None
+
+    @property
+    def time(self):
+        if not self.parsed:
+            return super().time
+        return self._time
+
+    @property
+    def values(self):
+        return self._values
+
+    def view(self, column):
+        if not self.parsed:
+            return super().view(column)
+        if column == "time":
+            return self._time
+        return self._values[DATAFRAME_COLUMNS.index(column) - 1]
+
+    @property
+    def index(self):
+        if not self.parsed:
+            return super().index
+        if self._labels is None:
+            return pd.RangeIndex(len(self._time))
+        return self._labels
+
+    @property
+    def columns(self):
+        if not self.parsed:
+            return super().columns
+        return list(DATAFRAME_COLUMNS)
+
+    @property
+    def dataframe(self):
+        # somente leitura: as colunas sao views dos arrays de `view()`
+        if self._frame is None and self.parsed:
+            columns = {"time": self._time.view("datetime64[ns]")}
+            for i, column in enumerate(DATAFRAME_COLUMNS[1:]):
+                columns[column] = self._values[i]
+            self._frame = pd.DataFrame(columns, index=self.index, copy=False)
+        return self._frame
+
+    def set(self, dataframe):
+        self._time = self._values = self._labels = None
+        self._resampled = {}
+        super().set(dataframe)
+        if self.is_valid():
+            self.parse()
+
+    @property
+    def timeframe(self):
+        return self._info.get("timeframe")
+
+    def resample(self, timeframe):
+        """Barras OHLCV agregadas em `timeframe` (ex.: "W1", "MN1", "H1").
+
+        open e o primeiro, high o maximo, low o minimo, close o ultimo e
+        volume a soma de cada barra; linhas sem close sao ignoradas. O
+        resultado fica guardado por timeframe neste objeto, entao pedir de
+        novo nao recalcula. So agrega: um timeframe menor que o atual
+        (conhecido em `info`) e erro.
+        """
+        check_timeframe(timeframe)
+        if timeframe == self.timeframe:
+            return self
+        if self.timeframe in TIMEFRAMES and \
+                TIMEFRAMES[timeframe] < TIMEFRAMES[self.timeframe]:
+            raise ValueError(f"nao da para passar de {self.timeframe} "
+                             f"para {timeframe}")
+        if not self.parsed:
+            raise ValueError("dataframe invalido para reamostrar")
+        resampled = self._resampled.get(timeframe)
+        if resampled is None:
+            resampled = self._resampled[timeframe] = \
+                self._aggregate(timeframe)
+        return resampled
+
+    def _aggregate(self, timeframe):
+        values = self._values
+        valid = ~np.isnan(values[3])
+        time, values = self._time[valid], values[:, valid]
+        keys = timeframe_keys(time, timeframe)
+        starts = np.flatnonzero(np.diff(keys, prepend=-1) != 0)
+        bars = np.empty((5, len(starts)), dtype=values.dtype)
+        if len(starts):
+            ends = np.append(starts[1:], len(keys)) - 1
+            bars[0] = values[0, starts]
+            bars[1] = np.fmax.reduceat(values[1], starts)
+            bars[2] = np.fmin.reduceat(values[2], starts)
+            bars[3] = values[3, ends]
+            bars[4] = np.add.reduceat(np.nan_to_num(values[4]), starts)
+        cdf = COHLCDataFrame.from_arrays(
+            keys[starts], bars, info=dict(self._info, timeframe=timeframe)
         )
+        cdf.source = self.source
+        return cdf
 
     def save_price(self, filename):
         price_column = "close"
@@ -75,7 +291,9 @@ class COHLCDataFrame(CDataFrame):
 
 
 class CCalcDataFrame(CDataFrame):
-    def __init__(self, dataframe, info={}):
+    __slots__ = ()
+
+    def __init__(self, dataframe, info=None):
         super().__init__(dataframe, info=info)
 
     def parse(self):
@@ -96,8 +314,57 @@ class CDataFramesJoined:
         df.set_index(["time"], inplace=True)
         return df
 
-    def join(self):
-        dfs = [self.convert_cdf_to_df(cdf)
-               for cdf in self.cdataframes]
-        final_df = pd.concat(dfs, join="inner", axis=1).reset_index()
-        return final_df.rename({"time": "Date"}, axis=1).set_index(["Date"])
+    @staticmethod
+    def align_time_axis(keys, how="inner"):
+        # cada ticker tem datas ordenadas e unicas: uma unica ordenacao de
+        # todas as chaves resolve a intersecao (k-way) ou a uniao
+        if how not in ("inner", "outer"):
+            raise ValueError(f"join desconhecido: {how}")
+        first = keys[0]
+        if all(len(key) == len(first) and np.array_equal(key, first)
+               for key in keys[1:]):
+            return first
+        merged, counts = np.unique(np.concatenate(keys), return_counts=True)
+        if how == "inner":
+            return merged[counts == len(keys)]
+        return merged
+
+    def join(self, how="inner", min_coverage=None, column="close",
+             fill=True):
+        """Matriz larga de precos (datas x tickers) alinhada por data.
+
+        how="inner" mantem so as datas comuns a todos; how="outer" usa a
+        uniao das datas e repete o ultimo preco (forward-fill), ou deixa
+        NaN onde nao ha cotacao com `fill=False`.
+        `min_coverage` (0-1) descarta datas em que menos dessa fracao dos
+        tickers tem cotacao de fato.
+        """
+        keys = [cdf.time for cdf in self.cdataframes]
+        axis = self.align_time_axis(keys, how)
+
+        values = np.full((len(axis), len(keys)), np.nan)
+        observed = np.zeros(values.shape, dtype=bool)
+        for j, (cdf, time) in enumerate(zip(self.cdataframes, keys)):
+            prices = cdf.view(column)
+            if len(time) == len(axis) and np.array_equal(time, axis):
+                values[:, j] = prices
+                observed[:, j] = ~np.isnan(prices)
+                continue
+            positions = np.searchsorted(axis, time)
+            inside = positions < len(axis)
+            inside[inside] = axis[positions[inside]] == time[inside]
+            values[positions[inside], j] = prices[inside]
+            observed[positions[inside], j] = ~np.isnan(prices[inside])
+
+        if how == "outer" and fill:
+            # indice da ultima cotacao observada em cada coluna
+            last = np.where(observed, np.arange(len(axis))[:, None], 0)
+            np.maximum.accumulate(last, axis=0, out=last)
+            values = values[last, np.arange(len(keys))]
+        if min_coverage is not None:
+            keep = observed.mean(axis=1) >= min_coverage
+            axis, values = axis[keep], values[keep]
+
+        index = pd.DatetimeIndex(axis.view("datetime64[ns]"), name="Date")
+        return pd.DataFrame(values, index=index,
+                            columns=[cdf.ticker for cdf in self.cdataframes])
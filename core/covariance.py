@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_NUM_FACTORS = 5
+
+
+class FactorCovariance:
+    """Covariancia de modelo de fatores: B B' + diag(d).
+
+    Guarda so os `loadings` B (N, K) e as variancias especificas d (N,),
+    entao a memoria e O(N K) e a variancia de uma carteira custa O(N K)
+    em vez de O(N^2). `@` faz o produto matriz-vetor sem montar a matriz.
+    """
+
+    def __init__(self, loadings, specific, labels=None):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific = np.asarray(specific, dtype=float)
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.specific)
+
+    @property
+    def shape(self):
+        return (len(self), len(self))
+
+    @property
+    def num_factors(self):
+        return self.loadings.shape[1]
+
+    def diagonal(self):
+        return np.einsum("ij,ij->i", self.loadings, self.loadings) + \
+            self.specific
+
+    def __matmul__(self, other):
+        other = np.asarray(other, dtype=float)
+        specific = self.specific if other.ndim == 1 else \
+            self.specific[:, np.newaxis]
+        return self.loadings @ (self.loadings.T @ other) + specific * other
+
+    def portfolio_variances(self, weights):
+        """w' (B B' + D) w para cada linha de `weights` (S, N)."""
+        exposures = weights @ self.loadings
+        return np.einsum("ij,ij->i", exposures, exposures) + \
+            (weights * weights) @ self.specific
+
+    def block(self, rows, columns=None):
+        columns = rows if columns is None else columns
+        block = self.loadings[rows] @ self.loadings[columns].T
+        same = np.asarray(rows)[:, np.newaxis] == np.asarray(columns)
+        return block + np.where(same, self.specific[rows][:, np.newaxis], 0.0)
+
+    def subset(self, positions):
+        labels = None if self.labels is None else \
+            [self.labels[i] for i in positions]
+        return FactorCovariance(self.loadings[positions],
+                                self.specific[positions], labels)
+
+    def to_dense(self):
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dense(), index=self.labels,
+                            columns=self.labels)
+
+
+def as_covariance(cov_matrix):
+    """Matriz densa float (ou o proprio FactorCovariance) para os calculos."""
+    if isinstance(cov_matrix, FactorCovariance):
+        return cov_matrix
+    return np.asarray(cov_matrix, dtype=float)
+
+
+def covariance_diagonal(cov_matrix):
+    if isinstance(cov_matrix, FactorCovariance):
+        return cov_matrix.diagonal()
+    return np.diag(cov_matrix)
+
+
+def covariance_block(cov_matrix, rows, columns=None):
+    if isinstance(cov_matrix, FactorCovariance):
+        return cov_matrix.block(rows, columns)
+    columns = rows if columns is None else columns
+    return cov_matrix[np.ix_(rows, columns)]
+
+
+def _complete_returns(returns):
+    # os estimadores abaixo precisam de linhas sem buracos
+    return returns.dropna(how="all").dropna()
+
+
+def sample_covariance(returns, **_):
+    return returns.cov()
+
+
+def ledoit_wolf_covariance(returns, **_):
+    """Encolhimento de Ledoit-Wolf (2004) na direcao de mu * I."""
+    returns = _complete_returns(returns)
+    values = returns.to_numpy(dtype=float)
+    num_rows, num_stocks = values.shape
+    centered = values - values.mean(axis=0)
+    sample = centered.T @ centered / num_rows
+    mu = np.trace(sample) / num_stocks
+    delta = ((sample - mu * np.eye(num_stocks)) ** 2).sum() / num_stocks
+    squared = centered ** 2
+    beta = ((squared.T @ squared).sum() / num_rows - (sample ** 2).sum()) / \
+        (num_stocks * num_rows)
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+    # mesma normalizacao (n - 1) de returns.cov()
+    sample *= num_rows / (num_rows - 1)
+    mu = np.trace(sample) / num_stocks
+    shrunk = (1 - shrinkage) * sample + shrinkage * mu * np.eye(num_stocks)
+    return pd.DataFrame(shrunk, index=returns.columns,
+                        columns=returns.columns)
+
+
+def factor_covariance(returns, num_factors=DEFAULT_NUM_FACTORS):
+    """Modelo de K fatores estatisticos (PCA) sem montar a matriz N x N.
+
+    Os fatores sao os K primeiros componentes da SVD dos retornos
+    centrados; a variancia que sobra na diagonal vira risco especifico.
+    """
+    returns = _complete_returns(returns)
+    values = returns.to_numpy(dtype=float)
+    num_rows, num_stocks = values.shape
+    num_factors = max(0, min(num_factors, num_stocks - 1, num_rows - 1))
+    centered = values - values.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(centered,
+                                                   full_matrices=False)
+    loadings = components[:num_factors].T * (
+        singular_values[:num_factors] / np.sqrt(num_rows - 1)
+    )
+    variances = (centered ** 2).sum(axis=0) / (num_rows - 1)
+    specific = variances - (loadings ** 2).sum(axis=1)
+    # piso pequeno para manter a matriz positiva definida
+    specific = np.maximum(specific, 1e-6 * variances.mean())
+    return FactorCovariance(loadings, specific, list(returns.columns))
+
+
+ESTIMATORS = {
+    "sample": sample_covariance,
+    "ledoit-wolf": ledoit_wolf_covariance,
+    "factor": factor_covariance,
+}
+
+
+def estimate_covariance(returns, method="sample",
+                        num_factors=DEFAULT_NUM_FACTORS):
+    if method not in ESTIMATORS:
+        raise ValueError(f"estimador de covariancia desconhecido: {method}")
+    return ESTIMATORS[method](returns, num_factors=num_factors)
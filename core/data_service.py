@@ -1,15 +1,31 @@
-from typing import List
+from typing import List, Optional
 from dataclasses import dataclass
-import pandas_datareader.data as pdreader_data
-from core.cdataframe import COHLCDataFrame
-import pandas as pd
+from core.cdataframe import CDataFrame, COHLCDataFrame, DEFAULT_TIMEFRAME
+from core.price_cache import PriceCache
+from core.price_store import (FileDataReader, PartitionedPriceStore,
+                              DEFAULT_PRICES_DIR, DEFAULT_WRITE_WORKERS)
+from core.instrumentation import Profiler
+from core.downloader import (ChunkedDownloader, DEFAULT_MAX_WORKERS,
+                             DEFAULT_RETRIES)
+import numpy as np
 from datetime import date
 
+# campos do Yahoo na ordem de DATAFRAME_COLUMNS (sem "time")
+YF_FIELDS = ["Open", "High", "Low", "Adj Close", "Volume"]
+
 
 @dataclass
 class DataServiceParams:
     tickers: List[str]
     start_date: date
+    cache_dir: Optional[str] = None
+    source: str = "yfinance"
+    data_dir: Optional[str] = None
+    dtype: str = "float64"
+    chunk_size: Optional[int] = None
+    download_workers: int = DEFAULT_MAX_WORKERS
+    retries: int = DEFAULT_RETRIES
+    rate_limit: Optional[float] = None
 
     @classmethod
     def default(cls):
@@ -18,50 +34,158 @@ class DataServiceParams:
 
 class DataService:
     def __init__(self,
-                 params: DataServiceParams = DataServiceParams.default()):
+                 params: DataServiceParams = DataServiceParams.default(),
+                 profiler: Profiler = None):
         self.tickers = params.tickers
+        self.profiler = profiler or Profiler()
         self.data_reader_func = None
         self.cdataframes = []
         self.start_date = params.start_date
+        self.cache_dir = params.cache_dir
+        self.source = params.source
+        self.data_dir = params.data_dir or DEFAULT_PRICES_DIR
+        self.dtype = params.dtype
+        self.chunk_size = params.chunk_size
+        self.download_workers = params.download_workers
+        self.retries = params.retries
+        self.rate_limit = params.rate_limit
+        self.load_errors = {}
         self.build_callbacks()
 
     def get_data_from_yf(self, tickers, start_date):
+        import pandas_datareader.data as pdreader_data
+
         return pdreader_data.get_data_yahoo(tickers, start=start_date)
 
-    def build_callbacks(self):
-        self.data_reader_func = self.get_data_from_yf
+    def build_callbacks(self, data_reader_func=None, price_cache=None):
+        self.data_reader_func = data_reader_func or self.get_data_from_yf
         self.before_start = self.before_start_yfinance
+        if data_reader_func is not None:
+            self.before_start = self.before_start_noop
+        if self.source == "file":
+            self.data_reader_func = data_reader_func or FileDataReader(
+                self.data_dir
+            )
+            self.before_start = self.before_start_noop
+        if price_cache is None and self.cache_dir:
+            price_cache = PriceCache(self.cache_dir)
+        self.price_cache = price_cache
+        if price_cache is not None:
+            # com cache a fonte so e preparada se algo precisar ser baixado
+            self.data_reader_func = price_cache.wrap(
+                self.data_reader_func, before_fetch=self.before_start
+            )
+            self.before_start = self.before_start_noop
 
     def load(self):
-        self.before_start()
-        tickers_data = self.data_reader_func(
-            self.convert_tickers(self.tickers), self.start_date
+        if self.chunk_size:
+            return self.load_chunked()
+        tickers_yf = self.convert_tickers(self.tickers)
+        with self.profiler.stage("data_service.fetch", source=self.source,
+                                 tickers=len(self.tickers)) as record:
+            self.before_start()
+            tickers_data = self.data_reader_func(tickers_yf, self.start_date)
+            record.counts["rows"] = len(tickers_data)
+        with self.profiler.stage("data_service.build_cdataframes",
+                                 tickers=len(self.tickers),
+                                 rows=len(tickers_data)):
+            self.cdataframes.extend(
+                self.build_cdataframes(self.tickers, tickers_yf,
+                                       tickers_data)
+            )
+
+    def load_chunked(self):
+        """Baixa em blocos concorrentes e monta os CDataFrames por bloco.
+
+        Tickers que falharem ficam em `load_errors` em vez de derrubar o
+        carregamento inteiro.
+        """
+        tickers_yf = self.convert_tickers(self.tickers)
+        ticker_by_yf = dict(zip(tickers_yf, self.tickers))
+        downloader = ChunkedDownloader(
+            self.data_reader_func, chunk_size=self.chunk_size,
+            max_workers=self.download_workers, retries=self.retries,
+            rate_limit=self.rate_limit,
         )
-        for ticker, ticker_yf in zip(self.tickers,
-                                     self.convert_tickers(self.tickers)):
-            df_dict = {
-                "close": tickers_data["Adj Close"][ticker_yf],
-                "open": tickers_data["Open"][ticker_yf],
-                "high": tickers_data["High"][ticker_yf],
-                "low": tickers_data["Low"][ticker_yf],
-                "volume": tickers_data["Volume"][ticker_yf],
-                "time": tickers_data.index,
-            }
-            df = pd.DataFrame(df_dict)
-            cdataframe = COHLCDataFrame(df)
-            cdataframe._info["ticker"] = ticker
-            cdataframe._info["source"] = "yfinance"
-            self.cdataframes.append(cdataframe)
+        built = {}
+
+        def on_chunk(chunk_yf, tickers_data):
+            chunk = [ticker_by_yf[ticker_yf] for ticker_yf in chunk_yf]
+            for cdataframe in self.build_cdataframes(chunk, chunk_yf,
+                                                     tickers_data):
+                built[cdataframe.ticker] = cdataframe
+
+        with self.profiler.stage("data_service.fetch", source=self.source,
+                                 tickers=len(self.tickers)) as record:
+            self.before_start()
+            _, report = downloader.download(tickers_yf, self.start_date,
+                                            on_chunk=on_chunk)
+            record.counts["chunks"] = report.chunks
+            record.counts["attempts"] = report.attempts
+            record.counts["errors"] = len(report.errors)
+        self.load_errors = {ticker_by_yf[ticker_yf]: error
+                            for ticker_yf, error in report.errors.items()}
+        self.cdataframes.extend(built[ticker] for ticker in self.tickers
+                                if ticker in built)
+
+    def build_cdataframes(self, tickers, tickers_yf, tickers_data):
+        """Converte o DataFrame largo (campo, ticker) de uma vez so.
+
+        Ordena e valida uma vez para todos os tickers e copia os campos
+        para um unico array (tickers, 5, datas); cada COHLCDataFrame e
+        uma view do seu pedaco.
+        """
+        if not tickers:
+            return []
+        missing = [field for field in YF_FIELDS
+                   if field not in tickers_data.columns.get_level_values(0)]
+        if missing:
+            raise KeyError(f"campos ausentes nos dados: {missing}")
+        if not tickers_data.index.is_monotonic_increasing:
+            tickers_data = tickers_data.sort_index()
+        time = CDataFrame.to_time_keys(tickers_data.index)
+        values = np.empty((len(tickers), len(YF_FIELDS), len(time)),
+                          dtype=self.dtype)
+        for k, field in enumerate(YF_FIELDS):
+            values[:, k, :] = tickers_data[field][tickers_yf].to_numpy().T
+        return [
+            COHLCDataFrame.from_arrays(
+                time, values[j], labels=tickers_data.index,
+                info={"ticker": ticker, "source": self.source,
+                      "timeframe": DEFAULT_TIMEFRAME},
+            )
+            for j, ticker in enumerate(tickers)
+        ]
+
+    def before_start_noop(self):
+        pass
 
     def before_start_yfinance(self):
         import yfinance as yf
 
         yf.pdr_override()
 
-    def save_prices(self):
+    def save_prices(self, mode="csv", workers=DEFAULT_WRITE_WORKERS):
+        """Exporta os precos carregados para `data_dir`.
+
+        mode="csv" grava um `prices_<ticker>.csv` por ticker (layout
+        antigo); mode="bulk" grava todos de uma vez no store particionado
+        por ano, acrescentando so as datas novas.
+        """
         import os
 
-        path = "pricesdata"
+        if mode == "bulk":
+            store = PartitionedPriceStore(self.data_dir, workers=workers)
+            with self.profiler.stage("data_service.save_prices", mode=mode,
+                                     tickers=len(self.cdataframes)) as record:
+                years = store.write_cdataframes(self.cdataframes)
+                record.counts["partitions"] = len(years)
+            print(f"prices store: {self.data_dir} "
+                  f"({len(self.cdataframes)} tickers, anos {years})")
+            return
+        if mode != "csv":
+            raise ValueError(f"formato de exportacao desconhecido: {mode}")
+        path = self.data_dir
         os.makedirs(path, exist_ok=True)
         for cdf in self.cdataframes:
             file = f"prices_{cdf.ticker}.csv"
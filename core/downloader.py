@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import threading
+import time
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 50
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+
+class RateLimiter:
+    """Garante um intervalo minimo entre chamadas, entre threads."""
+
+    def __init__(self, calls_per_second, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.interval = 1.0 / calls_per_second
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_call = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = self.clock()
+            wait = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if wait > 0:
+            self.sleep(wait)
+
+
+@dataclass
+class DownloadReport:
+    tickers: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+    chunks: int = 0
+    attempts: int = 0
+
+
+def normalize_columns(tickers_data, tickers):
+    # o Yahoo devolve colunas simples quando so um ticker e pedido
+    if (tickers_data is not None
+            and not isinstance(tickers_data.columns, pd.MultiIndex)
+            and len(tickers) == 1 and len(tickers_data.columns)):
+        tickers_data = pd.concat({tickers[0]: tickers_data}, axis=1)
+        tickers_data = tickers_data.swaplevel(axis=1)
+    return tickers_data
+
+
+def tickers_with_data(tickers_data, tickers, price_field="Adj Close"):
+    if tickers_data is None or len(tickers_data) == 0:
+        return []
+    if price_field not in tickers_data.columns.get_level_values(0):
+        return []
+    prices = tickers_data[price_field]
+    return [ticker for ticker in tickers
+            if ticker in prices.columns and prices[ticker].notna().any()]
+
+
+class ChunkedDownloader:
+    """Baixa o universo em blocos concorrentes, tolerando falhas.
+
+    Cada bloco tem `retries` novas tentativas com backoff exponencial; se
+    ainda falhar, os tickers do bloco sao baixados um a um para isolar o
+    simbolo com problema. Tickers sem dados entram em `report.errors` e o
+    resto segue. `on_chunk(tickers, frame)` recebe cada bloco assim que
+    ele chega (na thread que chamou `download`); nesse caso os blocos nao
+    sao guardados e `download` devolve None no lugar do DataFrame.
+    """
+
+    def __init__(self, reader_func, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, rate_limit=None, sleep=time.sleep):
+        self.reader_func = reader_func
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.rate_limiter = None
+        if rate_limit:
+            self.rate_limiter = RateLimiter(rate_limit, sleep=sleep)
+        self.lock = threading.Lock()
+
+    def chunks(self, tickers):
+        return [tickers[i:i + self.chunk_size]
+                for i in range(0, len(tickers), self.chunk_size)]
+
+    def fetch(self, tickers, start_date, report):
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            with self.lock:
+                report.attempts += 1
+            try:
+                return normalize_columns(
+                    self.reader_func(tickers, start_date), tickers
+                )
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.sleep(self.backoff * 2 ** attempt)
+
+    def fetch_chunk(self, tickers, start_date, report):
+        try:
+            return [(tickers, self.fetch(tickers, start_date, report))]
+        except Exception as error:
+            if len(tickers) == 1:
+                with self.lock:
+                    report.errors[tickers[0]] = repr(error)
+                return []
+        results = []
+        for ticker in tickers:
+            results.extend(self.fetch_chunk([ticker], start_date, report))
+        return results
+
+    def download(self, tickers, start_date, on_chunk=None):
+        report = DownloadReport()
+        frames = []
+        chunks = self.chunks(list(tickers))
+        report.chunks = len(chunks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_chunk, chunk, start_date,
+                                       report)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                for chunk, tickers_data in future.result():
+                    loaded = tickers_with_data(tickers_data, chunk)
+                    with self.lock:
+                        for ticker in chunk:
+                            if ticker not in loaded:
+                                report.errors[ticker] = "sem dados"
+                    if not loaded:
+                        continue
+                    report.tickers.extend(loaded)
+                    if on_chunk is not None:
+                        on_chunk(loaded, tickers_data)
+                    else:
+                        frames.append(tickers_data)
+        tickers_data = pd.concat(frames, axis=1) if frames else None
+        return tickers_data, report
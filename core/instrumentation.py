@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+_subscribers = []
+
+
+def subscribe(callback):
+    """Registra `callback(record)` chamado ao fim de cada etapa medida."""
+    _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux informa em KB, macOS em bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class StageRecord:
+    name: str
+    counts: dict = field(default_factory=dict)
+    started_at: float = 0.0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = None
+
+
+class Profiler:
+    """Mede tempo de parede, CPU e pico de RSS de cada etapa do pipeline.
+
+    `counts` (linhas, tickers, ...) pode ser completado dentro do bloco:
+
+        with profiler.stage("join", tickers=10) as record:
+            df = joiner.join()
+            record.counts["rows"] = len(df)
+    """
+
+    def __init__(self):
+        self.records = []
+        self.subscribers = []
+        self.created_at = time.perf_counter()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+
+    @contextmanager
+    def stage(self, name, **counts):
+        record = StageRecord(
+            name, counts, started_at=time.perf_counter() - self.created_at
+        )
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            record.peak_rss_bytes = peak_rss_bytes()
+            self.records.append(record)
+            for callback in self.subscribers + _subscribers:
+                callback(record)
+
+    def trace(self):
+        return {
+            "total_wall_seconds": time.perf_counter() - self.created_at,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": [asdict(record) for record in self.records],
+        }
+
+    def write(self, filename):
+        with open(filename, "w") as file:
+            json.dump(self.trace(), file, indent=2, default=str)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from core.cdataframe import TRADING_DAYS
+
+DEFAULT_TARGET_VOL = 0.10
+DEFAULT_VOL_WINDOW = 63
+DEFAULT_MAX_LEVERAGE = 4.0
+
+
+def rolling_volatility(returns, window=DEFAULT_VOL_WINDOW):
+    """Desvio padrao movel (T, N) de todas as colunas de uma vez.
+
+    Usa somas acumuladas de r e r^2: cada janela e uma diferenca, sem
+    loop por ativo. As primeiras `window - 1` linhas ficam NaN.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    num_rows, num_stocks = returns.shape
+    volatility = np.full((num_rows, num_stocks), np.nan)
+    if num_rows < window:
+        return volatility
+    sums = np.zeros((num_rows + 1, num_stocks))
+    squares = np.zeros((num_rows + 1, num_stocks))
+    np.cumsum(returns, axis=0, out=sums[1:])
+    np.cumsum(returns * returns, axis=0, out=squares[1:])
+    window_sums = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = (window_squares - window_sums ** 2 / window) / (window - 1)
+    volatility[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return volatility
+
+
+def target_leverage(returns, target_vol=DEFAULT_TARGET_VOL,
+                    window=DEFAULT_VOL_WINDOW,
+                    max_leverage=DEFAULT_MAX_LEVERAGE, periods=TRADING_DAYS):
+    """Alavancagem de cada dia para levar cada ativo a `target_vol` anual.
+
+    A alavancagem do dia t usa a volatilidade ate t - 1 (sem olhar o
+    proprio dia) e fica limitada a `max_leverage`.
+    """
+    volatility = rolling_volatility(returns, window) * np.sqrt(periods)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        leverage = np.clip(target_vol / volatility, 0.0, max_leverage)
+    lagged = np.full_like(leverage, np.nan)
+    lagged[1:] = leverage[:-1]
+    return lagged
+
+
+def equal_risk_contribution(cov_matrices, tol=1e-10, max_iter=100):
+    """Pesos de contribuicao de risco igual para um lote (B, N, N).
+
+    Newton amortecido em min 1/2 y'Sy - sum(log y), cujo otimo tem
+    y_i (Sy)_i = 1 para todo i; os pesos sao y / sum(y). Todas as
+    matrizes do lote andam juntas, um solve em lote por iteracao.
+    """
+    cov_matrices = np.asarray(cov_matrices, dtype=np.float64)
+    single = cov_matrices.ndim == 2
+    if single:
+        cov_matrices = cov_matrices[np.newaxis]
+    num_stocks = cov_matrices.shape[-1]
+    diagonal = np.diagonal(cov_matrices, axis1=1, axis2=2)
+    y = 1.0 / np.sqrt(diagonal)
+    for _ in range(max_iter):
+        gradient = np.einsum("bij,bj->bi", cov_matrices, y) - 1.0 / y
+        if np.max(np.abs(gradient * y)) < tol:
+            break
+        hessian = cov_matrices + np.eye(num_stocks) / (y * y)[:, :, None]
+        step = np.linalg.solve(hessian, gradient[:, :, None])[:, :, 0]
+        # passo limitado para manter y > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(step > 0, y / step, np.inf)
+        alpha = np.minimum(1.0, 0.9 * ratios.min(axis=1))
+        y = y - alpha[:, np.newaxis] * step
+    weights = y / y.sum(axis=1, keepdims=True)
+    return weights[0] if single else weights
+
+
+def risk_contributions(weights, cov_matrix):
+    marginal = cov_matrix @ weights
+    return weights * marginal / (weights @ marginal)
+
+
+def leveraged_prices(close_prices_df, target_vol=DEFAULT_TARGET_VOL,
+                     window=DEFAULT_VOL_WINDOW,
+                     max_leverage=DEFAULT_MAX_LEVERAGE, risk_parity=False,
+                     periods=TRADING_DAYS):
+    """Etapa entre o join e o calculate: fluxos de retorno alavancados.
+
+    Cada coluna vira r_t * alavancagem_t, e o resultado volta como indice
+    de preco (comecando em 1.0), entao `calculate` segue igual. Com
+    `risk_parity` os fluxos ainda sao escalados por N * w_erc para que
+    cada um contribua com o mesmo risco na carteira igualmente ponderada.
+    Devolve (precos, pesos ERC ou None).
+    """
+    returns = close_prices_df.pct_change().to_numpy(dtype=np.float64)[1:]
+    # sem cotacao (join outer) conta como retorno zero
+    returns = np.where(np.isnan(returns), 0.0, returns)
+    adjusted = returns * target_leverage(returns, target_vol, window,
+                                         max_leverage, periods)
+    adjusted = adjusted[window:]
+    index = close_prices_df.index[1 + window:]
+    erc_weights = None
+    if risk_parity:
+        erc_weights = equal_risk_contribution(
+            np.cov(adjusted, rowvar=False).reshape(adjusted.shape[1], -1)
+        )
+        adjusted = adjusted * (len(erc_weights) * erc_weights)
+    levels = np.vstack([np.ones(adjusted.shape[1]),
+                        np.cumprod(1.0 + adjusted, axis=0)])
+    first = close_prices_df.index[window]
+    prices = pd.DataFrame(levels, index=index.insert(0, first),
+                          columns=close_prices_df.columns)
+    if erc_weights is not None:
+        erc_weights = pd.Series(erc_weights, index=close_prices_df.columns)
+    return prices, erc_weights
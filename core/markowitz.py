@@ -1,15 +1,31 @@
-import numpy as np
 import pandas as pd
-import pandas_datareader.data as web
-import matplotlib.pyplot as plt
-import yfinance as yf
 from datetime import date
 from core.data_service import DataServiceParams, DataService
-from core.cdataframe import CDataFramesJoined
-import os
+from core.cdataframe import (DEFAULT_TIMEFRAME, CDataFramesJoined,
+                             annualization_periods)
+from core.simulation import (DEFAULT_CONCENTRATION, DEFAULT_TOLERANCE,
+                             TRADING_DAYS, simulate_portfolios,
+                             simulate_portfolios_adaptive)
+from core.optimizer import DEFAULT_FRONTIER_POINTS, optimize_portfolios
+from core.covariance import (DEFAULT_NUM_FACTORS, as_covariance,
+                             estimate_covariance)
+from core.report import render_markowitz_report
+from core.resampling import (DEFAULT_RESAMPLES, ResampledResult,
+                             resample_portfolios)
+from core.result_cache import result_key
+from core.instrumentation import Profiler
+from core.leverage import (DEFAULT_MAX_LEVERAGE, DEFAULT_VOL_WINDOW,
+                           leveraged_prices)
+from core.stats_index import (load_or_build_stats_index,
+                              stats_index_filename)
+
+FRONTIER_BINS = 500
 
 
 def get_data_from_yf(stocks, start_date):
+    import pandas_datareader.data as web
+    import yfinance as yf
+
     yf.pdr_override()
     return web.get_data_yahoo(stocks, start=start_date)["Adj Close"]
 
@@ -20,69 +36,155 @@ def run_markowitz(stocks, start_date="2019-01-01"):
 
     return calculate(close_prices_df, stocks)
 
-def run_markowitz_from_data_service(stocks, start_date:date = None):
+def load_close_prices(stocks, start_date: date = None, cache_dir=None,
+                      source="yfinance", data_dir=None, profiler=None,
+                      join_how="inner", min_coverage=None, chunk_size=None,
+                      download_workers=4, timeframe=None, fill=True):
+    """Carrega os tickers e devolve (precos de fechamento, tickers).
 
+    Com `timeframe` (ex.: "W1") as barras de cada ticker sao agregadas
+    antes do join.
+    """
     if start_date is None:
         start_date = date.today()
     service_params = DataServiceParams(tickers=stocks,
-                                       start_date=start_date)
-    data_service = DataService(params=service_params)
+                                       start_date=start_date,
+                                       cache_dir=cache_dir,
+                                       source=source,
+                                       data_dir=data_dir,
+                                       chunk_size=chunk_size,
+                                       download_workers=download_workers)
+    profiler = profiler or Profiler()
+    data_service = DataService(params=service_params, profiler=profiler)
     data_service.load()
+    for ticker, error in data_service.load_errors.items():
+        print(f"erro ao carregar {ticker}: {error}")
+    stocks = [cdf.ticker for cdf in data_service.cdataframes]
 
-    cdf_joiner = CDataFramesJoined(data_service.cdataframes)
-    calculate(cdf_joiner.join(), stocks)
-
-def calculate(close_prices_df, stocks):
-    num_stocks = len(stocks)
-
-    # convert daily stock prices into daily returns
-    returns = close_prices_df.pct_change()
-
-    # calculate mean daily return and covariance of daily returns
-    mean_daily_returns = returns.mean()
-    cov_matrix = returns.cov()
-
-    # set number of runs of random portfolio weights
-    num_portfolios = 25000
-
-    # set up array to hold results
-    # We have increased the size of the array to hold the
-    # weight values for each stock
-    results = np.zeros((4 + num_stocks - 1, num_portfolios))
-
-    for i in range(num_portfolios):
-        # select random weights for portfolio holdings
-        weights = np.array(np.random.random(len(stocks)))
-        # rebalance weights to sum to 1
-        weights /= np.sum(weights)
-
-        # calculate portfolio return and volatility
-        portfolio_return = np.sum(mean_daily_returns * weights) * 252
-        portfolio_std_dev = np.sqrt(
-            np.dot(weights.T, np.dot(cov_matrix, weights))
-        ) * np.sqrt(252)
-
-        # store results in results array
-        results[0, i] = portfolio_return
-        results[1, i] = portfolio_std_dev
-        # store Sharpe Ratio (return / volatility) - risk free rate
-        # element excluded for simplicity
-        results[2, i] = results[0, i] / results[1, i]
-        # iterate through the weight vector and add data to results array
-        for j in range(len(weights)):
-            results[j + 3, i] = weights[j]
-        # if i % 1000 == 0:
-        #    print(f"portfolio: {i}")
+    cdataframes = data_service.cdataframes
+    if timeframe is not None:
+        with profiler.stage("resample", timeframe=timeframe,
+                            tickers=len(stocks)):
+            cdataframes = [cdf.resample(timeframe) for cdf in cdataframes]
+    cdf_joiner = CDataFramesJoined(cdataframes)
+    with profiler.stage("join", tickers=len(stocks)) as record:
+        close_prices_df = cdf_joiner.join(how=join_how,
+                                          min_coverage=min_coverage,
+                                          fill=fill)
+        record.counts["rows"] = len(close_prices_df)
+    return close_prices_df, stocks
 
-    columns = ["ret", "stdev", "sharpe"]
-    columns.extend(stocks)
-    results_frame = pd.DataFrame(results.T, columns=columns)
 
-    # locate position of portfolio with highest Sharpe Ratio
-    max_sharpe_port = results_frame.iloc[results_frame["sharpe"].idxmax()]
+def run_markowitz_from_data_service(stocks, start_date: date = None,
+                                    cache_dir=None, source="yfinance",
+                                    data_dir=None, profiler=None,
+                                    join_how="inner", min_coverage=None,
+                                    chunk_size=None, download_workers=4,
+                                    timeframe=DEFAULT_TIMEFRAME,
+                                    target_vol=None,
+                                    vol_window=DEFAULT_VOL_WINDOW,
+                                    max_leverage=DEFAULT_MAX_LEVERAGE,
+                                    risk_parity=False, **calculate_options):
+    profiler = profiler or Profiler()
+    close_prices_df, stocks = load_close_prices(
+        stocks, start_date, cache_dir=cache_dir, source=source,
+        data_dir=data_dir, profiler=profiler, join_how=join_how,
+        min_coverage=min_coverage, chunk_size=chunk_size,
+        download_workers=download_workers, timeframe=timeframe,
+    )
+    periods = annualization_periods(timeframe)
+    if target_vol is not None:
+        # ajustador de alavancagem: todos os ativos com o mesmo risco
+        with profiler.stage("leverage", tickers=len(stocks)) as record:
+            close_prices_df, erc_weights = leveraged_prices(
+                close_prices_df, target_vol=target_vol, window=vol_window,
+                max_leverage=max_leverage, risk_parity=risk_parity,
+                periods=periods,
+            )
+            record.counts["rows"] = len(close_prices_df)
+        if erc_weights is not None:
+            print(f"pesos de paridade de risco (ERC):\n{erc_weights}")
+    # o indice salvo e de retornos diarios
+    if (cache_dir and target_vol is None and timeframe == DEFAULT_TIMEFRAME
+            and "stats_index" not in calculate_options
+            and calculate_options.get("covariance", "sample") == "sample"):
+        # indice salvo junto do cache: outras datas iniciais saem em O(N^2)
+        with profiler.stage("stats_index", tickers=len(stocks)):
+            calculate_options["stats_index"] = load_or_build_stats_index(
+                close_prices_df, stats_index_filename(
+                    cache_dir, stocks, source=source, data_dir=data_dir,
+                    join_how=join_how, min_coverage=min_coverage,
+                )
+            )
+    return calculate(close_prices_df, stocks, profiler=profiler,
+                     periods=periods, **calculate_options)
+
+
+def calculate(close_prices_df, stocks, num_portfolios=25000, seed=None,
+              workers=None, stream=False, method="montecarlo", plot=True,
+              report_executor=None, profiler=None, stats_index=None,
+              covariance="sample", num_factors=DEFAULT_NUM_FACTORS,
+              sampler="uniform", concentration=DEFAULT_CONCENTRATION,
+              tolerance=DEFAULT_TOLERANCE, result_cache=None,
+              num_resamples=DEFAULT_RESAMPLES, periods=TRADING_DAYS):
+    profiler = profiler or Profiler()
+    cached = key = None
+    # sorteios sem seed nao se repetem, entao nao vale guardar
+    if result_cache is not None and (method == "optimizer"
+                                     or seed is not None):
+        params = {"method": method, "num_portfolios": num_portfolios,
+                  "seed": seed, "parallel": workers is not None,
+                  "stream": stream or not plot,
+                  "covariance": covariance, "num_factors": num_factors,
+                  "sampler": sampler, "concentration": concentration,
+                  "tolerance": tolerance, "num_resamples": num_resamples,
+                  "periods": periods}
+        with profiler.stage("result_cache",
+                            rows=len(close_prices_df)) as record:
+            key = result_key(close_prices_df, params)
+            cached = result_cache.get(key)
+            record.counts["hit"] = cached is not None
+    if cached is not None:
+        simulation = cached.simulation
+    else:
+        with profiler.stage("returns", rows=len(close_prices_df),
+                            tickers=len(stocks)):
+            returns = None
+            if stats_index is not None and covariance == "sample" and \
+                    method != "resampled" and \
+                    stats_index.matches(close_prices_df):
+                # janela dos retornos: do segundo preco ao ultimo
+                mean_daily_returns, cov_matrix = stats_index.stats(
+                    close_prices_df.index[1], close_prices_df.index[-1]
+                )
+            else:
+                # convert daily stock prices into daily returns
+                returns = close_prices_df.pct_change()
+
+                # calculate mean daily return and covariance of daily returns
+                mean_daily_returns = returns.mean()
+                cov_matrix = estimate_covariance(returns, covariance,
+                                                 num_factors)
+
+        with profiler.stage("optimize", method=method,
+                            portfolios=num_portfolios, tickers=len(stocks)):
+            # the full cloud is only kept when it is going to be plotted
+            simulation = run_method(method, mean_daily_returns, cov_matrix,
+                                    num_portfolios, seed, workers,
+                                    stream or not plot, sampler=sampler,
+                                    concentration=concentration,
+                                    tolerance=tolerance, returns=returns,
+                                    num_resamples=num_resamples,
+                                    periods=periods)
+    if sampler == "adaptive" and method == "montecarlo":
+        status = "convergiu" if simulation.converged else "limite atingido"
+        print(f"carteiras avaliadas: {simulation.num_portfolios} ({status})")
+
+    # portfolio with highest Sharpe Ratio
+    max_sharpe_port = candidate_to_series(simulation.max_sharpe, stocks)
 
-    # locate positon of portfolio with minimum standard deviation
-    min_vol_port = results_frame.iloc[results_frame["stdev"].idxmin()]
+    # portfolio with minimum standard deviation
+    min_vol_port = candidate_to_series(simulation.min_vol, stocks)
     print(
         f"\n\n==================\nmaximo sharpe do portifólio:"
         f" {max_sharpe_port['sharpe']:.3}"
@@ -93,26 +195,78 @@ def calculate(close_prices_df, stocks):
         f" {(min_vol_port['stdev']*100):.3} %"
         f"\n====================\npesos: \n{min_vol_port})"
     )
+    if isinstance(simulation, ResampledResult):
+        intervals = pd.DataFrame(
+            {"min": simulation.max_sharpe_interval[0],
+             "medio": simulation.max_sharpe.weights,
+             "max": simulation.max_sharpe_interval[1]}, index=stocks
+        )
+        print(f"\nintervalo de {simulation.confidence:.0%} dos pesos"
+              f" (max sharpe, {simulation.num_portfolios} reamostragens):"
+              f"\n{intervals}")
 
-    # create scatter plot coloured by Sharpe Ratio
-    plt.scatter(
-        results_frame.stdev, results_frame.ret, c=results_frame.sharpe, cmap="RdYlBu"
-    )
-    plt.xlabel("Volatility")
-    plt.ylabel("Returns")
-    plt.colorbar()
-    # plot red star to highlight position of portfolio
-    # with highest Sharpe Ratio
-    plt.scatter(
-        max_sharpe_port[1], max_sharpe_port[0], marker=(5, 1, 0), color="r", s=1000
-    )
-
-    # plot green star to highlight position
-    # of minimum variance portfolio
-    plt.scatter(min_vol_port[1], min_vol_port[0], marker=(5, 1, 0), color="g", s=1000)
-    os.makedirs("reports", exist_ok=True)
-    plt.savefig(f"reports/simulador-markowitz_{'-'.join(stocks[:5])}.png")
+    report = None
+    if plot and not (cached is not None and cached.report_is_current()):
+        with profiler.stage("report", portfolios=simulation.num_portfolios):
+            report = render_markowitz_report(simulation, stocks,
+                                             executor=report_executor)
+    if key is not None and (cached is None or report is not None):
+        # com executor o PNG ainda nao existe: guarda sem o caminho
+        result_cache.put(key, simulation,
+                         report if isinstance(report, str) else None)
     return min_vol_port['stdev'], max_sharpe_port['sharpe']
 
+
+def run_method(method, mean_daily_returns, cov_matrix, num_portfolios,
+               seed=None, workers=None, stream=False, sampler="uniform",
+               concentration=DEFAULT_CONCENTRATION,
+               tolerance=DEFAULT_TOLERANCE, returns=None,
+               num_resamples=DEFAULT_RESAMPLES, periods=TRADING_DAYS):
+    if method == "optimizer":
+        # exact long-only portfolios plus the traced efficient frontier,
+        # which is skipped when nothing is going to be plotted
+        return optimize_portfolios(
+            mean_daily_returns.values, as_covariance(cov_matrix),
+            frontier_points=0 if stream else DEFAULT_FRONTIER_POINTS,
+            periods=periods,
+        )
+    if method == "resampled":
+        # bootstrap of the returns rows, one QP per resample, averaged
+        return resample_portfolios(
+            returns.to_numpy(), num_resamples, seed=seed, workers=workers,
+            periods=periods,
+        )
+    if method == "montecarlo" and sampler == "adaptive":
+        # Dirichlet draws drifting towards the best portfolios so far,
+        # stopping once they settle; num_portfolios is only the budget
+        if workers is not None:
+            raise ValueError("o amostrador adaptativo nao usa workers")
+        return simulate_portfolios_adaptive(
+            mean_daily_returns.values, as_covariance(cov_matrix),
+            num_portfolios, seed=seed, concentration=concentration,
+            tolerance=tolerance, frontier_bins=FRONTIER_BINS, stream=stream,
+            periods=periods,
+        )
+    if method == "montecarlo" and sampler == "uniform":
+        # simulate random portfolio weights in vectorized blocks, optionally
+        # split across a process pool (workers) or streamed in bounded memory
+        return simulate_portfolios(
+            mean_daily_returns.values, as_covariance(cov_matrix),
+            num_portfolios, seed=seed, workers=workers,
+            frontier_bins=FRONTIER_BINS, stream=stream, periods=periods,
+        )
+    if method == "montecarlo":
+        raise ValueError(f"amostrador desconhecido: {sampler}")
+    raise ValueError(f"metodo desconhecido: {method}")
+
+
+def candidate_to_series(candidate, stocks):
+    values = [candidate.ret, candidate.stdev, candidate.sharpe]
+    values.extend(candidate.weights)
+    columns = ["ret", "stdev", "sharpe"]
+    columns.extend(stocks)
+    return pd.Series(values, index=columns)
+
+
 def show_results():
     pass
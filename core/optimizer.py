@@ -0,0 +1,200 @@
+import numpy as np
+from core.cdataframe import TRADING_DAYS
+from core.covariance import (as_covariance, covariance_block,
+                             covariance_diagonal)
+from core.simulation import (Candidate, SimulationResult,
+                             evaluate_portfolios)
+
+DEFAULT_FRONTIER_POINTS = 50
+
+
+def _solve_equality_step(q_free, a_free, g_free):
+    # KKT de min 1/2 p'Qp + g'p  s.a.  A p = 0 nas variaveis livres
+    n, m = len(g_free), a_free.shape[0]
+    kkt = np.zeros((n + m, n + m))
+    kkt[:n, :n] = q_free
+    kkt[:n, n:] = -a_free.T
+    kkt[n:, :n] = a_free
+    rhs = np.concatenate([-g_free, np.zeros(m)])
+    try:
+        solution = np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        solution = None
+    if solution is None or not np.isfinite(solution).all():
+        # KKT singular (ativos repetidos, restricoes dependentes)
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+    return solution[:n], solution[n:]
+
+
+def solve_qp_nonnegative(q, a, b, x0, tol=1e-12, max_iter=None):
+    """Resolve min 1/2 x'Qx  s.a.  Ax = b, x >= 0 (active set primal).
+
+    `x0` precisa ser viavel; o conjunto ativo comeca nas coordenadas
+    zeradas de `x0`. `q` e uma covariancia densa ou FactorCovariance: so
+    `q @ x` e o bloco das variaveis livres sao usados.
+    """
+    x = np.array(x0, dtype=float)
+    free = x > 0
+    # para q semidefinida o maior |q_ij| esta na diagonal
+    scale = max(1.0, np.abs(covariance_diagonal(q)).max())
+    if max_iter is None:
+        max_iter = 10 * len(x) + 100
+    for _ in range(max_iter):
+        free_idx = np.flatnonzero(free)
+        gradient = q @ x
+        step, multipliers = _solve_equality_step(
+            covariance_block(q, free_idx), a[:, free_idx],
+            gradient[free_idx]
+        )
+        if np.max(np.abs(step), initial=0.0) <= tol * max(1.0, x.max()):
+            bound_multipliers = gradient - a.T @ multipliers
+            fixed_idx = np.flatnonzero(~free)
+            if len(fixed_idx) == 0:
+                return x
+            k = fixed_idx[np.argmin(bound_multipliers[fixed_idx])]
+            if bound_multipliers[k] >= -tol * scale:
+                return x
+            free[k] = True
+            continue
+
+        alpha, blocking = 1.0, None
+        decreasing = step < 0
+        if decreasing.any():
+            ratios = -x[free_idx][decreasing] / step[decreasing]
+            i = int(np.argmin(ratios))
+            if ratios[i] < 1.0:
+                alpha = ratios[i]
+                blocking = free_idx[decreasing][i]
+        x[free_idx] += alpha * step
+        if blocking is not None:
+            x[blocking] = 0.0
+            free[blocking] = False
+        x[free_idx] = np.maximum(x[free_idx], 0.0)
+    return x
+
+
+def min_variance_weights(cov_matrix, initial_weights=None):
+    num_stocks = len(cov_matrix)
+    x0 = np.zeros(num_stocks)
+    x0[np.argmin(covariance_diagonal(cov_matrix))] = 1.0
+    if initial_weights is not None and np.sum(initial_weights) > 0:
+        # partida quente: o conjunto ativo comeca no suporte anterior
+        x0 = np.maximum(initial_weights, 0.0) / np.sum(initial_weights)
+    return solve_qp_nonnegative(cov_matrix, np.ones((1, num_stocks)),
+                                np.ones(1), x0)
+
+
+def target_return_weights(mean_returns, cov_matrix, target):
+    """Carteira de menor variancia com retorno esperado `target`."""
+    low, high = int(np.argmin(mean_returns)), int(np.argmax(mean_returns))
+    spread = mean_returns[high] - mean_returns[low]
+    x0 = np.zeros(len(mean_returns))
+    if spread <= 0:
+        return min_variance_weights(cov_matrix)
+    x0[low] = (mean_returns[high] - target) / spread
+    x0[high] = 1.0 - x0[low]
+    x0 = np.clip(x0, 0.0, 1.0)
+    constraints = np.vstack([np.ones(len(mean_returns)), mean_returns])
+    return solve_qp_nonnegative(cov_matrix, constraints,
+                                np.array([1.0, target]), x0)
+
+
+def _best_edge_sharpe_weights(mean_returns, cov_matrix):
+    # sem retorno positivo o maximo do sharpe fica numa aresta do simplex
+    # (combinacao de dois ativos); em cada aresta o ponto critico de
+    # (a + bt) / sqrt(c + dt + et^2) sai de uma equacao linear em t
+    num_stocks = len(mean_returns)
+    cov_matrix = covariance_block(cov_matrix, np.arange(num_stocks))
+    i, j = np.triu_indices(num_stocks, k=1)
+    i = np.concatenate([np.arange(num_stocks), i])
+    j = np.concatenate([np.arange(num_stocks), j])
+    variances = np.diag(cov_matrix)
+    a = mean_returns[i]
+    b = mean_returns[j] - mean_returns[i]
+    c = variances[i]
+    d = 2 * (cov_matrix[i, j] - variances[i])
+    e = variances[i] - 2 * cov_matrix[i, j] + variances[j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        critical = -(b * c - a * d / 2) / (b * d / 2 - a * e)
+    critical = np.where(np.isfinite(critical),
+                        np.clip(critical, 0.0, 1.0), 0.0)
+    candidates = np.stack([np.zeros_like(a), np.ones_like(a), critical])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpes = (a + b * candidates) / np.sqrt(
+            c + d * candidates + e * candidates ** 2
+        )
+    sharpes = np.where(np.isfinite(sharpes), sharpes, -np.inf)
+    row, edge = np.unravel_index(np.argmax(sharpes), sharpes.shape)
+    t = candidates[row, edge]
+    weights = np.zeros(num_stocks)
+    weights[i[edge]] += 1.0 - t
+    weights[j[edge]] += t
+    return weights
+
+
+def max_sharpe_weights(mean_returns, cov_matrix, initial_weights=None):
+    if np.max(mean_returns) <= 0:
+        return _best_edge_sharpe_weights(mean_returns, cov_matrix)
+    # com taxa livre de risco zero: min y'Sy s.a. mu'y = 1, y >= 0
+    best = int(np.argmax(mean_returns))
+    y0 = np.zeros(len(mean_returns))
+    y0[best] = 1.0 / mean_returns[best]
+    if initial_weights is not None:
+        initial_weights = np.maximum(initial_weights, 0.0)
+        scale = mean_returns @ initial_weights
+        if scale > 0:
+            y0 = initial_weights / scale
+    y = solve_qp_nonnegative(cov_matrix, mean_returns[np.newaxis, :],
+                             np.ones(1), y0)
+    return y / y.sum()
+
+
+def efficient_frontier_weights(mean_returns, cov_matrix,
+                               num_points=DEFAULT_FRONTIER_POINTS):
+    min_variance = min_variance_weights(cov_matrix)
+    targets = np.linspace(min_variance @ mean_returns,
+                          np.max(mean_returns), num_points)
+    return np.array([
+        target_return_weights(mean_returns, cov_matrix, target)
+        for target in targets
+    ])
+
+
+def _candidate(weights, mean_returns, cov_matrix, periods):
+    ret, stdev, sharpe = evaluate_portfolios(
+        weights[np.newaxis, :], mean_returns, cov_matrix, periods
+    )
+    return Candidate(ret[0], stdev[0], sharpe[0], weights)
+
+
+def optimize_portfolios(mean_returns, cov_matrix,
+                        frontier_points=DEFAULT_FRONTIER_POINTS,
+                        periods=TRADING_DAYS):
+    """Carteiras exatas (long-only) de minima variancia e maximo sharpe.
+
+    Devolve um SimulationResult em que returns/stdevs/sharpes sao os
+    `frontier_points` pontos da fronteira eficiente (nenhum com 0).
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = as_covariance(cov_matrix)
+
+    min_vol = _candidate(min_variance_weights(cov_matrix),
+                         mean_returns, cov_matrix, periods)
+    max_sharpe = _candidate(max_sharpe_weights(mean_returns, cov_matrix),
+                            mean_returns, cov_matrix, periods)
+    if not frontier_points:
+        return SimulationResult(max_sharpe=max_sharpe, min_vol=min_vol,
+                                num_portfolios=0)
+    frontier = efficient_frontier_weights(mean_returns, cov_matrix,
+                                          frontier_points)
+    returns, stdevs, sharpes = evaluate_portfolios(
+        frontier, mean_returns, cov_matrix, periods
+    )
+    return SimulationResult(
+        max_sharpe=max_sharpe,
+        min_vol=min_vol,
+        num_portfolios=len(frontier),
+        returns=returns,
+        stdevs=stdevs,
+        sharpes=sharpes,
+    )
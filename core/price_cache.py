@@ -0,0 +1,179 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "pricescache"
+DEFAULT_MAX_AGE = timedelta(hours=12)
+
+
+class CachedPrices:
+    def __init__(self, frame, covered_from, fetched_at):
+        self.frame = frame
+        self.covered_from = covered_from
+        self.fetched_at = fetched_at
+
+    @property
+    def last_date(self):
+        return self.frame.index[-1]
+
+
+class PriceCache:
+    """Cache em disco (.npz por ticker) dos dados no formato do Yahoo.
+
+    `wrap` devolve um `data_reader_func` que so busca na fonte o intervalo
+    que falta: historico anterior ao ja coberto ou datas apos o ultimo
+    dado, quando o cache tem mais de `max_age`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE,
+                 clock=datetime.now):
+        self.path = path
+        self.max_age = max_age
+        self.clock = clock
+
+    def filename(self, ticker):
+        return os.path.join(self.path, f"{ticker}.npz")
+
+    def read(self, ticker):
+        filename = self.filename(ticker)
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename, allow_pickle=False) as data:
+            fields = [str(field) for field in data["fields"]]
+            frame = pd.DataFrame(
+                data["values"], columns=fields,
+                index=pd.DatetimeIndex(data["time"], name="Date"),
+            )
+            return CachedPrices(
+                frame,
+                covered_from=pd.Timestamp(int(data["covered_from"])),
+                fetched_at=datetime.fromtimestamp(float(data["fetched_at"])),
+            )
+
+    def write(self, ticker, frame, covered_from, fetched_at):
+        os.makedirs(self.path, exist_ok=True)
+        filename = self.filename(ticker)
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "wb") as file:
+            np.savez(
+                file,
+                time=frame.index.values.astype("datetime64[ns]")
+                .astype(np.int64),
+                values=frame.to_numpy(dtype=np.float64),
+                fields=np.array(list(frame.columns), dtype=str),
+                covered_from=np.int64(covered_from.value),
+                fetched_at=np.float64(fetched_at.timestamp()),
+            )
+        os.replace(tmp_filename, filename)
+
+    def clear(self):
+        if not os.path.isdir(self.path):
+            return
+        for file in os.listdir(self.path):
+            if file.endswith(".npz"):
+                os.remove(os.path.join(self.path, file))
+
+    def fetch_start(self, cached, start_date, now):
+        if cached is None or start_date < cached.covered_from:
+            return start_date
+        if now - cached.fetched_at > self.max_age:
+            # a ultima barra pode ter sido parcial, busca de novo a partir
+            # da penultima, que serve de emenda com o cache
+            return cached.frame.index[max(len(cached.frame) - 2, 0)]
+        return None
+
+    def wrap(self, reader_func, before_fetch=None):
+        def cached_reader(tickers, start_date):
+            return self.load(tickers, start_date, reader_func, before_fetch)
+
+        return cached_reader
+
+    def load(self, tickers, start_date, reader_func, before_fetch=None):
+        start_date = pd.Timestamp(start_date)
+        now = self.clock()
+        cached = {ticker: self.read(ticker) for ticker in tickers}
+
+        groups = defaultdict(list)
+        for ticker in tickers:
+            fetch_from = self.fetch_start(cached[ticker], start_date, now)
+            if fetch_from is not None:
+                groups[fetch_from].append(ticker)
+
+        if groups and before_fetch is not None:
+            before_fetch()
+        for fetch_from, group in groups.items():
+            fetched = reader_func(group, fetch_from.date())
+            for ticker in group:
+                self.update(ticker, cached, split_ticker(fetched, ticker,
+                                                         group),
+                            fetch_from, start_date, now)
+
+        frames = {
+            ticker: cached[ticker].frame.loc[start_date:]
+            for ticker in tickers
+            if cached[ticker] is not None
+        }
+        if not frames:
+            return pd.DataFrame()
+        wide = pd.concat(frames, axis=1)
+        return wide.swaplevel(axis=1).sort_index(axis=1, level=0,
+                                                 sort_remaining=False)
+
+    def update(self, ticker, cached, fetched, fetch_from, start_date, now):
+        previous = cached[ticker]
+        if fetched is None:
+            return
+        fetched = fetched.dropna(how="all")
+        if previous is not None and fetch_from >= previous.covered_from:
+            kept = rescale_adjusted(
+                previous.frame[previous.frame.index < fetch_from],
+                previous.frame, fetched, fetch_from,
+            )
+            frame = pd.concat([kept, fetched])
+            covered_from = previous.covered_from
+        else:
+            frame = fetched
+            covered_from = start_date
+        if frame.empty:
+            return
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        self.write(ticker, frame, covered_from, now)
+        cached[ticker] = CachedPrices(frame, covered_from, now)
+
+
+def rescale_adjusted(kept, cached_frame, fetched, seam):
+    """Reajusta o "Adj Close" do cache quando a fonte o reescalou.
+
+    O Yahoo reescala o historico ajustado a cada provento; se a barra da
+    emenda mudou, aplica ao trecho guardado o mesmo fator.
+    """
+    column = "Adj Close"
+    if (column not in kept or column not in fetched
+            or seam not in cached_frame.index or seam not in fetched.index):
+        return kept
+    factor = fetched.at[seam, column] / cached_frame.at[seam, column]
+    if not np.isfinite(factor) or np.isclose(factor, 1.0, rtol=1e-9,
+                                             atol=0.0):
+        return kept
+    kept = kept.copy()
+    kept[column] = kept[column] * factor
+    return kept
+
+
+def split_ticker(tickers_data, ticker, tickers):
+    """Colunas de um ticker no DataFrame largo (campo, ticker) do Yahoo."""
+    if tickers_data is None or len(tickers_data) == 0:
+        return None
+    if isinstance(tickers_data.columns, pd.MultiIndex):
+        if ticker not in tickers_data.columns.get_level_values(1):
+            return None
+        frame = tickers_data.xs(ticker, axis=1, level=1)
+    elif len(tickers) == 1:
+        frame = tickers_data
+    else:
+        return None
+    frame = frame.astype(np.float64)
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name="Date")
+    return frame
@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
+import pandas as pd
+
+# campo no Yahoo -> arquivo .npy do store
+STORE_FIELDS = {
+    "Adj Close": "close",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Volume": "volume",
+}
+DEFAULT_PRICES_DIR = "pricesdata"
+DEFAULT_WRITE_WORKERS = 4
+
+
+def cdataframes_to_wide(cdataframes):
+    """(time, tickers, {campo: matriz datas x tickers}) na uniao das datas."""
+    keys = [cdf.time for cdf in cdataframes]
+    time = np.unique(np.concatenate(keys)) if keys else \
+        np.empty(0, dtype=np.int64)
+    fields = {name: np.full((len(time), len(keys)), np.nan)
+              for name in STORE_FIELDS.values()}
+    for j, (cdf, key) in enumerate(zip(cdataframes, keys)):
+        positions = np.searchsorted(time, key)
+        for name, values in fields.items():
+            values[positions, j] = cdf.view(name)
+    return time, [cdf.ticker for cdf in cdataframes], fields
+
+
+class PriceStore:
+    """Store binario em colunas: uma matriz (datas x tickers) por campo.
+
+    Layout do diretorio: `time.npy` (int64, ns), `tickers.npy` e um
+    `<campo>.npy` por campo de STORE_FIELDS. As matrizes sao abertas com
+    `mmap_mode="r"`, entao so as colunas pedidas sao lidas do disco.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def filename(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def exists(self):
+        return os.path.exists(self.filename("time"))
+
+    def open(self, name):
+        return np.load(self.filename(name), mmap_mode="r")
+
+    @property
+    def tickers(self):
+        return [str(ticker) for ticker in np.load(self.filename("tickers"))]
+
+    @property
+    def time(self):
+        return self.open("time")
+
+    def write(self, time, tickers, fields):
+        os.makedirs(self.path, exist_ok=True)
+        np.save(self.filename("time"), np.asarray(time, dtype=np.int64))
+        np.save(self.filename("tickers"), np.array(tickers, dtype=str))
+        for name, values in fields.items():
+            np.save(self.filename(name),
+                    np.ascontiguousarray(values, dtype=np.float64))
+
+    def write_cdataframes(self, cdataframes):
+        self.write(*cdataframes_to_wide(cdataframes))
+
+    def read(self, tickers, start_date=None):
+        stored = {ticker: i for i, ticker in enumerate(self.tickers)}
+        selected, columns = [], []
+        for ticker in tickers:
+            for candidate in ticker_candidates(ticker):
+                if candidate in stored:
+                    selected.append(ticker)
+                    columns.append(stored[candidate])
+                    break
+        time = self.time
+        first = 0
+        if start_date is not None:
+            start = pd.Timestamp(start_date).value
+            first = int(np.searchsorted(time, start, side="left"))
+        index = pd.DatetimeIndex(np.asarray(time[first:])
+                                 .astype("datetime64[ns]"), name="Date")
+        frames = {}
+        for field, name in STORE_FIELDS.items():
+            values = self.open(name)[first:, columns]
+            frames[field] = pd.DataFrame(values, index=index,
+                                         columns=selected)
+        return pd.concat(frames, axis=1)
+
+
+class PartitionedPriceStore:
+    """Varios PriceStore, um por ano, em `<path>/<ano>/`.
+
+    E o export em lote de save_prices: o universo inteiro fica em poucos
+    arquivos grandes em vez de um CSV por ticker. `append` nunca
+    sobrescreve o que ja foi gravado: so preenche celulas vazias (datas
+    novas, tickers novos ou buracos de exports em que um ticker faltou),
+    reescrevendo apenas os anos que mudaram, cada um numa thread.
+    """
+
+    def __init__(self, path, workers=DEFAULT_WRITE_WORKERS):
+        self.path = path
+        self.workers = workers
+
+    def partitions(self):
+        if not os.path.isdir(self.path):
+            return []
+        years = sorted(int(name) for name in os.listdir(self.path)
+                       if name.isdigit())
+        return [year for year in years
+                if self.partition(year).exists()]
+
+    def partition(self, year):
+        return PriceStore(os.path.join(self.path, str(year)))
+
+    def exists(self):
+        return bool(self.partitions())
+
+    @property
+    def tickers(self):
+        tickers = {}
+        for year in self.partitions():
+            tickers.update(dict.fromkeys(self.partition(year).tickers))
+        return list(tickers)
+
+    @staticmethod
+    def years(time):
+        return time.view("datetime64[ns]").astype("datetime64[Y]") \
+            .astype(np.int64) + 1970
+
+    def write_cdataframes(self, cdataframes, append=True):
+        """Grava os CDataFrames; devolve os anos reescritos."""
+        time, tickers, fields = cdataframes_to_wide(cdataframes)
+        years = self.years(time)
+        tasks = []
+        for year in np.unique(years):
+            rows = years == year
+            tasks.append((int(year), time[rows], tickers,
+                          {name: values[rows]
+                           for name, values in fields.items()}, append))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            written = list(executor.map(
+                lambda task: self.merge_partition(*task), tasks))
+        return [task[0] for task, changed in zip(tasks, written) if changed]
+
+    def merge_partition(self, year, time, tickers, fields, append=True):
+        """Grava um ano; devolve se o arquivo mudou."""
+        store = self.partition(year)
+        if not append or not store.exists():
+            store.write(time, tickers, fields)
+            return True
+        # o que ja esta gravado fica; do novo so entram celulas vazias,
+        # por ticker, entao um ticker que faltou num export e completado
+        # no seguinte
+        old_time = np.asarray(store.time)
+        old_tickers = store.tickers
+        merged_time = np.union1d(old_time, time)
+        merged_tickers = old_tickers + [ticker for ticker in tickers
+                                        if ticker not in old_tickers]
+        positions = {ticker: j for j, ticker in enumerate(merged_tickers)}
+        old_rows = np.searchsorted(merged_time, old_time)
+        cells = np.ix_(np.searchsorted(merged_time, time),
+                       [positions[ticker] for ticker in tickers])
+        changed = False
+        merged = {}
+        for name, values in fields.items():
+            matrix = np.full((len(merged_time), len(merged_tickers)), np.nan)
+            matrix[old_rows, :len(old_tickers)] = store.open(name)
+            block = matrix[cells]
+            fill = np.isnan(block) & ~np.isnan(values)
+            if fill.any():
+                changed = True
+                block[fill] = values[fill]
+                matrix[cells] = block
+            merged[name] = matrix
+        if changed:
+            store.write(merged_time, merged_tickers, merged)
+        return changed
+
+    def read(self, tickers, start_date=None):
+        partitions = self.partitions()
+        if start_date is not None:
+            first_year = pd.Timestamp(start_date).year
+            # sem anos depois do inicio: o ultimo devolve o frame vazio
+            partitions = [year for year in partitions
+                          if year >= first_year] or partitions[-1:]
+        frames = [self.partition(year).read(tickers, start_date)
+                  for year in partitions]
+        frame = pd.concat(frames)
+        selected = [ticker for ticker in tickers
+                    if ticker in frame.columns.get_level_values(1)]
+        return frame.reindex(columns=pd.MultiIndex.from_product(
+            [list(STORE_FIELDS), selected]))
+
+
+def ticker_candidates(ticker):
+    # save_prices grava o ticker sem o sufixo que o Yahoo usa
+    if ticker.endswith(".SA"):
+        return [ticker, ticker[:-len(".SA")]]
+    return [ticker]
+
+
+def read_prices_csv(path, ticker):
+    """Le o `prices_<ticker>.csv` gerado por DataService.save_prices."""
+    for candidate in ticker_candidates(ticker):
+        filename = os.path.join(path, f"prices_{candidate}.csv")
+        if os.path.exists(filename):
+            df = pd.read_csv(filename, index_col=0, parse_dates=True)
+            return df.iloc[:, 0].rename(ticker)
+    return None
+
+
+class FileDataReader:
+    """`data_reader_func` que le precos locais no formato do Yahoo.
+
+    Usa o PriceStore binario se existir em `path`; se nao, os arquivos
+    `prices_<ticker>.csv` do layout de save_prices (so fechamento, que
+    tambem preenche open/high/low).
+    """
+
+    def __init__(self, path=DEFAULT_PRICES_DIR):
+        self.path = path
+        self.store = PriceStore(path)
+        self.partitioned_store = PartitionedPriceStore(path)
+
+    def __call__(self, tickers, start_date=None):
+        if self.store.exists():
+            return self.store.read(tickers, start_date)
+        if self.partitioned_store.exists():
+            return self.partitioned_store.read(tickers, start_date)
+        return self.read_csv_dir(tickers, start_date)
+
+    def read_csv_dir(self, tickers, start_date=None):
+        closes = [read_prices_csv(self.path, ticker) for ticker in tickers]
+        closes = pd.concat([close for close in closes if close is not None],
+                           axis=1)
+        closes.index.name = "Date"
+        if start_date is not None:
+            closes = closes.loc[pd.Timestamp(start_date):]
+        volume = pd.DataFrame(np.nan, index=closes.index,
+                              columns=closes.columns)
+        frames = {field: closes for field in STORE_FIELDS}
+        frames["Volume"] = volume
+        return pd.concat(frames, axis=1)
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+
+REPORTS_DIR = "reports"
+DEFAULT_MAX_POINTS = 5000
+
+
+def report_filename(stocks, path=REPORTS_DIR):
+    name = "-".join(stocks[:5])
+    return os.path.join(path, f"simulador-markowitz_{name}.png")
+
+
+def downsample(stdevs, returns, sharpes, max_points=DEFAULT_MAX_POINTS):
+    # carteiras sorteadas sao iid: um passo fixo ja representa a nuvem
+    if max_points is None or len(stdevs) <= max_points:
+        return stdevs, returns, sharpes
+    idx = np.linspace(0, len(stdevs) - 1, max_points).astype(np.int64)
+    return stdevs[idx], returns[idx], sharpes[idx]
+
+
+def report_points(simulation, max_points=DEFAULT_MAX_POINTS):
+    # sem os resultados completos (processos ou stream) so a fronteira
+    if simulation.returns is not None:
+        points = (simulation.stdevs, simulation.returns, simulation.sharpes)
+    elif simulation.frontier is not None:
+        points = simulation.frontier.points()
+    else:
+        points = (np.empty(0), np.empty(0), np.empty(0))
+    return downsample(*points, max_points=max_points)
+
+
+def render_report(filename, stdevs, returns, sharpes, max_sharpe, min_vol):
+    """Desenha a nuvem numa Figure propria com backend Agg (sem pyplot)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    # create scatter plot coloured by Sharpe Ratio
+    scatter = axes.scatter(stdevs, returns, c=sharpes, cmap="RdYlBu")
+    axes.set_xlabel("Volatility")
+    axes.set_ylabel("Returns")
+    figure.colorbar(scatter, ax=axes)
+    # red star: highest Sharpe Ratio, green star: minimum variance
+    axes.scatter(max_sharpe.stdev, max_sharpe.ret,
+                 marker=(5, 1, 0), color="r", s=1000)
+    axes.scatter(min_vol.stdev, min_vol.ret,
+                 marker=(5, 1, 0), color="g", s=1000)
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    figure.savefig(filename)
+    return filename
+
+
+def render_markowitz_report(simulation, stocks, filename=None,
+                            max_points=DEFAULT_MAX_POINTS, executor=None):
+    """Gera o PNG do resultado; com `executor` devolve um Future.
+
+    Os pontos sao reduzidos antes de sair da chamada, entao a thread de
+    fundo nao segura os arrays completos da simulacao.
+    """
+    if filename is None:
+        filename = report_filename(stocks)
+    stdevs, returns, sharpes = report_points(simulation, max_points)
+    args = (filename, stdevs, returns, sharpes,
+            simulation.max_sharpe, simulation.min_vol)
+    if executor is not None:
+        return executor.submit(render_report, *args)
+    return render_report(*args)
@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+from core.cdataframe import TRADING_DAYS
+from core.optimizer import max_sharpe_weights, min_variance_weights
+from core.simulation import (Candidate, SimulationResult,
+                             evaluate_portfolios)
+
+DEFAULT_RESAMPLES = 500
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_BATCH_SIZE = 50
+
+
+@dataclass
+class ResampledResult(SimulationResult):
+    """Pesos medios das reamostragens e o intervalo de cada peso.
+
+    `max_sharpe`/`min_vol` usam os pesos medios avaliados na amostra
+    inteira; returns/stdevs/sharpes sao as carteiras de max sharpe de
+    cada reamostragem, tambem na amostra inteira. Os intervalos tem forma
+    (2, N): limites inferior e superior em `confidence`.
+    """
+
+    max_sharpe_interval: np.ndarray = field(default=None, repr=False)
+    min_vol_interval: np.ndarray = field(default=None, repr=False)
+    confidence: float = DEFAULT_CONFIDENCE
+
+
+def bootstrap_counts(random_state, num_resamples, num_rows):
+    # quantas vezes cada linha aparece em cada reamostragem (B, T)
+    rows = random_state.integers(0, num_rows, (num_resamples, num_rows))
+    offsets = np.arange(num_resamples)[:, np.newaxis] * num_rows
+    counts = np.bincount((rows + offsets).ravel(),
+                         minlength=num_resamples * num_rows)
+    return counts.reshape(num_resamples, num_rows).astype(np.float64)
+
+
+def bootstrap_moments(returns, counts):
+    """Medias (B, N) e covariancias (B, N, N) das reamostragens em lote.
+
+    Cada reamostragem e um peso por linha, entao sum(r r') vira um
+    produto R' diag(c) R, feito para o lote inteiro com matmul.
+    """
+    num_rows = returns.shape[0]
+    means = counts @ returns / num_rows
+    weighted = np.sqrt(counts)[:, :, np.newaxis] * returns
+    products = np.matmul(weighted.transpose(0, 2, 1), weighted)
+    outer = means[:, :, np.newaxis] * means[:, np.newaxis, :]
+    covs = (products - num_rows * outer) / (num_rows - 1)
+    return means, covs
+
+
+def _optimize_resamples(returns, counts):
+    # executado em cada processo: momentos do lote e um QP por reamostragem
+    means, covs = bootstrap_moments(returns, counts)
+    max_sharpe = np.empty_like(means)
+    min_vol = np.empty_like(means)
+    previous_sharpe = previous_vol = None
+    for b in range(len(means)):
+        # partida quente: reamostragens vizinhas tem suportes parecidos
+        max_sharpe[b] = previous_sharpe = max_sharpe_weights(
+            means[b], covs[b], initial_weights=previous_sharpe)
+        min_vol[b] = previous_vol = min_variance_weights(
+            covs[b], initial_weights=previous_vol)
+    return max_sharpe, min_vol
+
+
+def _summarize(weights, mean_returns, cov_matrix, confidence, periods):
+    average = weights.mean(axis=0)
+    average /= average.sum()
+    tail = (1 - confidence) / 2 * 100
+    interval = np.percentile(weights, [tail, 100 - tail], axis=0)
+    ret, stdev, sharpe = evaluate_portfolios(
+        average[np.newaxis, :], mean_returns, cov_matrix, periods
+    )
+    return Candidate(ret[0], stdev[0], sharpe[0], average), interval
+
+
+def resample_portfolios(returns, num_resamples=DEFAULT_RESAMPLES, seed=None,
+                        workers=None, confidence=DEFAULT_CONFIDENCE,
+                        batch_size=DEFAULT_BATCH_SIZE, periods=TRADING_DAYS):
+    """Fronteira reamostrada (Michaud): bootstrap das linhas de `returns`.
+
+    As `num_resamples` reamostragens sao sorteadas de uma vez a partir de
+    `seed` e processadas em lotes de `batch_size`; com `workers` os lotes
+    vao para um pool de processos e o resultado nao muda.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    counts = bootstrap_counts(np.random.default_rng(seed), num_resamples,
+                              len(returns))
+    batches = [counts[i:i + batch_size]
+               for i in range(0, num_resamples, batch_size)]
+    if workers is None or workers <= 1:
+        results = [_optimize_resamples(returns, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_optimize_resamples,
+                                        [returns] * len(batches), batches))
+    max_sharpe_weights_all = np.concatenate([r[0] for r in results])
+    min_vol_weights_all = np.concatenate([r[1] for r in results])
+
+    mean_returns = returns.mean(axis=0)
+    cov_matrix = np.cov(returns, rowvar=False).reshape(returns.shape[1], -1)
+    max_sharpe, max_sharpe_interval = _summarize(
+        max_sharpe_weights_all, mean_returns, cov_matrix, confidence, periods
+    )
+    min_vol, min_vol_interval = _summarize(
+        min_vol_weights_all, mean_returns, cov_matrix, confidence, periods
+    )
+    cloud = evaluate_portfolios(max_sharpe_weights_all, mean_returns,
+                                cov_matrix, periods)
+    return ResampledResult(
+        max_sharpe=max_sharpe,
+        min_vol=min_vol,
+        num_portfolios=num_resamples,
+        returns=cloud[0],
+        stdevs=cloud[1],
+        sharpes=cloud[2],
+        max_sharpe_interval=max_sharpe_interval,
+        min_vol_interval=min_vol_interval,
+        confidence=confidence,
+    )
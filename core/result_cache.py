@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import numpy as np
+from core.report import DEFAULT_MAX_POINTS, report_points
+from core.resampling import ResampledResult
+from core.simulation import Candidate, SimulationResult
+
+DEFAULT_RESULT_CACHE_DIR = "resultscache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def result_key(close_prices_df, params):
+    """sha256 da matriz de precos (datas, tickers, valores) e parametros."""
+    digest = hashlib.sha256()
+    time = close_prices_df.index.values.astype("datetime64[ns]")
+    digest.update(np.ascontiguousarray(time.view(np.int64)).tobytes())
+    digest.update("\0".join(map(str, close_prices_df.columns)).encode())
+    digest.update(np.ascontiguousarray(
+        close_prices_df.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def report_stat(filename):
+    stat = os.stat(filename)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+@dataclass
+class CachedResult:
+    simulation: SimulationResult
+    report: str = None
+    report_stat: np.ndarray = None
+
+    def report_is_current(self):
+        # o PNG so vale se ninguem o regravou depois (mesmo nome por ativos)
+        if not self.report or not os.path.exists(self.report):
+            return False
+        return np.array_equal(report_stat(self.report), self.report_stat)
+
+
+class ResultCache:
+    """Resultados de `calculate` em disco, um .npz por chave, com LRU.
+
+    Guarda os melhores portfolios, uma amostra de ate `max_points` pontos
+    da nuvem/fronteira (float32) e o caminho do PNG. O uso e marcado no
+    mtime do arquivo; passando de `max_bytes` os menos usados saem.
+    """
+
+    def __init__(self, path=DEFAULT_RESULT_CACHE_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def filename(self, key):
+        return os.path.join(self.path, f"{key}.npz")
+
+    def get(self, key):
+        filename = self.filename(key)
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename, allow_pickle=False) as data:
+            summary, weights = data["summary"], data["weights"]
+            max_sharpe, min_vol = (
+                Candidate(*summary[i, :3], weights[i], int(summary[i, 3]))
+                for i in range(2)
+            )
+            converged = int(data["converged"])
+            fields = dict(
+                max_sharpe=max_sharpe,
+                min_vol=min_vol,
+                num_portfolios=int(data["num_portfolios"]),
+                returns=data["returns"].astype(np.float64),
+                stdevs=data["stdevs"].astype(np.float64),
+                sharpes=data["sharpes"].astype(np.float64),
+                converged=None if converged < 0 else bool(converged),
+            )
+            confidence = float(data["confidence"]) \
+                if "confidence" in data.files else -1.0
+            if confidence < 0:
+                simulation = SimulationResult(**fields)
+            else:
+                simulation = ResampledResult(
+                    **fields,
+                    max_sharpe_interval=data["max_sharpe_interval"],
+                    min_vol_interval=data["min_vol_interval"],
+                    confidence=confidence,
+                )
+            report = str(data["report"]) or None
+            cached = CachedResult(simulation, report, data["report_stat"])
+        os.utime(filename)
+        return cached
+
+    def put(self, key, simulation, report=None,
+            max_points=DEFAULT_MAX_POINTS):
+        os.makedirs(self.path, exist_ok=True)
+        stdevs, returns, sharpes = report_points(simulation, max_points)
+        candidates = [simulation.max_sharpe, simulation.min_vol]
+        converged = -1 if simulation.converged is None else \
+            int(simulation.converged)
+        # intervalos dos pesos so existem na fronteira reamostrada
+        resampled = isinstance(simulation, ResampledResult)
+        no_interval = np.zeros((0, len(simulation.max_sharpe.weights)))
+        filename = self.filename(key)
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "wb") as file:
+            np.savez_compressed(
+                file,
+                summary=np.array([[c.ret, c.stdev, c.sharpe, c.index]
+                                  for c in candidates], dtype=np.float64),
+                weights=np.array([c.weights for c in candidates]),
+                num_portfolios=np.int64(simulation.num_portfolios),
+                converged=np.int64(converged),
+                stdevs=np.asarray(stdevs, dtype=np.float32),
+                returns=np.asarray(returns, dtype=np.float32),
+                sharpes=np.asarray(sharpes, dtype=np.float32),
+                report=np.array(report or ""),
+                report_stat=report_stat(report) if report else
+                np.zeros(2, dtype=np.int64),
+                confidence=np.float64(simulation.confidence if resampled
+                                      else -1.0),
+                max_sharpe_interval=simulation.max_sharpe_interval
+                if resampled else no_interval,
+                min_vol_interval=simulation.min_vol_interval
+                if resampled else no_interval,
+            )
+        os.replace(tmp_filename, filename)
+        self.evict()
+
+    def entries(self):
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for file in os.listdir(self.path):
+            if file.endswith(".npz"):
+                stat = os.stat(os.path.join(self.path, file))
+                entries.append((stat.st_mtime_ns, stat.st_size, file))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, file in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.path, file))
+            total -= size
+
+    def clear(self):
+        for _, _, file in self.entries():
+            os.remove(os.path.join(self.path, file))
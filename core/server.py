@@ -0,0 +1,218 @@
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+from core.batch import optimize_basket
+from core.stats_index import returns_matrix
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8750
+DEFAULT_REFRESH_SECONDS = 15 * 60
+METHODS = ("optimizer", "montecarlo")
+
+
+class MarketSnapshot:
+    """Precos unidos, retornos e media/covariancia do periodo inteiro.
+
+    E imutavel: o refresh monta um novo e troca a referencia, entao uma
+    requisicao em andamento nunca ve dados pela metade.
+    """
+
+    def __init__(self, close_prices_df, loaded_at):
+        returns = returns_matrix(close_prices_df)
+        self.prices = close_prices_df
+        self.index = returns.index
+        self.columns = list(returns.columns)
+        self.positions = {ticker: i for i, ticker in enumerate(self.columns)}
+        self.returns = returns.to_numpy(dtype=np.float64)
+        self.mean = self.returns.mean(axis=0)
+        # com um ticker so o np.cov devolve um escalar
+        self.cov = np.cov(self.returns, rowvar=False).reshape(
+            len(self.columns), -1)
+        self.loaded_at = loaded_at
+
+    def stats(self, tickers, start=None, end=None):
+        unknown = [ticker for ticker in tickers
+                   if ticker not in self.positions]
+        if unknown:
+            raise ValueError(f"tickers sem dados: {unknown}")
+        positions = [self.positions[ticker] for ticker in tickers]
+        if start is None and end is None:
+            mean = self.mean[positions]
+            cov = self.cov[np.ix_(positions, positions)]
+        else:
+            # janela: O(linhas * k^2) so nos tickers pedidos
+            first = 0 if start is None else \
+                self.index.searchsorted(pd.Timestamp(start))
+            last = len(self.index) if end is None else \
+                self.index.searchsorted(pd.Timestamp(end), side="right")
+            if last - first < 2:
+                raise ValueError("janela precisa de pelo menos 2 retornos")
+            window = self.returns[first:last, positions]
+            mean = window.mean(axis=0)
+            cov = np.cov(window, rowvar=False).reshape(len(positions), -1)
+        return (pd.Series(mean, index=tickers),
+                pd.DataFrame(cov, index=tickers, columns=tickers))
+
+    def describe(self):
+        dates = [date.isoformat() for date in self.index[[0, -1]]] \
+            if len(self.index) else [None, None]
+        return {
+            "tickers": self.columns,
+            "rows": len(self.index),
+            "first_date": dates[0],
+            "last_date": dates[1],
+            "loaded_at": self.loaded_at,
+        }
+
+
+class OptimizationService:
+    """Mantem os dados quentes e atende otimizacoes num pool de processos.
+
+    `loader()` devolve o DataFrame de precos unidos (datas x tickers); com
+    o cache de precos ele so busca as datas novas, entao o refresh em
+    segundo plano e incremental. `workers=0` otimiza na propria thread.
+    """
+
+    def __init__(self, loader, workers=None,
+                 refresh_seconds=DEFAULT_REFRESH_SECONDS, clock=time.time):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.executor = None
+        if workers != 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.snapshot = None
+        self.refresh_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.refresh_thread = None
+
+    def refresh(self):
+        with self.refresh_lock:
+            snapshot = MarketSnapshot(self.loader(), self.clock())
+            self.snapshot = snapshot
+        return snapshot
+
+    def refresh_loop(self):
+        while not self.stopped.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as error:
+                # mantem os dados anteriores ate a proxima tentativa
+                print(f"erro ao atualizar os dados: {error!r}")
+
+    def start(self):
+        if self.snapshot is None:
+            self.refresh()
+        if self.refresh_seconds and self.refresh_thread is None:
+            self.refresh_thread = threading.Thread(target=self.refresh_loop,
+                                                   daemon=True)
+            self.refresh_thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def optimize(self, request):
+        snapshot = self.snapshot
+        tickers = request.get("tickers") or snapshot.columns
+        method = request.get("method", "optimizer")
+        if method not in METHODS:
+            raise ValueError(f"metodo desconhecido: {method}")
+        mean, cov = snapshot.stats(tickers, request.get("start"),
+                                   request.get("end"))
+        options = {"method": method,
+                   "num_portfolios": int(request.get("num_portfolios",
+                                                     25000)),
+                   "seed": request.get("seed")}
+        task = ("request", mean, cov, options)
+        if self.executor is None:
+            rows = optimize_basket(task)
+        else:
+            rows = self.executor.submit(optimize_basket, task).result()
+        response = {"method": method, "tickers": list(tickers),
+                    "last_date": snapshot.describe()["last_date"]}
+        for row in rows:
+            portfolio = row.pop("portfolio")
+            row.pop("basket")
+            response[portfolio] = {
+                "ret": float(row.pop("ret")),
+                "stdev": float(row.pop("stdev")),
+                "sharpe": float(row.pop("sharpe")),
+                "weights": {ticker: float(weight)
+                            for ticker, weight in row.items()},
+            }
+        return response
+
+
+class OptimizationHandler(BaseHTTPRequestHandler):
+    """GET /health, POST /optimize (JSON) e POST /refresh."""
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self.send_json(404, {"error": "rota desconhecida"})
+        self.send_json(200, self.server.service.snapshot.describe())
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            if self.path == "/optimize":
+                started = time.perf_counter()
+                response = service.optimize(self.read_json())
+                response["elapsed_seconds"] = time.perf_counter() - started
+                return self.send_json(200, response)
+            if self.path == "/refresh":
+                return self.refresh(service)
+            return self.send_json(404, {"error": "rota desconhecida"})
+        except (ValueError, KeyError, TypeError) as error:
+            return self.send_json(400, {"error": str(error)})
+
+    def refresh(self, service):
+        try:
+            snapshot = service.refresh()
+        except Exception as error:
+            # falha da fonte: segue servindo os dados anteriores
+            return self.send_json(502, {
+                "error": f"erro ao atualizar os dados: {error!r}"})
+        return self.send_json(200, snapshot.describe())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), OptimizationHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    service.start()
+    server = build_server(service, host, port)
+    print(f"servindo em http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,362 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+from core.cdataframe import TRADING_DAYS
+from core.covariance import (FactorCovariance, as_covariance,
+                             covariance_diagonal)
+
+DEFAULT_BLOCK_SIZE = 20000
+DEFAULT_ADAPTIVE_BLOCK_SIZE = 2000
+DEFAULT_CONCENTRATION = 1.0
+DEFAULT_EXPLOIT = 0.5
+DEFAULT_FOCUS = 200.0
+DEFAULT_TOLERANCE = 1e-4
+DEFAULT_PATIENCE = 3
+
+
+@dataclass
+class Candidate:
+    ret: float
+    stdev: float
+    sharpe: float
+    weights: np.ndarray
+    index: int = 0
+
+
+@dataclass
+class SimulationResult:
+    max_sharpe: Candidate
+    min_vol: Candidate
+    num_portfolios: int
+    returns: np.ndarray = field(default=None, repr=False)
+    stdevs: np.ndarray = field(default=None, repr=False)
+    sharpes: np.ndarray = field(default=None, repr=False)
+    frontier: "FrontierEnvelope" = field(default=None, repr=False)
+    converged: bool = None
+
+
+def get_random_state(seed=None):
+    # sem seed usa o gerador global, como o loop original fazia
+    if seed is None:
+        return np.random
+    return np.random.RandomState(seed)
+
+
+def draw_weights(random_state, size, num_stocks):
+    # uma matriz (size, num_stocks) consome o stream na mesma ordem que
+    # `size` chamadas de random(num_stocks)
+    weights = random_state.random((size, num_stocks))
+    weights /= weights.sum(axis=1, keepdims=True)
+    return weights
+
+
+def evaluate_portfolios(weights, mean_returns, cov_matrix,
+                        periods=TRADING_DAYS):
+    returns = weights @ mean_returns * periods
+    if isinstance(cov_matrix, FactorCovariance):
+        variances = cov_matrix.portfolio_variances(weights)
+    else:
+        variances = np.einsum("ij,ij->i", weights @ cov_matrix, weights)
+    stdevs = np.sqrt(variances) * np.sqrt(periods)
+    return returns, stdevs, returns / stdevs
+
+
+def _is_better(candidate, current, key, sign):
+    # empate fica com o menor indice global, igual ao idxmax/idxmin
+    if current is None:
+        return True
+    value = sign * getattr(candidate, key)
+    current_value = sign * getattr(current, key)
+    if value != current_value:
+        return value > current_value
+    return candidate.index < current.index
+
+
+class BestPortfolios:
+    def __init__(self):
+        self.max_sharpe = None
+        self.min_vol = None
+
+    def update(self, weights, returns, stdevs, sharpes, offset=0):
+        i = int(np.nanargmax(sharpes))
+        self.add_max_sharpe(Candidate(
+            returns[i], stdevs[i], sharpes[i], weights[i].copy(), offset + i
+        ))
+        j = int(np.nanargmin(stdevs))
+        self.add_min_vol(Candidate(
+            returns[j], stdevs[j], sharpes[j], weights[j].copy(), offset + j
+        ))
+
+    def add_max_sharpe(self, candidate):
+        if _is_better(candidate, self.max_sharpe, "sharpe", 1):
+            self.max_sharpe = candidate
+
+    def add_min_vol(self, candidate):
+        if _is_better(candidate, self.min_vol, "stdev", -1):
+            self.min_vol = candidate
+
+    def merge(self, other):
+        if other.max_sharpe is not None:
+            self.add_max_sharpe(other.max_sharpe)
+        if other.min_vol is not None:
+            self.add_min_vol(other.min_vol)
+
+
+class FrontierEnvelope:
+    """Maior retorno por faixa de volatilidade, com tamanho fixo."""
+
+    def __init__(self, num_bins, max_stdev):
+        self.num_bins = num_bins
+        self.max_stdev = max_stdev
+        self.returns = np.full(num_bins, -np.inf)
+        self.stdevs = np.full(num_bins, np.nan)
+
+    def update(self, returns, stdevs):
+        valid = np.isfinite(returns) & np.isfinite(stdevs)
+        returns, stdevs = returns[valid], stdevs[valid]
+        if len(returns) == 0:
+            return
+        bins = (stdevs / self.max_stdev * self.num_bins).astype(np.int64)
+        bins = np.clip(bins, 0, self.num_bins - 1)
+        # ultimo elemento de cada faixa apos ordenar por (faixa, retorno)
+        order = np.lexsort((returns, bins))
+        sorted_bins = bins[order]
+        is_last = np.append(sorted_bins[1:] != sorted_bins[:-1], True)
+        top = order[is_last]
+        top_bins = bins[top]
+        better = returns[top] > self.returns[top_bins]
+        self.returns[top_bins[better]] = returns[top][better]
+        self.stdevs[top_bins[better]] = stdevs[top][better]
+
+    def merge(self, other):
+        filled = np.isfinite(other.returns)
+        self.update(other.returns[filled], other.stdevs[filled])
+
+    def points(self):
+        filled = np.isfinite(self.returns)
+        returns = self.returns[filled]
+        stdevs = self.stdevs[filled]
+        return stdevs, returns, returns / stdevs
+
+
+def max_portfolio_stdev(cov_matrix, periods=TRADING_DAYS):
+    # carteira long-only nunca e mais volatil que o ativo mais volatil
+    return np.sqrt(np.max(covariance_diagonal(cov_matrix)) * periods)
+
+
+def simulate_portfolios(mean_returns, cov_matrix, num_portfolios,
+                        seed=None, block_size=DEFAULT_BLOCK_SIZE,
+                        workers=None, frontier_bins=0, stream=False,
+                        periods=TRADING_DAYS):
+    """Simula `num_portfolios` carteiras aleatorias em blocos.
+
+    Com `stream=True` nenhum array do tamanho de `num_portfolios` e
+    alocado: so os melhores candidatos e o envelope da fronteira
+    (`frontier_bins` faixas) sao mantidos, entao a memoria de pico nao
+    cresce com o numero de carteiras.
+
+    Sem `workers` o `seed` segue o stream do RandomState (o mesmo do loop
+    original). Com qualquer `workers`, inclusive 1, os sorteios usam
+    streams por bloco (SeedSequence): o resultado e o mesmo para qualquer
+    numero de workers, mas difere do modo sem `workers` para o mesmo seed.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = as_covariance(cov_matrix)
+    if workers is not None:
+        return simulate_portfolios_parallel(
+            mean_returns, cov_matrix, num_portfolios, seed=seed,
+            block_size=block_size, workers=workers,
+            frontier_bins=frontier_bins, periods=periods,
+        )
+    num_stocks = len(mean_returns)
+    random_state = get_random_state(seed)
+
+    returns = stdevs = sharpes = None
+    if not stream:
+        returns = np.empty(num_portfolios)
+        stdevs = np.empty(num_portfolios)
+        sharpes = np.empty(num_portfolios)
+    frontier = None
+    if frontier_bins:
+        frontier = FrontierEnvelope(frontier_bins,
+                                    max_portfolio_stdev(cov_matrix, periods))
+    best = BestPortfolios()
+    for start in range(0, num_portfolios, block_size):
+        stop = min(start + block_size, num_portfolios)
+        weights = draw_weights(random_state, stop - start, num_stocks)
+        block = evaluate_portfolios(weights, mean_returns, cov_matrix,
+                                    periods)
+        best.update(weights, *block, offset=start)
+        if frontier is not None:
+            frontier.update(block[0], block[1])
+        if not stream:
+            returns[start:stop] = block[0]
+            stdevs[start:stop] = block[1]
+            sharpes[start:stop] = block[2]
+
+    return SimulationResult(
+        max_sharpe=best.max_sharpe,
+        min_vol=best.min_vol,
+        num_portfolios=num_portfolios,
+        returns=returns,
+        stdevs=stdevs,
+        sharpes=sharpes,
+        frontier=frontier,
+    )
+
+
+def _simulate_blocks(mean_returns, cov_matrix, blocks, frontier_bins,
+                     periods=TRADING_DAYS):
+    # executado em cada processo: devolve so os melhores candidatos
+    num_stocks = len(mean_returns)
+    best = BestPortfolios()
+    frontier = None
+    if frontier_bins:
+        frontier = FrontierEnvelope(frontier_bins,
+                                    max_portfolio_stdev(cov_matrix, periods))
+    for start, size, seed_sequence in blocks:
+        random_state = np.random.default_rng(seed_sequence)
+        weights = draw_weights(random_state, size, num_stocks)
+        block = evaluate_portfolios(weights, mean_returns, cov_matrix,
+                                    periods)
+        best.update(weights, *block, offset=start)
+        if frontier is not None:
+            frontier.update(block[0], block[1])
+    return best, frontier
+
+
+def simulate_portfolios_parallel(mean_returns, cov_matrix, num_portfolios,
+                                 seed=None, block_size=DEFAULT_BLOCK_SIZE,
+                                 workers=1, frontier_bins=0,
+                                 periods=TRADING_DAYS):
+    """Divide os sorteios em blocos com streams independentes.
+
+    Cada bloco tem seu proprio SeedSequence derivado de `seed`, entao o
+    resultado depende de `seed` e `block_size`, nunca de `workers`.
+    """
+    starts = range(0, num_portfolios, block_size)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(starts))
+    blocks = [
+        (start, min(block_size, num_portfolios - start), seed_sequence)
+        for start, seed_sequence in zip(starts, seed_sequences)
+    ]
+    workers = max(1, min(workers, len(blocks)))
+    chunks = [blocks[i::workers] for i in range(workers)]
+
+    if workers == 1:
+        partials = [_simulate_blocks(mean_returns, cov_matrix, blocks,
+                                     frontier_bins, periods)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(
+                _simulate_blocks,
+                [mean_returns] * workers,
+                [cov_matrix] * workers,
+                chunks,
+                [frontier_bins] * workers,
+                [periods] * workers,
+            ))
+
+    best, frontier = partials[0]
+    for other_best, other_frontier in partials[1:]:
+        best.merge(other_best)
+        if frontier is not None:
+            frontier.merge(other_frontier)
+
+    return SimulationResult(
+        max_sharpe=best.max_sharpe,
+        min_vol=best.min_vol,
+        num_portfolios=num_portfolios,
+        frontier=frontier,
+    )
+
+
+def _converged(previous, current, key, tolerance):
+    old, new = getattr(previous, key), getattr(current, key)
+    return abs(new - old) <= tolerance * max(abs(old), 1e-12)
+
+
+def draw_weights_around(random_state, size, weights, concentration):
+    # Dirichlet com media em `weights`; quanto maior `concentration`,
+    # mais perto dela; o piso mantem todos os ativos alcancaveis
+    alpha = concentration * (weights + 1e-3 / len(weights))
+    return random_state.dirichlet(alpha, size)
+
+
+def simulate_portfolios_adaptive(mean_returns, cov_matrix, max_portfolios,
+                                 seed=None,
+                                 block_size=DEFAULT_ADAPTIVE_BLOCK_SIZE,
+                                 concentration=DEFAULT_CONCENTRATION,
+                                 exploit=DEFAULT_EXPLOIT, focus=DEFAULT_FOCUS,
+                                 tolerance=DEFAULT_TOLERANCE,
+                                 patience=DEFAULT_PATIENCE, frontier_bins=0,
+                                 stream=False, periods=TRADING_DAYS):
+    """Amostragem Dirichlet adaptativa com parada por convergencia.
+
+    O primeiro bloco e Dirichlet(`concentration`) (1.0 e uniforme no
+    simplex; menor que 1 puxa para os cantos). Nos seguintes, a fracao
+    `exploit` do bloco e sorteada em volta das melhores carteiras ate
+    agora (metade no max sharpe, metade na vol minima, com concentracao
+    `focus`) e o resto continua explorando. Para quando sharpe maximo e
+    vol minima variam menos que `tolerance` (relativo) por `patience`
+    blocos seguidos, ou ao atingir `max_portfolios`. `num_portfolios` do
+    resultado e o numero de carteiras de fato avaliadas.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = as_covariance(cov_matrix)
+    num_stocks = len(mean_returns)
+    random_state = np.random.default_rng(seed)
+    explore = np.full(num_stocks, concentration)
+
+    blocks = []
+    frontier = None
+    if frontier_bins:
+        frontier = FrontierEnvelope(frontier_bins,
+                                    max_portfolio_stdev(cov_matrix, periods))
+    best = BestPortfolios()
+    stable = 0
+    start = 0
+    while start < max_portfolios and stable < patience:
+        size = min(block_size, max_portfolios - start)
+        if best.max_sharpe is None:
+            weights = random_state.dirichlet(explore, size)
+        else:
+            local = int(size * exploit) // 2
+            weights = np.concatenate([
+                draw_weights_around(random_state, local,
+                                    best.max_sharpe.weights, focus),
+                draw_weights_around(random_state, local,
+                                    best.min_vol.weights, focus),
+                random_state.dirichlet(explore, size - 2 * local),
+            ])
+        previous = (best.max_sharpe, best.min_vol)
+        block = evaluate_portfolios(weights, mean_returns, cov_matrix,
+                                    periods)
+        best.update(weights, *block, offset=start)
+        if frontier is not None:
+            frontier.update(block[0], block[1])
+        if not stream:
+            blocks.append(block)
+        if previous[0] is not None and \
+                _converged(previous[0], best.max_sharpe, "sharpe",
+                           tolerance) and \
+                _converged(previous[1], best.min_vol, "stdev", tolerance):
+            stable += 1
+        else:
+            stable = 0
+        start += size
+
+    returns = stdevs = sharpes = None
+    if not stream:
+        returns, stdevs, sharpes = (np.concatenate(column)
+                                    for column in zip(*blocks))
+    return SimulationResult(
+        max_sharpe=best.max_sharpe,
+        min_vol=best.min_vol,
+        num_portfolios=start,
+        returns=returns,
+        stdevs=stdevs,
+        sharpes=sharpes,
+        frontier=frontier,
+        converged=stable >= patience,
+    )
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+def returns_matrix(close_prices_df):
+    """Retornos diarios sem linhas incompletas (datas, tickers)."""
+    returns = close_prices_df.pct_change().iloc[1:]
+    return returns[returns.notna().all(axis=1)]
+
+
+def window_stats(count, sums, products):
+    """Media e covariancia amostral a partir de n, sum(r) e sum(r r')."""
+    if count < 2:
+        raise ValueError("janela precisa de pelo menos 2 retornos")
+    mean = sums / count
+    cov = (products - np.outer(sums, sums) / count) / (count - 1)
+    return mean, cov
+
+
+class ReturnsStatsIndex:
+    """Somas acumuladas dos retornos e dos produtos externos r r'.
+
+    Com elas a media e a covariancia de qualquer janela [start, end] saem
+    em O(N^2), sem percorrer as linhas. Os produtos externos guardam so o
+    triangulo superior (N(N+1)/2 colunas por data), entao a memoria e
+    ~T * N^2 / 2 floats. `origin` e a data do preco anterior ao primeiro
+    retorno, para saber em que calendario os retornos foram calculados.
+    """
+
+    def __init__(self, time, columns, sums, products, origin=None):
+        self.time = time
+        self.columns = list(columns)
+        self.sums = sums
+        self.products = products
+        self.origin = origin
+        self.upper = np.triu_indices(len(self.columns))
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, origin=None):
+        index = cls(np.empty(0, dtype=np.int64), returns.columns,
+                    np.zeros((1, returns.shape[1])),
+                    np.zeros((1, len(np.triu_indices(returns.shape[1])[0]))),
+                    origin)
+        index.extend(returns)
+        return index
+
+    @classmethod
+    def from_prices(cls, close_prices_df):
+        return cls.from_returns(returns_matrix(close_prices_df),
+                                cls.to_keys(close_prices_df.index[:1])[0])
+
+    @staticmethod
+    def to_keys(labels):
+        index = pd.DatetimeIndex(labels)
+        return index.values.astype("datetime64[ns]").view(np.int64)
+
+    def extend(self, returns: pd.DataFrame):
+        """Acrescenta datas novas continuando as somas acumuladas."""
+        values = returns[self.columns].to_numpy(dtype=np.float64)
+        i, j = self.upper
+        sums = self.sums[-1] + np.cumsum(values, axis=0)
+        products = self.products[-1] + np.cumsum(
+            values[:, i] * values[:, j], axis=0
+        )
+        self.time = np.concatenate([self.time, self.to_keys(returns.index)])
+        self.sums = np.concatenate([self.sums, sums])
+        self.products = np.concatenate([self.products, products])
+
+    def __len__(self):
+        return len(self.time)
+
+    def same_returns(self, returns: pd.DataFrame):
+        """Se as datas de `returns` ja indexadas tem os mesmos valores.
+
+        A diferenca de duas somas acumuladas vizinhas devolve o retorno
+        guardado de cada data; uma barra parcial corrigida depois muda
+        esse valor sem mudar o calendario.
+        """
+        keys = self.to_keys(returns.index)
+        positions = np.searchsorted(self.time, keys)
+        inside = positions < len(self.time)
+        known = np.zeros(len(keys), dtype=bool)
+        known[inside] = self.time[positions[inside]] == keys[inside]
+        positions = positions[known]
+        stored = self.sums[positions + 1] - self.sums[positions]
+        values = returns[self.columns].to_numpy(dtype=np.float64)[known]
+        return bool(np.allclose(stored, values, rtol=1e-9, atol=1e-12))
+
+    def positions(self, start=None, end=None):
+        # janela inclusiva em datas de retorno -> [first, last) nas somas
+        first = 0
+        last = len(self.time)
+        if start is not None:
+            first = int(np.searchsorted(self.time, self.to_keys([start])[0]))
+        if end is not None:
+            last = int(np.searchsorted(self.time, self.to_keys([end])[0],
+                                       side="right"))
+        return first, last
+
+    def window(self, first, last):
+        """Media e covariancia amostral das linhas [first, last)."""
+        sums = self.sums[last] - self.sums[first]
+        products = np.zeros((len(self.columns), len(self.columns)))
+        products[self.upper] = self.products[last] - self.products[first]
+        products = products + np.triu(products, 1).T
+        return window_stats(last - first, sums, products)
+
+    def stats(self, start=None, end=None):
+        mean, cov = self.window(*self.positions(start, end))
+        return (pd.Series(mean, index=self.columns),
+                pd.DataFrame(cov, index=self.columns, columns=self.columns))
+
+    def matches(self, close_prices_df):
+        """Se os retornos de `close_prices_df` sao exatamente os do indice.
+
+        Exige as mesmas colunas, precos sem NaN (com buracos o pct_change
+        usa pares de linhas, que as somas nao reproduzem) e o mesmo
+        calendario: a janela do indice tem as mesmas datas, sem linhas a
+        mais, e o mesmo preco anterior ao primeiro retorno. Os valores
+        tambem precisam bater (`same_returns`).
+        """
+        if list(close_prices_df.columns) != self.columns or \
+                len(close_prices_df) < 3:
+            return False
+        if np.isnan(close_prices_df.to_numpy(dtype=np.float64)).any():
+            return False
+        keys = self.to_keys(close_prices_df.index)
+        first, last = self.positions(close_prices_df.index[1],
+                                     close_prices_df.index[-1])
+        if last - first != len(keys) - 1 or \
+                not np.array_equal(self.time[first:last], keys[1:]):
+            return False
+        previous = self.time[first - 1] if first > 0 else self.origin
+        if previous != keys[0]:
+            return False
+        return self.same_returns(close_prices_df.pct_change().iloc[1:])
+
+    def save(self, filename):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "wb") as file:
+            np.savez(file, time=self.time,
+                     columns=np.array(self.columns, dtype=str),
+                     sums=self.sums, products=self.products,
+                     origin=np.int64(-1 if self.origin is None
+                                     else self.origin))
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename, allow_pickle=False) as data:
+            origin = int(data["origin"]) if "origin" in data.files else -1
+            return cls(data["time"], [str(c) for c in data["columns"]],
+                       data["sums"], data["products"],
+                       None if origin < 0 else origin)
+
+
+class RollingStats:
+    """Somas de uma janela deslizante sobre a matriz de retornos (T, N).
+
+    `move(first, last)` soma as linhas que entram e subtrai as que saem
+    (O(k N^2) para k linhas), sem guardar nada por data: serve para
+    janelas que so andam para frente, como num backtest.
+    """
+
+    def __init__(self, returns):
+        self.returns = np.asarray(returns, dtype=np.float64)
+        num_stocks = self.returns.shape[1]
+        self.first = self.last = 0
+        self.sums = np.zeros(num_stocks)
+        self.products = np.zeros((num_stocks, num_stocks))
+
+    def move(self, first, last):
+        if first < self.first or last < self.last:
+            raise ValueError("a janela so pode andar para frente")
+        if first >= self.last:
+            # sem sobreposicao: mais barato recomecar
+            self.first = self.last = first
+            self.sums[:] = 0.0
+            self.products[:] = 0.0
+        entering = self.returns[self.last:last]
+        leaving = self.returns[self.first:first]
+        self.sums += entering.sum(axis=0) - leaving.sum(axis=0)
+        self.products += entering.T @ entering - leaving.T @ leaving
+        self.first, self.last = first, last
+        return self
+
+    def stats(self):
+        return window_stats(self.last - self.first, self.sums, self.products)
+
+
+def stats_index_filename(cache_dir, tickers, **policy):
+    """Nome do indice salvo para os tickers e a forma de carregar.
+
+    `policy` (fonte, join, cobertura minima...) entra na chave: cada
+    combinacao monta outro calendario e outros precos.
+    """
+    payload = json.dumps({"tickers": list(tickers), **policy},
+                         sort_keys=True, default=str)
+    key = hashlib.sha1(payload.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"stats_{key}.npz")
+
+
+def load_or_build_stats_index(close_prices_df, filename):
+    """Reaproveita o indice salvo, estendendo-o com datas novas."""
+    returns = returns_matrix(close_prices_df)
+    if os.path.exists(filename):
+        index = ReturnsStatsIndex.load(filename)
+        if index.matches(close_prices_df):
+            return index
+        keys = index.to_keys(returns.index)
+        known = np.isin(keys, index.time)
+        newer = keys > (index.time[-1] if len(index) else np.iinfo(
+            np.int64).min)
+        if (list(returns.columns) == index.columns
+                and (known | newer).all()
+                and index.same_returns(returns[known])):
+            index.extend(returns[newer])
+            index.save(filename)
+            return index
+    index = ReturnsStatsIndex.from_returns(
+        returns, ReturnsStatsIndex.to_keys(close_prices_df.index[:1])[0]
+    )
+    index.save(filename)
+    return index
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+YAHOO_FIELDS = ["Adj Close", "Close", "High", "Low", "Open", "Volume"]
+
+
+def synthetic_tickers(num_tickers, suffix=".SA"):
+    return [f"SYN{i:04d}{suffix}" for i in range(num_tickers)]
+
+
+def synthetic_yahoo_frame(num_tickers, num_days, start_date="2010-01-01",
+                          seed=0, suffix=".SA"):
+    """Gera OHLCV sintetico no formato largo (campo, ticker) do Yahoo.
+
+    Os precos seguem um passeio aleatorio geometrico por ticker em dias
+    uteis, o mesmo formato que DataService.load recebe do reader.
+    """
+    random_state = np.random.default_rng(seed)
+    index = pd.bdate_range(start=start_date, periods=num_days, name="Date")
+    drift = random_state.normal(0.0003, 0.0002, num_tickers)
+    vol = random_state.uniform(0.01, 0.03, num_tickers)
+    log_returns = random_state.standard_normal((num_days, num_tickers))
+    log_returns = log_returns * vol + drift
+    close = 100.0 * np.exp(np.cumsum(log_returns, axis=0))
+    open_ = close * np.exp(random_state.normal(0, 0.003, close.shape))
+    high = np.maximum(open_, close) * (1 + random_state.uniform(
+        0, 0.01, close.shape))
+    low = np.minimum(open_, close) * (1 - random_state.uniform(
+        0, 0.01, close.shape))
+    volume = random_state.integers(1_000, 1_000_000, close.shape)
+
+    tickers = synthetic_tickers(num_tickers, suffix)
+    fields = {
+        "Adj Close": close,
+        "Close": close,
+        "High": high,
+        "Low": low,
+        "Open": open_,
+        "Volume": volume.astype(np.float64),
+    }
+    frames = {field: pd.DataFrame(values, index=index, columns=tickers)
+              for field, values in fields.items()}
+    return pd.concat(frames, axis=1)
+
+
+def synthetic_close_prices(num_days, tickers, start_date="2022-01-03",
+                           seed=0, mean=0.0005, vol=0.015):
+    """Precos de fechamento (datas x tickers) com retornos normais.
+
+    Mesmo formato que o join de CDataFramesJoined devolve; `tickers` pode
+    ser a lista de nomes ou so a quantidade (T0, T1, ...). `vol` pode ser
+    um array com a volatilidade de cada ticker.
+    """
+    if isinstance(tickers, int):
+        tickers = [f"T{i}" for i in range(tickers)]
+    random_state = np.random.RandomState(seed)
+    returns = random_state.normal(mean, vol, (num_days, len(tickers)))
+    index = pd.bdate_range(start_date, periods=num_days, name="Date")
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index,
+                        columns=list(tickers))
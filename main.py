@@ -3,7 +3,6 @@
 @author: Janderson FFerreira
 """
 import click
-from core.markowitz import run_markowitz, run_markowitz_from_data_service
 from datetime import date, timedelta
 
 VERSION = "1.1"
@@ -17,7 +16,88 @@ def cli():
 @cli.command("markowitz")
 @click.argument("stocks", default='BOVA11.SA,SMAL11.SA')
 @click.option("--start-date", "start_date", default=None)
-def cmd_run_markowitz(stocks, start_date: str):
+@click.option("--workers", "workers", default=None, type=int,
+              help="processos para simular as carteiras; com --seed o "
+                   "resultado e o mesmo para qualquer numero de workers "
+                   "(use 1 para rodar sem pool), mas difere da execucao "
+                   "sem --workers, que usa outro stream")
+@click.option("--seed", "seed", default=None, type=int)
+@click.option("--portfolios", "num_portfolios", default=25000, type=int)
+@click.option("--stream", "stream", is_flag=True, default=False,
+              help="memoria constante: guarda so melhores e fronteira")
+@click.option("--method", "method", default="montecarlo",
+              type=click.Choice(["montecarlo", "optimizer", "resampled"]),
+              help="sorteio aleatorio, otimizador exato ou fronteira "
+                   "reamostrada (bootstrap)")
+@click.option("--resamples", "num_resamples", default=500, type=int,
+              help="reamostragens bootstrap (--method resampled)")
+@click.option("--cache-dir", "cache_dir", default=None,
+              help="diretorio do cache local de precos")
+@click.option("--source", "source", default="yfinance",
+              type=click.Choice(["yfinance", "file"]))
+@click.option("--data-dir", "data_dir", default=None,
+              help="diretorio dos precos locais (--source file)")
+@click.option("--no-plot", "no_plot", is_flag=True, default=False,
+              help="nao gera o grafico em reports/")
+@click.option("--profile", "profile", default=None,
+              help="grava um trace JSON com tempo/memoria de cada etapa")
+@click.option("--join", "join_how", default="inner",
+              type=click.Choice(["inner", "outer"]),
+              help="outer alinha calendarios diferentes com forward-fill")
+@click.option("--min-coverage", "min_coverage", default=None, type=float,
+              help="fracao minima de tickers com cotacao em cada data")
+@click.option("--chunk-size", "chunk_size", default=None, type=int,
+              help="baixa os tickers em blocos concorrentes deste tamanho")
+@click.option("--download-workers", "download_workers", default=4, type=int)
+@click.option("--timeframe", "timeframe", default="D1",
+              type=click.Choice(["D1", "W1", "MN1"]),
+              help="agrega as barras (W1 semanal, MN1 mensal) antes do "
+                   "calculo; a anualizacao segue o timeframe. As fontes "
+                   "sao diarias, entao nao ha timeframes intraday")
+@click.option("--covariance", "covariance", default="sample",
+              type=click.Choice(["sample", "ledoit-wolf", "factor"]),
+              help="estimador da covariancia dos retornos")
+@click.option("--factors", "num_factors", default=5, type=int,
+              help="numero de fatores PCA (--covariance factor)")
+@click.option("--sampler", "sampler", default="uniform",
+              type=click.Choice(["uniform", "adaptive"]),
+              help="adaptive: Dirichlet com parada por convergencia "
+                   "(--portfolios vira o limite)")
+@click.option("--concentration", "concentration", default=1.0, type=float,
+              help="concentracao do Dirichlet (<1 puxa para os cantos)")
+@click.option("--tolerance", "tolerance", default=1e-4, type=float,
+              help="variacao relativa aceita para parar (--sampler adaptive)")
+@click.option("--target-vol", "target_vol", default=None, type=float,
+              help="alavanca cada ativo para esta vol anual antes do "
+                   "markowitz (ex.: 0.10)")
+@click.option("--vol-window", "vol_window", default=63, type=int,
+              help="pregoes da volatilidade movel (--target-vol)")
+@click.option("--max-leverage", "max_leverage", default=4.0, type=float)
+@click.option("--risk-parity", "risk_parity", is_flag=True, default=False,
+              help="escala os fluxos por pesos de contribuicao de risco "
+                   "igual (--target-vol)")
+@click.option("--no-cache", "no_cache", is_flag=True, default=False,
+              help="ignora o cache de resultados e recalcula")
+@click.option("--clear-cache", "clear_cache", is_flag=True, default=False,
+              help="apaga o cache de resultados antes de rodar")
+@click.option("--result-cache-dir", "result_cache_dir",
+              default="resultscache", help="diretorio do cache de resultados")
+def cmd_run_markowitz(stocks, start_date: str, workers: int, seed: int,
+                      num_portfolios: int, stream: bool, method: str,
+                      num_resamples: int,
+                      cache_dir: str, source: str, data_dir: str,
+                      no_plot: bool, profile: str, join_how: str,
+                      min_coverage: float, chunk_size: int,
+                      download_workers: int, timeframe: str,
+                      covariance: str,
+                      num_factors: int, sampler: str, concentration: float,
+                      tolerance: float, target_vol: float, vol_window: int,
+                      max_leverage: float, risk_parity: bool,
+                      no_cache: bool, clear_cache: bool,
+                      result_cache_dir: str):
+    from core.markowitz import run_markowitz_from_data_service
+    from core.instrumentation import Profiler
+    from core.result_cache import ResultCache
     if not start_date:
         start_date = (date.today() - (timedelta(days=365)*5)).isoformat()
     else:
@@ -28,14 +108,230 @@ def cmd_run_markowitz(stocks, start_date: str):
     print(f"data fim: {date.today()}")
 
     stocks = stocks.split(",")
-    run_markowitz_from_data_service(stocks=stocks, 
-                                    start_date=start_date)
+    profiler = Profiler()
+    result_cache = ResultCache(result_cache_dir)
+    if clear_cache:
+        result_cache.clear()
+    if no_cache:
+        result_cache = None
+    run_markowitz_from_data_service(stocks=stocks,
+                                    start_date=start_date,
+                                    workers=workers,
+                                    seed=seed,
+                                    num_portfolios=num_portfolios,
+                                    stream=stream,
+                                    method=method,
+                                    num_resamples=num_resamples,
+                                    cache_dir=cache_dir,
+                                    source=source,
+                                    data_dir=data_dir,
+                                    plot=not no_plot,
+                                    profiler=profiler,
+                                    join_how=join_how,
+                                    min_coverage=min_coverage,
+                                    chunk_size=chunk_size,
+                                    download_workers=download_workers,
+                                    timeframe=timeframe,
+                                    covariance=covariance,
+                                    num_factors=num_factors,
+                                    sampler=sampler,
+                                    concentration=concentration,
+                                    tolerance=tolerance,
+                                    target_vol=target_vol,
+                                    vol_window=vol_window,
+                                    max_leverage=max_leverage,
+                                    risk_parity=risk_parity,
+                                    result_cache=result_cache)
+    if profile:
+        profiler.write(profile)
+
+
+@cli.command("backtest")
+@click.argument("stocks", default='BOVA11.SA,SMAL11.SA')
+@click.option("--start-date", "start_date", default=None)
+@click.option("--lookback", "lookback", default=252, type=int,
+              help="pregoes da janela usada em cada otimizacao")
+@click.option("--frequency", "frequency", default="monthly",
+              type=click.Choice(["weekly", "monthly", "quarterly"]))
+@click.option("--objective", "objective", default="max_sharpe",
+              type=click.Choice(["max_sharpe", "min_vol"]))
+@click.option("--cache-dir", "cache_dir", default=None,
+              help="diretorio do cache local de precos")
+@click.option("--source", "source", default="yfinance",
+              type=click.Choice(["yfinance", "file"]))
+@click.option("--data-dir", "data_dir", default=None,
+              help="diretorio dos precos locais (--source file)")
+@click.option("--join", "join_how", default="inner",
+              type=click.Choice(["inner", "outer"]))
+@click.option("--min-coverage", "min_coverage", default=None, type=float)
+@click.option("--chunk-size", "chunk_size", default=None, type=int)
+@click.option("--download-workers", "download_workers", default=4, type=int)
+@click.option("--output", "output", default=None,
+              help="CSV com retorno, curva de capital e turnover por dia")
+@click.option("--weights-output", "weights_output", default=None,
+              help="CSV com os pesos de cada rebalanceamento")
+@click.option("--profile", "profile", default=None)
+def cmd_backtest(stocks, start_date: str, lookback: int, frequency: str,
+                 objective: str, cache_dir: str, source: str, data_dir: str,
+                 join_how: str, min_coverage: float, chunk_size: int,
+                 download_workers: int, output: str, weights_output: str,
+                 profile: str):
+    from core.backtest import run_backtest_from_data_service
+    from core.instrumentation import Profiler
+    if not start_date:
+        start_date = (date.today() - (timedelta(days=365)*10)).isoformat()
+    print(f"BACKTEST MARKOWITZ  feito por Janderson FFerreira v{VERSION}\n\n")
+    print(f"ativos: {stocks}")
+    print(f"data inicio: {start_date}")
+
+    profiler = Profiler()
+    result = run_backtest_from_data_service(stocks=stocks.split(","),
+                                            start_date=start_date,
+                                            cache_dir=cache_dir,
+                                            source=source,
+                                            data_dir=data_dir,
+                                            profiler=profiler,
+                                            join_how=join_how,
+                                            min_coverage=min_coverage,
+                                            chunk_size=chunk_size,
+                                            download_workers=download_workers,
+                                            lookback=lookback,
+                                            frequency=frequency,
+                                            objective=objective)
+    for name, value in result.summary().items():
+        print(f"{name}: {value:.4g}")
+    if output:
+        result.to_frame().to_csv(output)
+    if weights_output:
+        result.weights.to_csv(weights_output)
+    if profile:
+        profiler.write(profile)
+
+
+@cli.command("batch")
+@click.argument("baskets_file")
+@click.option("--start-date", "start_date", default=None)
+@click.option("--method", "method", default="optimizer",
+              type=click.Choice(["montecarlo", "optimizer"]))
+@click.option("--portfolios", "num_portfolios", default=25000, type=int)
+@click.option("--seed", "seed", default=None, type=int)
+@click.option("--workers", "workers", default=None, type=int,
+              help="processos para repartir as cestas")
+@click.option("--cache-dir", "cache_dir", default=None,
+              help="diretorio do cache local de precos")
+@click.option("--source", "source", default="yfinance",
+              type=click.Choice(["yfinance", "file"]))
+@click.option("--data-dir", "data_dir", default=None,
+              help="diretorio dos precos locais (--source file)")
+@click.option("--join", "join_how", default="outer",
+              type=click.Choice(["inner", "outer"]),
+              help="outer (sem forward-fill): cada cesta usa o proprio "
+                   "calendario; inner corta todas nas datas comuns")
+@click.option("--min-coverage", "min_coverage", default=None, type=float)
+@click.option("--chunk-size", "chunk_size", default=None, type=int)
+@click.option("--download-workers", "download_workers", default=4, type=int)
+@click.option("--output", "output", default="reports/batch.csv",
+              help="CSV consolidado com uma linha por cesta e carteira")
+@click.option("--profile", "profile", default=None)
+def cmd_batch(baskets_file, start_date: str, method: str,
+              num_portfolios: int, seed: int, workers: int, cache_dir: str,
+              source: str, data_dir: str, join_how: str,
+              min_coverage: float, chunk_size: int, download_workers: int,
+              output: str, profile: str):
+    import os
+    from core.batch import read_baskets, run_batch_from_data_service
+    from core.instrumentation import Profiler
+    if not start_date:
+        start_date = (date.today() - (timedelta(days=365)*5)).isoformat()
+    baskets = read_baskets(baskets_file)
+    print(f"SIMULADOR MARKOWITZ  feito por Janderson FFerreira v{VERSION}\n\n")
+    print(f"cestas: {len(baskets)}")
+    print(f"data inicio: {start_date}")
+
+    profiler = Profiler()
+    table = run_batch_from_data_service(baskets,
+                                        start_date=start_date,
+                                        cache_dir=cache_dir,
+                                        source=source,
+                                        data_dir=data_dir,
+                                        profiler=profiler,
+                                        join_how=join_how,
+                                        min_coverage=min_coverage,
+                                        chunk_size=chunk_size,
+                                        download_workers=download_workers,
+                                        method=method,
+                                        num_portfolios=num_portfolios,
+                                        seed=seed,
+                                        workers=workers)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    table.to_csv(output)
+    print(f"resultados: {output}")
+    if profile:
+        profiler.write(profile)
+
+
+@cli.command("serve")
+@click.argument("stocks", default='BOVA11.SA,SMAL11.SA')
+@click.option("--start-date", "start_date", default=None)
+@click.option("--host", "host", default="127.0.0.1")
+@click.option("--port", "port", default=8750, type=int)
+@click.option("--workers", "workers", default=None, type=int,
+              help="processos para as otimizacoes (0 = na thread)")
+@click.option("--refresh-minutes", "refresh_minutes", default=15.0,
+              type=float, help="intervalo do refresh em segundo plano "
+                               "(0 desliga)")
+@click.option("--cache-dir", "cache_dir", default="pricescache",
+              help="cache de precos: o refresh so baixa as datas novas")
+@click.option("--source", "source", default="yfinance",
+              type=click.Choice(["yfinance", "file"]))
+@click.option("--data-dir", "data_dir", default=None,
+              help="diretorio dos precos locais (--source file)")
+@click.option("--join", "join_how", default="inner",
+              type=click.Choice(["inner", "outer"]))
+@click.option("--min-coverage", "min_coverage", default=None, type=float)
+def cmd_serve(stocks, start_date: str, host: str, port: int, workers: int,
+              refresh_minutes: float, cache_dir: str, source: str,
+              data_dir: str, join_how: str, min_coverage: float):
+    from core.markowitz import load_close_prices
+    from core.server import OptimizationService, serve
+    if not start_date:
+        start_date = (date.today() - (timedelta(days=365)*5)).isoformat()
+    print(f"SIMULADOR MARKOWITZ  feito por Janderson FFerreira v{VERSION}\n\n")
+    print(f"ativos: {stocks}")
+    print(f"data inicio: {start_date}")
+
+    def loader():
+        close_prices_df, _ = load_close_prices(
+            stocks.split(","), start_date, cache_dir=cache_dir or None,
+            source=source, data_dir=data_dir, join_how=join_how,
+            min_coverage=min_coverage,
+        )
+        return close_prices_df
+
+    service = OptimizationService(loader, workers=workers,
+                                  refresh_seconds=refresh_minutes * 60)
+    serve(service, host, port)
 
 
 @cli.command("download_yfinance")
 @click.argument("stocks", default='BOVA11,SMAL11')
 @click.option("--start-date", "start_date", default=None)
-def cmd_download_yf(stocks, start_date: str):
+@click.option("--cache-dir", "cache_dir", default=None,
+              help="diretorio do cache local de precos")
+@click.option("--chunk-size", "chunk_size", default=None, type=int,
+              help="baixa os tickers em blocos concorrentes deste tamanho")
+@click.option("--download-workers", "download_workers", default=4, type=int)
+@click.option("--data-dir", "data_dir", default=None,
+              help="diretorio de saida dos precos")
+@click.option("--export", "export", default="csv",
+              type=click.Choice(["csv", "bulk"]),
+              help="csv: um arquivo por ticker; bulk: store em colunas "
+                   "particionado por ano, so com as datas novas")
+@click.option("--write-workers", "write_workers", default=4, type=int,
+              help="threads gravando particoes (--export bulk)")
+def cmd_download_yf(stocks, start_date: str, cache_dir: str,
+                    chunk_size: int, download_workers: int, data_dir: str,
+                    export: str, write_workers: int):
     from core.data_service import DataService, DataServiceParams
     if not start_date:
         start_date = (date.today() - (timedelta(days=365)*5)).isoformat()
@@ -47,11 +343,17 @@ def cmd_download_yf(stocks, start_date: str):
     print(f"data fim: {date.today()}")
 
     params = DataServiceParams(tickers=stocks.split(","),
-                               start_date=start_date)
+                               start_date=start_date,
+                               cache_dir=cache_dir,
+                               data_dir=data_dir,
+                               chunk_size=chunk_size,
+                               download_workers=download_workers)
 
     data_service = DataService(params)
     data_service.load()
-    data_service.save_prices()
+    for ticker, error in data_service.load_errors.items():
+        print(f"erro ao baixar {ticker}: {error}")
+    data_service.save_prices(mode=export, workers=write_workers)
 
 
 if __name__ == "__main__":
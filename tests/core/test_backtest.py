@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+from core.backtest import rebalance_positions, walk_forward
+from core.synthetic import synthetic_close_prices
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(300, 4,
+                                             start_date="2021-01-04")
+
+    def test_rebalance_positions_are_first_day_of_month(self):
+        index = pd.to_datetime(["2023-01-30", "2023-01-31", "2023-02-01",
+                                "2023-02-02", "2023-03-01"])
+        np.testing.assert_array_equal(rebalance_positions(index), [2, 4])
+
+    def test_walk_forward_holds_weights_out_of_sample(self):
+        # WHEN
+        result = walk_forward(self.prices, lookback=60)
+
+        # THEN
+        np.testing.assert_allclose(result.weights.sum(axis=1), 1.0)
+        self.assertTrue((result.weights.to_numpy() >= 0).all())
+        self.assertAlmostEqual(result.turnover.iloc[0], 1.0)
+        returns = self.prices.pct_change()
+        first, second = result.weights.index[:2]
+        held = returns.loc[first:second].iloc[:-1]
+        value = (np.cumprod(1 + held, axis=0) @ result.weights.iloc[0])
+        self.assertAlmostEqual(
+            result.equity.loc[held.index[-1]], value.iloc[-1]
+        )
+        pd.testing.assert_series_equal(
+            result.equity, (1 + result.returns).cumprod(),
+            check_names=False,
+        )
+
+    def test_weights_do_not_look_ahead(self):
+        # GIVEN
+        result = walk_forward(self.prices, lookback=60, objective="min_vol")
+        rebalance = result.weights.index[2]
+        changed = self.prices.copy()
+        changed.loc[rebalance:] *= np.linspace(1, 3, len(changed.loc[
+            rebalance:]))[:, None] ** np.arange(4)
+
+        # WHEN
+        changed_result = walk_forward(changed, lookback=60,
+                                      objective="min_vol")
+
+        # THEN
+        pd.testing.assert_frame_equal(changed_result.weights.iloc[:3],
+                                      result.weights.iloc[:3])
+
+    def test_short_history_raises(self):
+        with self.assertRaises(ValueError):
+            walk_forward(self.prices, lookback=1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+from contextlib import redirect_stdout
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from core.batch import (Basket, inner_rows, read_baskets, run_batch,
+                        run_batch_from_data_service, union_tickers)
+from core.optimizer import optimize_portfolios
+from core.synthetic import synthetic_close_prices
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(120, 5)
+        self.baskets = [Basket("a", ["T0", "T1", "T2"]),
+                        Basket("b", ["T3", "T1"]),
+                        Basket("c", ["T4", "XX"])]
+
+    def test_union_keeps_first_seen_order(self):
+        self.assertEqual(union_tickers(self.baskets),
+                         ["T0", "T1", "T2", "T3", "T4", "XX"])
+
+    def test_basket_matches_single_optimization(self):
+        # WHEN
+        table = run_batch(self.prices, self.baskets)
+
+        # THEN
+        returns = self.prices[["T3", "T1"]].pct_change()
+        expected = optimize_portfolios(returns.mean().values,
+                                       returns.cov().values)
+        row = table.loc[("b", "max_sharpe")]
+        self.assertAlmostEqual(row["sharpe"], expected.max_sharpe.sharpe)
+        np.testing.assert_allclose(row[["T3", "T1"]].astype(float),
+                                   expected.max_sharpe.weights)
+        self.assertTrue(np.isnan(row["T0"]))
+
+    def test_missing_tickers_are_dropped(self):
+        table = run_batch(self.prices, self.baskets)
+        self.assertAlmostEqual(table.loc[("c", "min_vol"), "T4"], 1.0)
+        self.assertEqual(len(table), 6)
+
+    def test_late_listing_does_not_shorten_other_baskets(self):
+        # GIVEN: T4 so passa a ter preco na metade do periodo
+        prices = self.prices.copy()
+        prices.iloc[:60, 4] = np.nan
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for ticker in prices.columns:
+                prices[ticker].dropna().to_csv(
+                    os.path.join(tmp_dir, f"prices_{ticker}.csv"))
+
+            # WHEN
+            table = run_batch_from_data_service(
+                self.baskets[:2] + [Basket("c", ["T4"])],
+                start_date="2022-01-01", source="file", data_dir=tmp_dir)
+
+        # THEN: a cesta b usa o historico inteiro
+        returns = prices[["T3", "T1"]].pct_change()
+        expected = optimize_portfolios(returns.mean().values,
+                                       returns.cov().values)
+        self.assertAlmostEqual(table.loc[("b", "max_sharpe"), "sharpe"],
+                               expected.max_sharpe.sharpe)
+
+    def test_basket_with_gaps_uses_its_own_rows(self):
+        prices = self.prices.copy()
+        prices.iloc[:60, 2] = np.nan
+
+        table = run_batch(prices, self.baskets)
+
+        own = prices[["T0", "T1", "T2"]].dropna().pct_change()
+        expected = optimize_portfolios(own.mean().values, own.cov().values)
+        self.assertAlmostEqual(table.loc[("a", "min_vol"), "stdev"],
+                               expected.min_vol.stdev)
+
+    def test_gaps_in_the_middle_keep_the_basket_returns(self):
+        # GIVEN: T2 sem preco por alguns dias no meio da serie
+        prices = self.prices.copy()
+        prices.iloc[30:35, 2] = np.nan
+        prices.iloc[70, 2] = np.nan
+
+        # WHEN
+        table = run_batch(prices, self.baskets)
+
+        # THEN
+        own = prices[["T0", "T1", "T2"]].dropna().pct_change()
+        expected = optimize_portfolios(own.mean().values, own.cov().values)
+        self.assertAlmostEqual(table.loc[("a", "min_vol"), "stdev"],
+                               expected.min_vol.stdev)
+
+    def test_inner_rows_warns_about_shortened_baskets(self):
+        prices = self.prices.copy()
+        prices.iloc[:60, 4] = np.nan
+
+        with redirect_stdout(io.StringIO()) as output:
+            common = inner_rows(prices, self.baskets)
+
+        self.assertEqual(len(common), 60)
+        self.assertIn("cesta a", output.getvalue())
+        self.assertNotIn("cesta c", output.getvalue())
+
+    def test_workers_give_same_table(self):
+        serial = run_batch(self.prices, self.baskets, method="montecarlo",
+                           num_portfolios=2000, seed=3)
+        parallel = run_batch(self.prices, self.baskets, method="montecarlo",
+                             num_portfolios=2000, seed=3, workers=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+class TestReadBaskets(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_csv(self):
+        filename = os.path.join(self.tmp_dir.name, "baskets.csv")
+        with open(filename, "w") as file:
+            file.write("name,tickers\nbancos,ITUB4,BBDC4\nindices,BOVA11\n")
+
+        baskets = read_baskets(filename)
+
+        self.assertEqual(baskets, [Basket("bancos", ["ITUB4", "BBDC4"]),
+                                   Basket("indices", ["BOVA11"])])
+
+    @unittest.skipIf(yaml is None, "PyYAML nao instalado")
+    def test_read_yaml(self):
+        filename = os.path.join(self.tmp_dir.name, "baskets.yaml")
+        with open(filename, "w") as file:
+            file.write("bancos: [ITUB4, BBDC4]\n")
+
+        self.assertEqual(read_baskets(filename),
+                         [Basket("bancos", ["ITUB4", "BBDC4"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
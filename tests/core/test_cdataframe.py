@@ -1,6 +1,9 @@
 import pandas as pd
 import unittest
-from core.cdataframe import COHLCDataFrame, CDataFramesJoined
+import numpy as np
+from core.cdataframe import (COHLCDataFrame, CDataFramesJoined,
+                             DATAFRAME_COLUMNS, annualization_periods,
+                             timeframe_keys)
 
 
 class TestCoreCDataFrame(unittest.TestCase):
@@ -168,3 +171,194 @@ class TestCDataFramesJoined(unittest.TestCase):
         expected_df_shape = cdfs_joined.join().shape
         observed_df_shape = (3, 2)
         self.assertEqual(expected_df_shape, observed_df_shape)
+
+
+class TestCDataFramesJoinedCalendars(unittest.TestCase):
+    def build(self, ticker, days, closes):
+        df = pd.DataFrame({
+            "time": pd.to_datetime(days),
+            "open": closes,
+            "high": closes,
+            "low": closes,
+            "close": closes,
+            "volume": 1,
+        })
+        return COHLCDataFrame(df, info={"ticker": ticker})
+
+    def setUp(self):
+        # B3 sem o feriado do dia 16, cripto todos os dias
+        self.b3 = self.build("B3", ["2020-05-14", "2020-05-15",
+                                    "2020-05-18"], [1.0, 2.0, 3.0])
+        self.crypto = self.build("BTC", ["2020-05-14", "2020-05-15",
+                                         "2020-05-16", "2020-05-17",
+                                         "2020-05-18"],
+                                 [10.0, 11.0, 12.0, 13.0, 14.0])
+        self.joiner = CDataFramesJoined([self.b3, self.crypto])
+
+    def test_inner_join_keeps_common_dates(self):
+        joined = self.joiner.join()
+
+        self.assertEqual(list(joined.columns), ["B3", "BTC"])
+        self.assertEqual(list(joined["BTC"]), [10.0, 11.0, 14.0])
+        self.assertEqual(joined.index.name, "Date")
+
+    def test_outer_join_forward_fills(self):
+        joined = self.joiner.join(how="outer")
+
+        self.assertEqual(joined.shape, (5, 2))
+        self.assertEqual(list(joined["B3"]), [1.0, 2.0, 2.0, 2.0, 3.0])
+
+    def test_min_coverage_drops_sparse_dates(self):
+        joined = self.joiner.join(how="outer", min_coverage=1.0)
+
+        self.assertEqual(joined.shape, (3, 2))
+        self.assertEqual(list(joined["B3"]), [1.0, 2.0, 3.0])
+
+
+class TestCOHLCDataFrameArrays(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "time": pd.to_datetime(["2020-05-15", "2020-05-14"]),
+            "open": [1.0, 2.0],
+            "high": [1.0, 2.0],
+            "low": [1.0, 2.0],
+            "close": [3.0, 4.0],
+            "volume": [10, 20],
+        })
+
+    def test_default_info_is_not_shared(self):
+        cdataframe_a = COHLCDataFrame(self.df)
+        cdataframe_b = COHLCDataFrame(self.df)
+        cdataframe_a._info["ticker"] = "TICKERA"
+
+        self.assertIsNone(cdataframe_b.ticker)
+
+    def test_view_is_sorted_read_only_and_zero_copy(self):
+        cdataframe = COHLCDataFrame(self.df)
+
+        close = cdataframe.view("close")
+
+        self.assertEqual(list(close), [4.0, 3.0])
+        self.assertFalse(close.flags.writeable)
+        self.assertTrue(np.shares_memory(close, cdataframe.values))
+        self.assertEqual(cdataframe.time.dtype, np.int64)
+
+    def test_float32_prices(self):
+        cdataframe = COHLCDataFrame(self.df, dtype=np.float32)
+
+        self.assertEqual(cdataframe.view("close").dtype, np.float32)
+        self.assertEqual(cdataframe.columns, DATAFRAME_COLUMNS)
+        self.assertEqual(list(cdataframe.dataframe.columns),
+                         DATAFRAME_COLUMNS)
+
+    def test_dataframe_is_read_only_and_get_is_writable(self):
+        cdataframe = COHLCDataFrame(self.df)
+
+        with self.assertRaises(ValueError):
+            cdataframe.dataframe.iloc[0, 4] = 0.0
+
+        frame = cdataframe.get()
+        frame.loc[:, "close"] = 0.0
+        cdataframe.set(frame)
+        self.assertEqual(list(cdataframe.view("close")), [0.0, 0.0])
+
+    def test_from_arrays(self):
+        time = np.array([1, 2], dtype=np.int64)
+        values = np.arange(10, dtype=np.float64).reshape(5, 2)
+
+        cdataframe = COHLCDataFrame.from_arrays(time, values,
+                                                info={"ticker": "X"})
+
+        self.assertEqual(cdataframe.ticker, "X")
+        self.assertEqual(list(cdataframe.dataframe["close"]), [6.0, 7.0])
+
+
+def daily_bars(dates, timeframe="D1"):
+    # close = 1, 2, 3, ...; high = close + 1; low = close - 1; volume = 10
+    close = np.arange(1.0, len(dates) + 1)
+    return COHLCDataFrame(pd.DataFrame({
+        "time": pd.to_datetime(dates),
+        "open": close - 0.5,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": 10.0,
+        "ticker": "TICKERA",
+        "timeframe": timeframe,
+    }))
+
+
+class TestCOHLCDataFrameResample(unittest.TestCase):
+    def test_weekly_bars_aggregate_ohlcv(self):
+        # GIVEN: quinta/sexta de uma semana e segunda a quarta da outra
+        cdataframe = daily_bars(["2020-05-14", "2020-05-15", "2020-05-18",
+                                 "2020-05-19", "2020-05-20"])
+
+        # WHEN
+        weekly = cdataframe.resample("W1")
+
+        # THEN
+        frame = weekly.dataframe
+        self.assertEqual(list(frame.time), list(pd.to_datetime(
+            ["2020-05-11", "2020-05-18"])))
+        self.assertEqual(list(frame.open), [0.5, 2.5])
+        self.assertEqual(list(frame.high), [3.0, 6.0])
+        self.assertEqual(list(frame.low), [0.0, 2.0])
+        self.assertEqual(list(frame.close), [2.0, 5.0])
+        self.assertEqual(list(frame.volume), [20.0, 30.0])
+        self.assertEqual(weekly.timeframe, "W1")
+        self.assertEqual(weekly.ticker, "TICKERA")
+        self.assertEqual(cdataframe.timeframe, "D1")
+
+    def test_monthly_bars_skip_missing_close(self):
+        dates = pd.bdate_range("2020-01-01", "2020-03-31")
+        frame = daily_bars(dates).get()
+        frame.loc[frame.time == "2020-01-31", "close"] = np.nan
+        cdataframe = COHLCDataFrame(frame)
+
+        monthly = cdataframe.resample("MN1")
+
+        self.assertEqual(len(monthly.time), 3)
+        january = frame[frame.time.dt.month == 1]
+        self.assertEqual(monthly.view("close")[0], january.close.iloc[-2])
+        self.assertEqual(monthly.view("volume")[0], 10.0 * len(january) - 10)
+
+    def test_intraday_bars(self):
+        time = pd.date_range("2020-05-18 10:00", periods=8, freq="15min")
+        cdataframe = daily_bars(time, timeframe="M15")
+
+        hourly = cdataframe.resample("H1")
+
+        self.assertEqual(list(hourly.view("close")), [4.0, 8.0])
+        self.assertEqual(list(hourly.view("high")), [5.0, 9.0])
+
+    def test_resample_is_memoized_per_timeframe(self):
+        cdataframe = daily_bars(pd.bdate_range("2020-01-01", periods=30))
+
+        self.assertIs(cdataframe.resample("W1"), cdataframe.resample("W1"))
+        self.assertIsNot(cdataframe.resample("W1"),
+                         cdataframe.resample("MN1"))
+        self.assertIs(cdataframe.resample("D1"), cdataframe)
+
+        cdataframe.set(daily_bars(["2020-05-18"]).dataframe)
+        self.assertEqual(len(cdataframe.resample("W1").time), 1)
+
+    def test_resample_cannot_upsample(self):
+        cdataframe = daily_bars(["2020-05-18"])
+        with self.assertRaises(ValueError):
+            cdataframe.resample("H1")
+        with self.assertRaises(ValueError):
+            cdataframe.resample("Y1")
+
+    def test_weekly_keys_align_tickers(self):
+        # segunda e sexta da mesma semana caem na mesma chave
+        keys = timeframe_keys(daily_bars(["2020-05-18", "2020-05-22"]).time,
+                              "W1")
+        self.assertEqual(keys[0], keys[1])
+
+    def test_annualization_periods(self):
+        self.assertEqual(annualization_periods("D1"), 252)
+        self.assertEqual(annualization_periods("W1"), 52)
+        self.assertEqual(annualization_periods("MN1"), 12)
+        self.assertEqual(annualization_periods("H1"), 252 * 7)
+        self.assertEqual(annualization_periods("H4"), 252 * 2)
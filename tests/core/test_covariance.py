@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+import pandas as pd
+from core.covariance import (FactorCovariance, estimate_covariance,
+                             factor_covariance, ledoit_wolf_covariance)
+from core.optimizer import optimize_portfolios
+from core.simulation import evaluate_portfolios, simulate_portfolios
+
+
+def daily_returns(num_days=250, num_stocks=8, seed=0):
+    random_state = np.random.RandomState(seed)
+    market = random_state.normal(0.0004, 0.01, (num_days, 1))
+    returns = market * random_state.uniform(0.5, 1.5, num_stocks) + \
+        random_state.normal(0.0002, 0.008, (num_days, num_stocks))
+    return pd.DataFrame(returns, columns=[f"T{i}" for i in range(num_stocks)])
+
+
+class TestLedoitWolf(unittest.TestCase):
+    def test_well_conditioned_when_stocks_exceed_rows(self):
+        # GIVEN
+        returns = daily_returns(num_days=30, num_stocks=60)
+
+        # WHEN
+        shrunk = ledoit_wolf_covariance(returns)
+
+        # THEN
+        self.assertEqual(np.linalg.matrix_rank(returns.cov().values), 29)
+        self.assertGreater(np.linalg.eigvalsh(shrunk.values).min(), 0)
+        np.testing.assert_allclose(np.trace(shrunk.values),
+                                   np.trace(returns.cov().values))
+
+    def test_close_to_sample_with_long_history(self):
+        returns = daily_returns(num_days=20000, num_stocks=4)
+        np.testing.assert_allclose(ledoit_wolf_covariance(returns),
+                                   returns.cov(), rtol=0.05, atol=1e-7)
+
+
+class TestFactorCovariance(unittest.TestCase):
+    def setUp(self):
+        self.returns = daily_returns()
+        self.cov = factor_covariance(self.returns, num_factors=2)
+        self.dense = self.cov.to_dense()
+
+    def test_operations_match_dense_matrix(self):
+        weights = np.random.RandomState(1).random((5, 8))
+        np.testing.assert_allclose(self.cov.portfolio_variances(weights),
+                                   np.einsum("ij,ij->i", weights @ self.dense,
+                                             weights))
+        np.testing.assert_allclose(self.cov @ weights[0],
+                                   self.dense @ weights[0])
+        rows = np.array([5, 1, 3])
+        np.testing.assert_allclose(self.cov.block(rows),
+                                   self.dense[np.ix_(rows, rows)])
+        np.testing.assert_allclose(self.cov.diagonal(), np.diag(self.dense))
+
+    def test_diagonal_matches_sample_variances(self):
+        self.assertEqual(self.cov.loadings.shape, (8, 2))
+        np.testing.assert_allclose(self.cov.diagonal(),
+                                   np.diag(self.returns.cov()))
+
+    def test_simulation_matches_dense_matrix(self):
+        mean = self.returns.mean().values
+        factor = simulate_portfolios(mean, self.cov, 3000, seed=2)
+        dense = simulate_portfolios(mean, self.dense, 3000, seed=2)
+        np.testing.assert_allclose(factor.stdevs, dense.stdevs)
+        self.assertEqual(factor.max_sharpe.index, dense.max_sharpe.index)
+
+    def test_optimizer_matches_dense_matrix(self):
+        mean = self.returns.mean().values
+        factor = optimize_portfolios(mean, self.cov, frontier_points=5)
+        dense = optimize_portfolios(mean, self.dense, frontier_points=5)
+        np.testing.assert_allclose(factor.max_sharpe.weights,
+                                   dense.max_sharpe.weights, atol=1e-9)
+        np.testing.assert_allclose(factor.min_vol.weights,
+                                   dense.min_vol.weights, atol=1e-9)
+        np.testing.assert_allclose(
+            evaluate_portfolios(factor.min_vol.weights[np.newaxis],
+                                mean, self.cov)[1],
+            [factor.min_vol.stdev])
+
+
+class TestEstimateCovariance(unittest.TestCase):
+    def test_dispatch(self):
+        returns = daily_returns()
+        pd.testing.assert_frame_equal(estimate_covariance(returns),
+                                      returns.cov())
+        self.assertIsInstance(estimate_covariance(returns, "factor", 3),
+                              FactorCovariance)
+        with self.assertRaises(ValueError):
+            estimate_covariance(returns, "robust")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from datetime import date
 from core.data_service import DataService, DataServiceParams
+import numpy as np
 import pandas as pd
 
 
@@ -92,3 +93,27 @@ class TestDataService(unittest.TestCase):
             data_service.convert_tickers(expected_tickers),
             self.observed_tickers
         )
+
+    def test_load_builds_views_over_shared_arrays(self):
+        # GIVEN
+        service_params = DataServiceParams(
+            tickers=["BOVA11", "SMAL11"], start_date=date.today()
+        )
+        data_service = DataService(params=service_params)
+        source = self.fake_pandas_reader_func([], None)
+        data_service.build_callbacks(
+            data_reader_func=lambda tickers, start_date: source.iloc[::-1]
+        )
+
+        # WHEN
+        data_service.load()
+
+        # THEN
+        bova, smal = data_service.cdataframes
+        self.assertEqual([bova.ticker, smal.ticker], ["BOVA11", "SMAL11"])
+        self.assertTrue(np.shares_memory(bova.values.base,
+                                         smal.values.base))
+        self.assertEqual(list(smal.view("close")),
+                         list(source["Adj Close"]["SMAL11.SA"]))
+        self.assertEqual(list(bova.dataframe.columns),
+                         ["time", "open", "high", "low", "close", "volume"])
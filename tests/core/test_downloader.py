@@ -0,0 +1,103 @@
+import threading
+import unittest
+from datetime import date
+from core.data_service import DataService, DataServiceParams
+from core.downloader import ChunkedDownloader, RateLimiter
+from core.synthetic import synthetic_yahoo_frame
+
+
+class FakeYahoo:
+    """Reader local: falha para tickers deslistados e na 1a chamada."""
+
+    def __init__(self, frame, delisted=(), flaky=()):
+        self.frame = frame
+        self.delisted = set(delisted)
+        self.flaky = set(flaky)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, start_date):
+        with self.lock:
+            self.calls.append(list(tickers))
+            flaky = self.flaky & set(tickers)
+            self.flaky -= flaky
+        if flaky:
+            raise TimeoutError("timeout")
+        if self.delisted & set(tickers):
+            raise KeyError("delisted")
+        columns = self.frame.columns.get_level_values(1).isin(tickers)
+        return self.frame.loc[:, columns]
+
+
+class TestChunkedDownloader(unittest.TestCase):
+    def setUp(self):
+        self.frame = synthetic_yahoo_frame(num_tickers=7, num_days=30)
+        self.tickers = list(self.frame["Close"].columns)
+        self.sleeps = []
+
+    def build(self, reader, **kwargs):
+        return ChunkedDownloader(reader, chunk_size=3, max_workers=3,
+                                 backoff=0.01, sleep=self.sleeps.append,
+                                 **kwargs)
+
+    def test_download_in_chunks(self):
+        reader = FakeYahoo(self.frame)
+
+        tickers_data, report = self.build(reader).download(self.tickers,
+                                                           date.today())
+
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(len(reader.calls), 3)
+        self.assertEqual(sorted(report.tickers), self.tickers)
+        self.assertEqual(tickers_data.shape, self.frame.shape)
+
+    def test_retry_with_backoff(self):
+        reader = FakeYahoo(self.frame, flaky=[self.tickers[0]])
+
+        _, report = self.build(reader).download(self.tickers, date.today())
+
+        self.assertEqual(report.errors, {})
+        self.assertEqual(report.attempts, 4)
+        self.assertEqual(self.sleeps, [0.01])
+
+    def test_delisted_ticker_is_reported_and_others_load(self):
+        reader = FakeYahoo(self.frame, delisted=[self.tickers[4]])
+        received = []
+
+        _, report = self.build(reader, retries=1).download(
+            self.tickers, date.today(),
+            on_chunk=lambda tickers, data: received.extend(tickers)
+        )
+
+        self.assertEqual(list(report.errors), [self.tickers[4]])
+        self.assertEqual(sorted(received),
+                         [t for t in self.tickers if t != self.tickers[4]])
+
+    def test_rate_limiter_spaces_calls(self):
+        now = [0.0]
+        sleeps = []
+        limiter = RateLimiter(2, clock=lambda: now[0], sleep=sleeps.append)
+
+        limiter.wait()
+        limiter.wait()
+        limiter.wait()
+
+        self.assertEqual(sleeps, [0.5, 1.0])
+
+    def test_data_service_chunked_load(self):
+        # GIVEN
+        reader = FakeYahoo(self.frame, delisted=[self.tickers[1]])
+        params = DataServiceParams(tickers=self.tickers,
+                                   start_date=date.today(), chunk_size=2,
+                                   retries=0)
+        data_service = DataService(params=params)
+        data_service.build_callbacks(data_reader_func=reader)
+
+        # WHEN
+        data_service.load()
+
+        # THEN
+        loaded = [cdf.ticker for cdf in data_service.cdataframes]
+        self.assertEqual(loaded, [t for t in self.tickers
+                                  if t != self.tickers[1]])
+        self.assertEqual(list(data_service.load_errors), [self.tickers[1]])
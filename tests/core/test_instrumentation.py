@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+import pandas as pd
+from core import instrumentation
+from core.data_service import DataService, DataServiceParams
+from core.instrumentation import Profiler
+from core.markowitz import calculate
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_stage_records_time_and_counts(self):
+        profiler = Profiler()
+
+        with profiler.stage("etapa", tickers=2) as record:
+            record.counts["rows"] = 10
+
+        self.assertEqual(len(profiler.records), 1)
+        observed = profiler.records[0]
+        self.assertEqual(observed.name, "etapa")
+        self.assertEqual(observed.counts, {"tickers": 2, "rows": 10})
+        self.assertGreaterEqual(observed.wall_seconds, 0)
+        self.assertGreaterEqual(observed.cpu_seconds, 0)
+
+    def test_global_subscribers_receive_every_stage(self):
+        observed = []
+        callback = instrumentation.subscribe(observed.append)
+        try:
+            with Profiler().stage("a"):
+                pass
+            with Profiler().stage("b"):
+                pass
+        finally:
+            instrumentation.unsubscribe(callback)
+        with Profiler().stage("c"):
+            pass
+
+        self.assertEqual([record.name for record in observed], ["a", "b"])
+
+    def test_data_service_and_calculate_stages(self):
+        # GIVEN
+        fixture_file = "tests/core/fixture_data_service_pandas_reader.csv"
+        source = pd.read_csv(fixture_file, header=[0, 1], index_col=[0])
+        profiler = Profiler()
+        params = DataServiceParams(tickers=["BOVA11", "SMAL11"],
+                                   start_date=date.today())
+        data_service = DataService(params=params, profiler=profiler)
+        data_service.build_callbacks(data_reader_func=lambda t, s: source)
+        close_prices_df = source["Adj Close"]
+
+        # WHEN
+        data_service.load()
+        calculate(close_prices_df, ["BOVA11", "SMAL11"], seed=0,
+                  plot=False, profiler=profiler)
+
+        # THEN
+        names = [record.name for record in profiler.records]
+        self.assertEqual(names, ["data_service.fetch",
+                                 "data_service.build_cdataframes",
+                                 "returns", "optimize"])
+        self.assertEqual(profiler.records[0].counts["rows"], len(source))
+
+    def test_write_json_trace(self):
+        profiler = Profiler()
+        with profiler.stage("etapa"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "trace.json")
+            profiler.write(filename)
+            with open(filename) as file:
+                trace = json.load(file)
+
+        self.assertEqual(trace["stages"][0]["name"], "etapa")
+        self.assertIn("peak_rss_bytes", trace["stages"][0])
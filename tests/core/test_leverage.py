@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from core.leverage import (equal_risk_contribution, leveraged_prices,
+                           risk_contributions, rolling_volatility,
+                           target_leverage)
+from core.synthetic import synthetic_close_prices
+
+VOLS = np.array([0.005, 0.01, 0.02, 0.04])
+
+
+class TestLeverage(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(500, ["A", "B", "C", "D"],
+                                             start_date="2020-01-01",
+                                             mean=0.0003, vol=VOLS)
+        self.returns = self.prices.pct_change().iloc[1:]
+
+    def test_rolling_volatility_matches_pandas(self):
+        expected = self.returns.rolling(20).std().to_numpy()
+        np.testing.assert_allclose(rolling_volatility(self.returns, 20),
+                                   expected, atol=1e-12)
+
+    def test_leverage_uses_previous_day(self):
+        leverage = target_leverage(self.returns, 0.10, window=20,
+                                   max_leverage=100)
+        volatility = self.returns.iloc[10:30].std().to_numpy() * np.sqrt(252)
+        np.testing.assert_allclose(leverage[30], 0.10 / volatility)
+        self.assertTrue(np.isnan(leverage[:20]).all())
+
+    def test_streams_reach_common_volatility(self):
+        # WHEN
+        prices, erc_weights = leveraged_prices(self.prices, 0.10, window=60)
+
+        # THEN
+        self.assertIsNone(erc_weights)
+        self.assertEqual(prices.index[0], self.prices.index[60])
+        volatility = prices.pct_change().std() * np.sqrt(252)
+        np.testing.assert_allclose(volatility, 0.10, rtol=0.15)
+
+    def test_max_leverage_caps_quiet_assets(self):
+        prices, _ = leveraged_prices(self.prices, 0.50, window=60,
+                                     max_leverage=2.0)
+        returns = prices.pct_change().iloc[1:]
+        raw = self.returns.loc[returns.index]
+        np.testing.assert_allclose(returns["A"], 2.0 * raw["A"])
+
+
+class TestEqualRiskContribution(unittest.TestCase):
+    def test_batch_has_equal_contributions(self):
+        # GIVEN
+        random_state = np.random.RandomState(1)
+        factors = random_state.normal(size=(3, 200, 6))
+        covs = np.stack([np.cov(f * [1, 2, 3, 1, 5, 2], rowvar=False)
+                         for f in factors])
+
+        # WHEN
+        weights = equal_risk_contribution(covs)
+
+        # THEN
+        for cov, w in zip(covs, weights):
+            self.assertAlmostEqual(w.sum(), 1.0)
+            np.testing.assert_allclose(risk_contributions(w, cov), 1 / 6)
+
+    def test_uncorrelated_is_inverse_volatility(self):
+        weights = equal_risk_contribution(np.diag([1.0, 4.0]))
+        np.testing.assert_allclose(weights, [2 / 3, 1 / 3])
+
+    def test_risk_parity_stage(self):
+        prices = synthetic_close_prices(500, ["A", "B", "C", "D"],
+                                        start_date="2020-01-01",
+                                        mean=0.0003, vol=VOLS)
+        prices, erc_weights = leveraged_prices(prices, 0.10,
+                                               window=60, risk_parity=True)
+        self.assertAlmostEqual(erc_weights.sum(), 1.0)
+        returns = prices.pct_change().iloc[1:].to_numpy()
+        np.testing.assert_allclose(
+            risk_contributions(np.full(4, 0.25),
+                               np.cov(returns, rowvar=False)),
+            0.25, atol=1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
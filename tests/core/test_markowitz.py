@@ -1,4 +1,6 @@
 from core.markowitz import run_markowitz, calculate
+import os
+import tempfile
 import unittest
 from datetime import date
 import pandas as pd
@@ -21,12 +23,58 @@ class TestMarkowitz(unittest.TestCase):
         fixture_path = "tests/core/fixture_test_e2e_refactor_run_markowitz_with_file.csv"
         self.fake_yfinance_results = pd.read_csv(fixture_path, index_col="Date")
         self.fake_stocks = ["BOVA11.SA", "SMAL11.SA"]
+        # o grafico vai para reports/ relativo ao diretorio corrente
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
         return super().setUp()
 
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+        return super().tearDown()
+
     def test_e2e_refactor_run_markowitz_with_file(self):
         expected_min_vol = 0.2056
         expected_max_sharpe = -0.5350
-        observed_min_vol, observed_max_sharpe = calculate(self.fake_yfinance_results, stocks=self.fake_stocks)
+        observed_min_vol, observed_max_sharpe = calculate(self.fake_yfinance_results, stocks=self.fake_stocks, seed=1)
 
         self.assertEqual(round(expected_min_vol, 4), round(observed_min_vol, 4))
         self.assertEqual(round(expected_max_sharpe, 4), round(observed_max_sharpe, 4))
+
+    def test_run_markowitz_with_file_optimizer(self):
+        expected_min_vol = 0.2056
+        expected_max_sharpe = -0.5350
+        observed_min_vol, observed_max_sharpe = calculate(
+            self.fake_yfinance_results, stocks=self.fake_stocks,
+            method="optimizer"
+        )
+
+        self.assertEqual(round(expected_min_vol, 4), round(observed_min_vol, 4))
+        self.assertEqual(round(expected_max_sharpe, 4), round(observed_max_sharpe, 4))
+
+    def test_run_markowitz_with_covariance_estimators(self):
+        for covariance in ["ledoit-wolf", "factor"]:
+            observed_min_vol, observed_max_sharpe = calculate(
+                self.fake_yfinance_results, stocks=self.fake_stocks,
+                method="optimizer", covariance=covariance, num_factors=1,
+                plot=False
+            )
+
+            self.assertTrue(0 < observed_min_vol < 1)
+            self.assertTrue(observed_max_sharpe < 0)
+
+    def test_run_markowitz_annualizes_by_periods(self):
+        daily_min_vol, daily_max_sharpe = calculate(
+            self.fake_yfinance_results, stocks=self.fake_stocks,
+            method="optimizer", plot=False
+        )
+        weekly_min_vol, weekly_max_sharpe = calculate(
+            self.fake_yfinance_results, stocks=self.fake_stocks,
+            method="optimizer", plot=False, periods=52
+        )
+
+        self.assertAlmostEqual(weekly_min_vol,
+                               daily_min_vol * (52 / 252) ** 0.5)
+        self.assertAlmostEqual(weekly_max_sharpe,
+                               daily_max_sharpe * (52 / 252) ** 0.5)
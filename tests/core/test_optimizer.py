@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from core.optimizer import (optimize_portfolios, min_variance_weights,
+                            max_sharpe_weights, target_return_weights)
+from core.simulation import evaluate_portfolios
+
+
+class TestOptimizer(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(3)
+        daily_returns = random_state.normal(0.0005, 0.01, (500, 3))
+        daily_returns *= np.array([0.6, 1.0, 1.8])
+        self.mean_returns = daily_returns.mean(axis=0)
+        self.cov_matrix = np.cov(daily_returns.T)
+
+        # grade densa do simplex com 3 ativos como referencia
+        grid = np.linspace(0, 1, 201)
+        w1, w2 = np.meshgrid(grid, grid)
+        mask = (w1 + w2) <= 1
+        self.grid = np.column_stack([w1[mask], w2[mask],
+                                     1 - w1[mask] - w2[mask]])
+
+    def test_min_variance_is_at_least_as_good_as_grid(self):
+        weights = min_variance_weights(self.cov_matrix)
+        _, grid_stdevs, _ = evaluate_portfolios(
+            self.grid, self.mean_returns, self.cov_matrix
+        )
+        _, stdev, _ = evaluate_portfolios(
+            weights[np.newaxis, :], self.mean_returns, self.cov_matrix
+        )
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertTrue((weights >= 0).all())
+        self.assertLessEqual(stdev[0], grid_stdevs.min() + 1e-12)
+
+    def test_max_sharpe_is_at_least_as_good_as_grid(self):
+        weights = max_sharpe_weights(self.mean_returns, self.cov_matrix)
+        _, _, grid_sharpes = evaluate_portfolios(
+            self.grid, self.mean_returns, self.cov_matrix
+        )
+        _, _, sharpe = evaluate_portfolios(
+            weights[np.newaxis, :], self.mean_returns, self.cov_matrix
+        )
+        self.assertGreaterEqual(sharpe[0], grid_sharpes.max() - 1e-12)
+
+    def test_max_sharpe_with_negative_returns(self):
+        mean_returns = -np.abs(self.mean_returns)
+        weights = max_sharpe_weights(mean_returns, self.cov_matrix)
+        _, _, grid_sharpes = evaluate_portfolios(
+            self.grid, mean_returns, self.cov_matrix
+        )
+        _, _, sharpe = evaluate_portfolios(
+            weights[np.newaxis, :], mean_returns, self.cov_matrix
+        )
+        self.assertGreaterEqual(sharpe[0], grid_sharpes.max() - 1e-12)
+
+    def test_target_return_weights_hit_target(self):
+        target = np.mean(self.mean_returns)
+        weights = target_return_weights(self.mean_returns, self.cov_matrix,
+                                        target)
+        self.assertAlmostEqual(weights @ self.mean_returns, target)
+        self.assertAlmostEqual(weights.sum(), 1.0)
+
+    def test_frontier_is_monotonic(self):
+        result = optimize_portfolios(self.mean_returns, self.cov_matrix,
+                                     frontier_points=10)
+        self.assertEqual(result.returns.shape, (10,))
+        self.assertTrue((np.diff(result.returns) >= -1e-12).all())
+        self.assertTrue((np.diff(result.stdevs) >= -1e-9).all())
+        self.assertAlmostEqual(result.stdevs[0], result.min_vol.stdev)
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from core.data_service import DataService, DataServiceParams
+from core.price_cache import PriceCache
+
+
+class TestPriceCache(unittest.TestCase):
+    def setUp(self):
+        self.fixture_file = "tests/core/fixture_data_service_pandas_reader.csv"
+        self.source = pd.read_csv(self.fixture_file, header=[0, 1],
+                                  index_col=[0], parse_dates=True)
+        self.calls = []
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.now = datetime(2023, 3, 1, 18, 0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def fake_reader(self, tickers, start_date):
+        # fonte local no lugar do Yahoo: so devolve o que foi pedido
+        self.calls.append((list(tickers), start_date))
+        data = self.source.loc[pd.Timestamp(start_date):]
+        return data.loc[:, data.columns.get_level_values(1).isin(tickers)]
+
+    def build_service(self, tickers, start_date):
+        params = DataServiceParams(tickers=tickers, start_date=start_date)
+        data_service = DataService(params=params)
+        cache = PriceCache(self.tmp_dir.name, clock=lambda: self.now)
+        data_service.build_callbacks(data_reader_func=self.fake_reader,
+                                     price_cache=cache)
+        return data_service
+
+    def test_second_load_uses_cache(self):
+        # GIVEN
+        first = self.build_service(["BOVA11", "SMAL11"], date(2023, 1, 1))
+        first.load()
+
+        # WHEN
+        second = self.build_service(["BOVA11", "SMAL11"], date(2023, 1, 1))
+        second.load()
+
+        # THEN
+        self.assertEqual(len(self.calls), 1)
+        pd.testing.assert_series_equal(
+            first.cdataframes[0].dataframe["close"],
+            second.cdataframes[0].dataframe["close"],
+        )
+        self.assertEqual(len(second.cdataframes[1].dataframe),
+                         len(self.source))
+
+    def test_stale_cache_fetches_only_missing_dates(self):
+        # GIVEN
+        last_date = self.source.index[-1]
+        full_source = self.source
+        self.source = full_source.loc[:last_date - timedelta(days=7)]
+        self.build_service(["BOVA11"], date(2023, 1, 1)).load()
+
+        # WHEN
+        self.source = full_source
+        self.now = self.now + timedelta(days=1)
+        data_service = self.build_service(["BOVA11"], date(2023, 1, 1))
+        data_service.load()
+
+        # THEN
+        self.assertEqual(len(self.calls), 2)
+        self.assertGreater(pd.Timestamp(self.calls[1][1]),
+                           pd.Timestamp("2023-01-01"))
+        self.assertEqual(len(data_service.cdataframes[0].dataframe),
+                         len(full_source))
+
+    def test_earlier_start_date_refetches_history(self):
+        self.build_service(["BOVA11"], date(2023, 2, 1)).load()
+        data_service = self.build_service(["BOVA11"], date(2023, 1, 1))
+        data_service.load()
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(data_service.cdataframes[0].dataframe),
+                         len(self.source))
+
+    def test_stale_cache_rescales_adjusted_history(self):
+        # GIVEN
+        last_date = self.source.index[-1]
+        full_source = self.source
+        self.source = full_source.loc[:last_date - timedelta(days=7)]
+        self.build_service(["BOVA11"], date(2023, 1, 1)).load()
+
+        # WHEN
+        # provento depois do cache: a fonte reescala todo o historico
+        adjusted = full_source.copy()
+        before = adjusted.index < last_date - timedelta(days=3)
+        adjusted.loc[before, "Adj Close"] = (
+            adjusted.loc[before, "Adj Close"].to_numpy() * 0.95
+        )
+        self.source = adjusted
+        self.now = self.now + timedelta(days=1)
+        self.build_service(["BOVA11"], date(2023, 1, 1)).load()
+
+        # THEN
+        cached = PriceCache(self.tmp_dir.name).read("BOVA11.SA")
+        np.testing.assert_allclose(
+            cached.frame["Adj Close"].to_numpy(),
+            adjusted[("Adj Close", "BOVA11.SA")].to_numpy(),
+        )
@@ -0,0 +1,196 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+import numpy as np
+import pandas as pd
+from core.cdataframe import COHLCDataFrame
+from core.data_service import DataService, DataServiceParams
+from core.price_store import (PriceStore, FileDataReader,
+                              PartitionedPriceStore)
+
+
+class TestPriceStore(unittest.TestCase):
+    def setUp(self):
+        fixture_file = "tests/core/fixture_data_service_pandas_reader.csv"
+        self.source = pd.read_csv(fixture_file, header=[0, 1],
+                                  index_col=[0], parse_dates=True)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cdataframes = []
+        for ticker in ["BOVA11", "SMAL11"]:
+            ticker_yf = f"{ticker}.SA"
+            df = pd.DataFrame({
+                "close": self.source["Adj Close"][ticker_yf],
+                "open": self.source["Open"][ticker_yf],
+                "high": self.source["High"][ticker_yf],
+                "low": self.source["Low"][ticker_yf],
+                "volume": self.source["Volume"][ticker_yf],
+                "time": self.source.index,
+            })
+            self.cdataframes.append(
+                COHLCDataFrame(df, info={"ticker": ticker})
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load_from_files(self, tickers, start_date=date(2023, 1, 1)):
+        params = DataServiceParams(tickers=tickers, start_date=start_date,
+                                   source="file", data_dir=self.tmp_dir.name)
+        data_service = DataService(params=params)
+        data_service.load()
+        return data_service
+
+    def test_load_from_save_prices_layout(self):
+        # GIVEN
+        for cdf in self.cdataframes:
+            filename = os.path.join(self.tmp_dir.name,
+                                    f"prices_{cdf.ticker}.csv")
+            cdf.save_price(filename)
+
+        # WHEN
+        data_service = self.load_from_files(["BOVA11", "SMAL11"])
+
+        # THEN
+        self.assertEqual(len(data_service.cdataframes), 2)
+        loaded = data_service.cdataframes[1]
+        np.testing.assert_allclose(
+            loaded.dataframe["close"].to_numpy(),
+            self.source["Adj Close"]["SMAL11.SA"].to_numpy(),
+        )
+        self.assertEqual(loaded.info["source"], "file")
+
+    def test_load_from_binary_store(self):
+        # GIVEN
+        PriceStore(self.tmp_dir.name).write_cdataframes(self.cdataframes)
+
+        # WHEN
+        data_service = self.load_from_files(["SMAL11"],
+                                            start_date=date(2023, 2, 1))
+
+        # THEN
+        loaded = data_service.cdataframes[0].dataframe
+        expected = self.source.loc["2023-02-01":]
+        np.testing.assert_allclose(loaded["volume"].to_numpy(),
+                                   expected["Volume"]["SMAL11.SA"])
+        self.assertEqual(len(loaded), len(expected))
+
+    def test_binary_store_is_memory_mapped(self):
+        store = PriceStore(self.tmp_dir.name)
+        store.write_cdataframes(self.cdataframes)
+
+        self.assertIsInstance(store.open("close"), np.memmap)
+        self.assertEqual(store.tickers, ["BOVA11", "SMAL11"])
+        data = FileDataReader(self.tmp_dir.name)(["BOVA11.SA", "XPTO11"])
+        self.assertEqual(data["Adj Close"].shape, (len(self.source), 1))
+
+
+def bars(ticker, dates, close):
+    time = pd.DatetimeIndex(pd.to_datetime(dates)).values.view(np.int64)
+    close = np.asarray(close, dtype=np.float64)
+    values = np.vstack([close, close + 1, close - 1, close,
+                        np.full(len(close), 100.0)])
+    return COHLCDataFrame.from_arrays(time, values, info={"ticker": ticker})
+
+
+class TestPartitionedPriceStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = PartitionedPriceStore(self.tmp_dir.name, workers=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_bulk_save_prices_round_trip(self):
+        # GIVEN
+        dates = ["2022-12-29", "2022-12-30", "2023-01-02", "2023-01-03"]
+        params = DataServiceParams(tickers=["AAA", "BBB"],
+                                   start_date=date(2022, 1, 1),
+                                   source="file", data_dir=self.tmp_dir.name)
+        data_service = DataService(params=params)
+        data_service.cdataframes = [bars("AAA", dates, [1, 2, 3, 4]),
+                                    bars("BBB", dates[1:], [5, 6, 7])]
+
+        # WHEN
+        data_service.save_prices(mode="bulk")
+
+        # THEN
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)),
+                         ["2022", "2023"])
+        data = FileDataReader(self.tmp_dir.name)(["BBB", "AAA"])
+        self.assertEqual(list(data["Adj Close"].columns), ["BBB", "AAA"])
+        np.testing.assert_allclose(data["Adj Close"]["AAA"], [1, 2, 3, 4])
+        np.testing.assert_allclose(data["Adj Close"]["BBB"],
+                                   [np.nan, 5, 6, 7])
+        later = FileDataReader(self.tmp_dir.name)(["AAA"], "2023-01-03")
+        self.assertEqual(len(later), 1)
+
+    def test_append_only_writes_new_dates(self):
+        # GIVEN
+        self.store.write_cdataframes(
+            [bars("AAA", ["2022-12-30", "2023-01-02"], [1, 2])]
+        )
+
+        # WHEN: historico revisado na fonte e um pregao novo
+        years = self.store.write_cdataframes(
+            [bars("AAA", ["2022-12-30", "2023-01-02", "2023-01-03"],
+                  [9, 9, 3])]
+        )
+
+        # THEN
+        self.assertEqual(years, [2023])
+        data = self.store.read(["AAA"])
+        np.testing.assert_allclose(data["Adj Close"]["AAA"], [1, 2, 3])
+
+    def test_ticker_missing_from_one_export_is_completed_later(self):
+        # GIVEN: B falha no segundo export (load_errors)
+        first = pd.bdate_range("2023-01-02", "2023-01-10")
+        second = pd.bdate_range("2023-01-02", "2023-01-20")
+        self.store.write_cdataframes([bars("A", first, np.ones(len(first))),
+                                      bars("B", first, np.ones(len(first)))])
+        self.store.write_cdataframes([bars("A", second,
+                                           np.ones(len(second)))])
+
+        # WHEN
+        third = pd.bdate_range("2023-01-02", "2023-01-25")
+        years = self.store.write_cdataframes(
+            [bars("A", third, np.ones(len(third))),
+             bars("B", third, np.arange(len(third), dtype=float))]
+        )
+
+        # THEN: sem buraco em B e o historico ja gravado fica
+        self.assertEqual(years, [2023])
+        data = self.store.read(["A", "B"])["Adj Close"]
+        self.assertEqual(len(data), len(third))
+        self.assertFalse(data.isna().any().any())
+        np.testing.assert_allclose(data["B"].iloc[:len(first)], 1.0)
+        np.testing.assert_allclose(data["B"].iloc[len(first):],
+                                   np.arange(len(first), len(third)))
+
+    def test_unchanged_export_rewrites_nothing(self):
+        cdataframes = [bars("AAA", ["2022-06-01", "2023-06-01"], [1, 2])]
+        self.store.write_cdataframes(cdataframes)
+
+        self.assertEqual(self.store.write_cdataframes(cdataframes), [])
+
+    def test_append_new_ticker_fills_its_history(self):
+        self.store.write_cdataframes(
+            [bars("AAA", ["2021-06-01", "2022-06-01"], [1, 2])]
+        )
+
+        years = self.store.write_cdataframes(
+            [bars("BBB", ["2022-06-01"], [7])]
+        )
+
+        self.assertEqual(years, [2022])
+        self.assertEqual(self.store.tickers, ["AAA", "BBB"])
+        data = self.store.read(["AAA", "BBB"])
+        np.testing.assert_allclose(data["Adj Close"]["BBB"], [np.nan, 7])
+        np.testing.assert_allclose(data["Adj Close"]["AAA"], [1, 2])
+
+    def test_unknown_export_mode(self):
+        data_service = DataService(params=DataServiceParams(
+            tickers=[], start_date=date(2022, 1, 1),
+            data_dir=self.tmp_dir.name))
+        with self.assertRaises(ValueError):
+            data_service.save_prices(mode="parquet")
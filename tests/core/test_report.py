@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.report import downsample, render_markowitz_report
+from core.simulation import simulate_portfolios
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        daily_returns = random_state.normal(0.0005, 0.01, (250, 3))
+        self.simulation = simulate_portfolios(
+            daily_returns.mean(axis=0), np.cov(daily_returns.T), 20000,
+            seed=0, frontier_bins=30
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "report.png")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_downsample_to_fixed_number_of_points(self):
+        points = downsample(self.simulation.stdevs, self.simulation.returns,
+                            self.simulation.sharpes, max_points=1000)
+        self.assertEqual([len(values) for values in points],
+                         [1000, 1000, 1000])
+
+    def test_render_without_pyplot(self):
+        observed = render_markowitz_report(self.simulation, ["A", "B", "C"],
+                                           filename=self.filename)
+        self.assertEqual(observed, self.filename)
+        self.assertTrue(os.path.exists(self.filename))
+        self.assertNotIn("matplotlib.pyplot", sys.modules)
+
+    def test_render_in_background(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = render_markowitz_report(self.simulation, ["A"],
+                                             filename=self.filename,
+                                             executor=executor)
+            self.assertEqual(future.result(), self.filename)
+        self.assertTrue(os.path.exists(self.filename))
@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from core.optimizer import max_sharpe_weights
+from core.resampling import (bootstrap_counts, bootstrap_moments,
+                             resample_portfolios)
+
+
+def daily_returns(num_days=300, num_stocks=6, seed=0):
+    random_state = np.random.RandomState(seed)
+    market = random_state.normal(0.0004, 0.01, (num_days, 1))
+    return 0.6 * market + random_state.normal(0.0003, 0.012,
+                                              (num_days, num_stocks))
+
+
+class TestResampling(unittest.TestCase):
+    def setUp(self):
+        self.returns = daily_returns()
+
+    def test_batched_moments_match_explicit_resamples(self):
+        # GIVEN
+        counts = bootstrap_counts(np.random.default_rng(3), 4,
+                                  len(self.returns))
+
+        # WHEN
+        means, covs = bootstrap_moments(self.returns, counts)
+
+        # THEN
+        np.testing.assert_array_equal(counts.sum(axis=1), len(self.returns))
+        for b in range(4):
+            rows = np.repeat(np.arange(len(self.returns)),
+                             counts[b].astype(int))
+            resample = self.returns[rows]
+            np.testing.assert_allclose(means[b], resample.mean(axis=0),
+                                       atol=1e-15)
+            np.testing.assert_allclose(covs[b],
+                                       np.cov(resample, rowvar=False),
+                                       atol=1e-15)
+
+    def test_average_weights_and_intervals(self):
+        result = resample_portfolios(self.returns, 60, seed=1)
+
+        self.assertEqual(result.num_portfolios, 60)
+        self.assertAlmostEqual(result.max_sharpe.weights.sum(), 1.0)
+        lower, upper = result.max_sharpe_interval
+        self.assertTrue((0 <= lower).all() and (upper <= 1).all())
+        self.assertTrue((lower <= upper).all())
+        self.assertTrue((upper > lower).any())
+        self.assertEqual(len(result.sharpes), 60)
+
+    def test_workers_and_batches_do_not_change_result(self):
+        serial = resample_portfolios(self.returns, 40, seed=2, batch_size=7)
+        parallel = resample_portfolios(self.returns, 40, seed=2, workers=2)
+        np.testing.assert_allclose(serial.max_sharpe.weights,
+                                   parallel.max_sharpe.weights)
+        np.testing.assert_allclose(serial.min_vol_interval,
+                                   parallel.min_vol_interval)
+
+    def test_weights_are_more_stable_than_single_optimization(self):
+        # janela deslocada em 5 pregoes
+        first, second = self.returns[:-5], self.returns[5:]
+
+        def change(weights):
+            return np.abs(weights(first) - weights(second)).sum()
+
+        single = change(lambda returns: max_sharpe_weights(
+            returns.mean(axis=0), np.cov(returns, rowvar=False)))
+        resampled = change(lambda returns: resample_portfolios(
+            returns, 100, seed=4).max_sharpe.weights)
+        self.assertLess(resampled, single)
+
+
+if __name__ == "__main__":
+    unittest.main()
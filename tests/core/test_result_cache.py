@@ -0,0 +1,130 @@
+from contextlib import redirect_stdout
+import io
+import os
+import tempfile
+import time
+import unittest
+import pandas as pd
+from core.instrumentation import Profiler
+from core.markowitz import calculate
+from core.report import report_filename
+from core.resampling import ResampledResult
+from core.result_cache import ResultCache, result_key
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        fixture_path = os.path.join(
+            "tests", "core",
+            "fixture_test_e2e_refactor_run_markowitz_with_file.csv"
+        )
+        self.prices = pd.read_csv(fixture_path, index_col="Date")
+        self.stocks = ["BOVA11.SA", "SMAL11.SA"]
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.tmp_dir.name, "results"))
+        # os PNGs vao para reports/ do diretorio atual: nao mexe no checkout
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_prices_and_params(self):
+        key = result_key(self.prices, {"seed": 1})
+        changed = self.prices.copy()
+        changed.iloc[3, 0] += 0.01
+
+        self.assertEqual(key, result_key(self.prices.copy(), {"seed": 1}))
+        self.assertNotEqual(key, result_key(self.prices, {"seed": 2}))
+        self.assertNotEqual(key, result_key(changed, {"seed": 1}))
+
+    def stages(self, **options):
+        profiler = Profiler()
+        result = calculate(self.prices, self.stocks, seed=1,
+                           result_cache=self.cache, profiler=profiler,
+                           **options)
+        return result, [record.name for record in profiler.records]
+
+    def test_second_run_is_served_from_cache(self):
+        # GIVEN
+        first, _ = self.stages(plot=False)
+
+        # WHEN
+        second, stages = self.stages(plot=False)
+
+        # THEN
+        self.assertEqual(stages, ["result_cache"])
+        self.assertEqual(first, second)
+
+    def test_unseeded_runs_are_not_cached(self):
+        calculate(self.prices, self.stocks, num_portfolios=500, plot=False,
+                  result_cache=self.cache)
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_report_is_redrawn_only_when_changed(self):
+        # GIVEN
+        self.stages()
+
+        # WHEN
+        _, stages = self.stages()
+
+        # THEN
+        self.assertNotIn("report", stages)
+
+        # WHEN: outro run regravou o PNG
+        with open(report_filename(self.stocks), "ab") as file:
+            file.write(b"x")
+        _, stages = self.stages()
+
+        # THEN
+        self.assertEqual(stages, ["result_cache", "report"])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        # GIVEN
+        for seed in range(3):
+            calculate(self.prices, self.stocks, seed=seed,
+                      num_portfolios=2000, plot=False,
+                      result_cache=self.cache)
+            time.sleep(0.01)
+        sizes = [size for _, size, _ in self.cache.entries()]
+        oldest = self.cache.entries()[0][2]
+        # usa a mais antiga: passa a ser a mais recente
+        self.assertIsNotNone(self.cache.get(oldest[:-len(".npz")]))
+
+        # WHEN
+        self.cache.max_bytes = sum(sizes) - 1
+        self.cache.evict()
+
+        # THEN
+        files = [file for _, _, file in self.cache.entries()]
+        self.assertEqual(len(files), 2)
+        self.assertIn(oldest, files)
+
+    def test_resampled_result_keeps_weight_intervals(self):
+        # GIVEN
+        first, _ = self.stages(plot=False, method="resampled",
+                               num_resamples=20)
+
+        # WHEN
+        with redirect_stdout(io.StringIO()) as output:
+            second, stages = self.stages(plot=False, method="resampled",
+                                         num_resamples=20)
+
+        # THEN
+        self.assertEqual(stages, ["result_cache"])
+        self.assertEqual(first, second)
+        self.assertIn("intervalo de 90% dos pesos", output.getvalue())
+        cached = self.cache.get(self.cache.entries()[0][2][:-len(".npz")])
+        self.assertIsInstance(cached.simulation, ResampledResult)
+        self.assertEqual(cached.simulation.max_sharpe_interval.shape, (2, 2))
+
+    def test_clear(self):
+        calculate(self.prices, self.stocks, seed=1, plot=False,
+                  result_cache=self.cache)
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import numpy as np
+from core.optimizer import optimize_portfolios
+from core.server import OptimizationService, build_server
+from core.synthetic import synthetic_close_prices
+
+
+class TestOptimizationService(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(200, 5)
+        self.loads = 0
+        self.service = OptimizationService(self.loader, workers=0,
+                                           refresh_seconds=0)
+        self.service.start()
+
+    def loader(self):
+        # cada refresh traz 20 pregoes a mais
+        self.loads += 1
+        return self.prices.iloc[:140 + 20 * self.loads]
+
+    def test_subset_matches_single_optimization(self):
+        # WHEN
+        response = self.service.optimize({"tickers": ["T3", "T1"]})
+
+        # THEN
+        returns = self.prices.iloc[:160][["T3", "T1"]].pct_change()
+        expected = optimize_portfolios(returns.mean().values,
+                                       returns.cov().values)
+        self.assertAlmostEqual(response["max_sharpe"]["sharpe"],
+                               expected.max_sharpe.sharpe)
+        self.assertEqual(list(response["min_vol"]["weights"]), ["T3", "T1"])
+
+    def test_date_window(self):
+        # WHEN
+        start, end = self.prices.index[50], self.prices.index[120]
+        response = self.service.optimize({
+            "tickers": ["T0", "T2"], "start": start.isoformat(),
+            "end": end.isoformat(), "method": "montecarlo",
+            "num_portfolios": 2000, "seed": 1,
+        })
+
+        # THEN
+        returns = self.prices[["T0", "T2"]].pct_change().loc[start:end]
+        weights = np.array(list(response["min_vol"]["weights"].values()))
+        stdev = np.sqrt(weights @ returns.cov().values @ weights * 252)
+        self.assertAlmostEqual(response["min_vol"]["stdev"], stdev)
+
+    def test_refresh_swaps_snapshot(self):
+        before = self.service.snapshot
+        self.service.refresh()
+        self.assertEqual(len(self.service.snapshot.index),
+                         len(before.index) + 20)
+
+    def test_single_ticker_snapshot(self):
+        # GIVEN
+        service = OptimizationService(lambda: self.prices[["T2"]],
+                                      workers=0, refresh_seconds=0)
+        service.start()
+
+        # WHEN
+        response = service.optimize({})
+
+        # THEN
+        self.assertEqual(response["min_vol"]["weights"], {"T2": 1.0})
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            self.service.optimize({"tickers": ["XX"]})
+        with self.assertRaises(ValueError):
+            self.service.optimize({"method": "genetic"})
+
+
+class TestOptimizationServer(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(200, 5)
+        self.service = OptimizationService(self.loader, workers=0,
+                                           refresh_seconds=0)
+        self.service.start()
+        self.server = build_server(self.service, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.service.stop()
+
+    def loader(self):
+        if self.prices is None:
+            raise ConnectionError("fonte fora do ar")
+        return self.prices
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_health_and_optimize(self):
+        with urllib.request.urlopen(self.url + "/health") as response:
+            health = json.loads(response.read())
+        self.assertEqual(health["rows"], 199)
+
+        response = self.post("/optimize", {"tickers": ["T0", "T4"]})
+        self.assertAlmostEqual(
+            sum(response["max_sharpe"]["weights"].values()), 1.0)
+
+    def test_bad_request(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post("/optimize", {"tickers": ["XX"]})
+        self.assertEqual(context.exception.code, 400)
+        context.exception.close()
+
+    def test_refresh_failure_keeps_snapshot(self):
+        # GIVEN
+        before = self.service.snapshot
+        self.prices = None
+
+        # WHEN
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post("/refresh", {})
+
+        # THEN
+        self.assertEqual(context.exception.code, 502)
+        context.exception.close()
+        self.assertIs(self.service.snapshot, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import numpy as np
+from core.optimizer import optimize_portfolios
+from core.simulation import (simulate_portfolios, draw_weights,
+                             evaluate_portfolios,
+                             simulate_portfolios_adaptive)
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(42)
+        daily_returns = random_state.normal(0.0005, 0.01, (250, 4))
+        self.mean_returns = daily_returns.mean(axis=0)
+        self.cov_matrix = np.cov(daily_returns.T)
+
+    def run_loop(self, num_portfolios, seed):
+        # referencia: loop original de core.markowitz.calculate
+        random_state = np.random.RandomState(seed)
+        sharpes, stdevs = [], []
+        for _ in range(num_portfolios):
+            weights = random_state.random(len(self.mean_returns))
+            weights /= np.sum(weights)
+            ret = np.sum(self.mean_returns * weights) * 252
+            stdev = np.sqrt(
+                np.dot(weights.T, np.dot(self.cov_matrix, weights))
+            ) * np.sqrt(252)
+            sharpes.append(ret / stdev)
+            stdevs.append(stdev)
+        return max(sharpes), min(stdevs)
+
+    def test_same_answer_as_loop_for_fixed_seed(self):
+        # GIVEN
+        expected_sharpe, expected_stdev = self.run_loop(2000, seed=7)
+
+        # WHEN
+        result = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                     2000, seed=7, block_size=300)
+
+        # THEN
+        self.assertAlmostEqual(result.max_sharpe.sharpe, expected_sharpe)
+        self.assertAlmostEqual(result.min_vol.stdev, expected_stdev)
+        self.assertEqual(result.returns.shape, (2000,))
+
+    def test_block_size_does_not_change_results(self):
+        result_a = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                       1000, seed=3, block_size=1000)
+        result_b = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                       1000, seed=3, block_size=64)
+
+        np.testing.assert_allclose(result_a.sharpes, result_b.sharpes)
+        np.testing.assert_allclose(result_a.max_sharpe.weights,
+                                   result_b.max_sharpe.weights)
+
+    def test_draw_weights_sum_to_one(self):
+        weights = draw_weights(np.random.RandomState(0), 10, 4)
+        np.testing.assert_allclose(weights.sum(axis=1), np.ones(10))
+        returns, stdevs, sharpes = evaluate_portfolios(
+            weights, self.mean_returns, self.cov_matrix
+        )
+        np.testing.assert_allclose(sharpes, returns / stdevs)
+
+
+class TestParallelSimulation(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(1)
+        daily_returns = random_state.normal(0.0003, 0.01, (250, 5))
+        self.mean_returns = daily_returns.mean(axis=0)
+        self.cov_matrix = np.cov(daily_returns.T)
+
+    def simulate(self, workers):
+        return simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                   5000, seed=11, block_size=500,
+                                   workers=workers, frontier_bins=50)
+
+    def test_same_results_for_any_number_of_workers(self):
+        # GIVEN
+        single = self.simulate(workers=1)
+
+        # WHEN
+        multi = self.simulate(workers=3)
+
+        # THEN
+        self.assertEqual(single.max_sharpe.index, multi.max_sharpe.index)
+        self.assertEqual(single.max_sharpe.sharpe, multi.max_sharpe.sharpe)
+        self.assertEqual(single.min_vol.stdev, multi.min_vol.stdev)
+        np.testing.assert_array_equal(single.max_sharpe.weights,
+                                      multi.max_sharpe.weights)
+        np.testing.assert_array_equal(single.frontier.points()[1],
+                                      multi.frontier.points()[1])
+
+    def test_parallel_does_not_keep_full_results(self):
+        result = self.simulate(workers=2)
+        self.assertIsNone(result.returns)
+        self.assertLessEqual(len(result.frontier.points()[0]), 50)
+        self.assertEqual(result.num_portfolios, 5000)
+
+
+class TestStreamingSimulation(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(5)
+        daily_returns = random_state.normal(0.0004, 0.01, (250, 6))
+        self.mean_returns = daily_returns.mean(axis=0)
+        self.cov_matrix = np.cov(daily_returns.T)
+
+    def test_stream_finds_same_best_portfolios(self):
+        # GIVEN
+        full = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                   3000, seed=2, block_size=250)
+
+        # WHEN
+        streamed = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                       3000, seed=2, block_size=250,
+                                       frontier_bins=40, stream=True)
+
+        # THEN
+        self.assertIsNone(streamed.returns)
+        self.assertEqual(full.max_sharpe.index, streamed.max_sharpe.index)
+        self.assertEqual(full.min_vol.stdev, streamed.min_vol.stdev)
+        self.assertEqual(streamed.frontier.returns.shape, (40,))
+
+    def test_frontier_envelope_keeps_max_return_per_bin(self):
+        full = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                   3000, seed=2, frontier_bins=40)
+        stdevs, returns, _ = full.frontier.points()
+        self.assertAlmostEqual(returns.max(), full.returns.max())
+        self.assertAlmostEqual(stdevs.min(), full.min_vol.stdev, places=2)
+
+
+class TestAdaptiveSimulation(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(7)
+        daily_returns = random_state.normal(0.0004, 0.01, (250, 20))
+        self.mean_returns = daily_returns.mean(axis=0)
+        self.cov_matrix = np.cov(daily_returns.T)
+
+    def test_stops_early_and_reports_samples_used(self):
+        # WHEN
+        result = simulate_portfolios_adaptive(
+            self.mean_returns, self.cov_matrix, 10 ** 6, seed=1,
+            block_size=1000
+        )
+
+        # THEN
+        self.assertTrue(result.converged)
+        self.assertLess(result.num_portfolios, 10 ** 6)
+        self.assertEqual(len(result.sharpes), result.num_portfolios)
+        np.testing.assert_allclose(result.max_sharpe.weights.sum(), 1.0)
+
+    def test_beats_uniform_sampling_with_same_budget(self):
+        adaptive = simulate_portfolios_adaptive(
+            self.mean_returns, self.cov_matrix, 10 ** 6, seed=1,
+            block_size=1000, stream=True
+        )
+        uniform = simulate_portfolios(self.mean_returns, self.cov_matrix,
+                                      adaptive.num_portfolios, seed=1,
+                                      stream=True)
+        exact = optimize_portfolios(self.mean_returns, self.cov_matrix)
+
+        self.assertGreater(adaptive.max_sharpe.sharpe,
+                           uniform.max_sharpe.sharpe)
+        self.assertLess(adaptive.min_vol.stdev, uniform.min_vol.stdev)
+        self.assertLessEqual(adaptive.max_sharpe.sharpe,
+                             exact.max_sharpe.sharpe + 1e-9)
+
+    def test_budget_caps_samples(self):
+        result = simulate_portfolios_adaptive(
+            self.mean_returns, self.cov_matrix, 2500, seed=1,
+            block_size=1000, tolerance=0.0
+        )
+        self.assertFalse(result.converged)
+        self.assertEqual(result.num_portfolios, 2500)
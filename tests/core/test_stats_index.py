@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from core.markowitz import calculate
+from core.stats_index import (ReturnsStatsIndex, RollingStats,
+                              load_or_build_stats_index,
+                              stats_index_filename)
+from core.synthetic import synthetic_close_prices
+
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+class TestReturnsStatsIndex(unittest.TestCase):
+    def setUp(self):
+        self.prices = synthetic_close_prices(60, TICKERS, mean=0.001,
+                                             vol=0.02)
+        self.index = ReturnsStatsIndex.from_prices(self.prices)
+
+    def test_full_window_matches_pandas(self):
+        # WHEN
+        mean, cov = self.index.stats()
+
+        # THEN
+        returns = self.prices.pct_change()
+        pd.testing.assert_series_equal(mean, returns.mean())
+        pd.testing.assert_frame_equal(cov, returns.cov())
+
+    def test_any_window_matches_rescan(self):
+        for start, end in [(5, 30), (0, 59), (40, 45)]:
+            # GIVEN
+            window = self.prices.iloc[start:end + 1]
+
+            # WHEN
+            mean, cov = self.index.stats(window.index[1], window.index[-1])
+
+            # THEN
+            returns = window.pct_change()
+            np.testing.assert_allclose(mean, returns.mean(), atol=1e-15)
+            np.testing.assert_allclose(cov, returns.cov(), atol=1e-15)
+
+    def test_short_window_raises(self):
+        with self.assertRaises(ValueError):
+            self.index.stats(self.prices.index[3], self.prices.index[3])
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "stats.npz")
+            self.index.save(filename)
+            loaded = ReturnsStatsIndex.load(filename)
+
+        self.assertEqual(loaded.columns, self.index.columns)
+        np.testing.assert_array_equal(loaded.time, self.index.time)
+        pd.testing.assert_frame_equal(loaded.stats()[1], self.index.stats()[1])
+
+    def test_matches_only_the_same_calendar(self):
+        self.assertTrue(self.index.matches(self.prices))
+        self.assertTrue(self.index.matches(self.prices.iloc[10:40]))
+        # datas a menos no meio: os retornos cobrem dois pregoes
+        self.assertFalse(self.index.matches(self.prices.iloc[::10]))
+        self.assertFalse(self.index.matches(
+            self.prices.drop(self.prices.index[20])))
+        self.assertFalse(self.index.matches(self.prices[["BBB", "AAA",
+                                                         "CCC"]]))
+
+    def test_does_not_match_revised_prices(self):
+        # GIVEN: mesma grade de datas, ultima barra corrigida
+        prices = self.prices.copy()
+        prices.iloc[-1] = prices.iloc[-1] * 1.03
+
+        # THEN
+        self.assertFalse(self.index.matches(prices))
+
+    def test_does_not_match_prices_with_gaps(self):
+        prices = self.prices.copy()
+        prices.iloc[20, 1] = np.nan
+        index = ReturnsStatsIndex.from_prices(prices)
+
+        self.assertFalse(index.matches(prices))
+
+    def test_calculate_falls_back_when_index_does_not_match(self):
+        with_gaps = self.prices.copy()
+        with_gaps.iloc[[5, 17, 33], 1] = np.nan
+        for prices in [self.prices.drop(self.prices.index[::10]),
+                       with_gaps]:
+            # WHEN
+            with_index = calculate(prices, list(prices.columns),
+                                   method="optimizer", plot=False,
+                                   stats_index=self.index)
+            without_index = calculate(prices, list(prices.columns),
+                                      method="optimizer", plot=False)
+
+            # THEN
+            self.assertEqual(with_index, without_index)
+
+
+class TestLoadOrBuildStatsIndex(unittest.TestCase):
+    def test_filename_depends_on_load_policy(self):
+        tickers = ["AAA", "BBB"]
+        names = {stats_index_filename("cache", tickers),
+                 stats_index_filename("cache", tickers, join_how="outer"),
+                 stats_index_filename("cache", tickers, source="file"),
+                 stats_index_filename("cache", tickers, min_coverage=0.8)}
+        self.assertEqual(len(names), 4)
+
+    def test_reuses_and_extends_saved_index(self):
+        prices = synthetic_close_prices(60, TICKERS, mean=0.001,
+                                        vol=0.02)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = stats_index_filename(tmp_dir, list(prices.columns))
+            load_or_build_stats_index(prices.iloc[:40], filename)
+
+            # WHEN: uma data inicial posterior e mais datas no fim
+            index = load_or_build_stats_index(prices.iloc[10:], filename)
+
+            # THEN
+            self.assertEqual(len(index), len(prices) - 1)
+            mean, cov = index.stats(prices.index[11], prices.index[-1])
+            returns = prices.iloc[10:].pct_change()
+            np.testing.assert_allclose(cov, returns.cov(), atol=1e-15)
+            self.assertEqual(len(ReturnsStatsIndex.load(filename)),
+                             len(prices) - 1)
+
+    def test_rebuilds_when_known_bar_was_revised(self):
+        # GIVEN: indice salvo com a ultima barra parcial, 3% fora
+        prices = synthetic_close_prices(60, TICKERS, mean=0.001,
+                                        vol=0.02)
+        partial = prices.iloc[:40].copy()
+        partial.iloc[-1] = partial.iloc[-1] * 1.03
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = stats_index_filename(tmp_dir, list(prices.columns))
+            load_or_build_stats_index(partial, filename)
+
+            # WHEN: barra corrigida e mais 20 datas
+            index = load_or_build_stats_index(prices, filename)
+
+        # THEN
+        mean, cov = index.stats()
+        returns = prices.pct_change()
+        np.testing.assert_allclose(mean, returns.mean(), atol=1e-15)
+        np.testing.assert_allclose(cov, returns.cov(), atol=1e-15)
+
+
+class TestRollingStats(unittest.TestCase):
+    def test_sliding_window_matches_rescan(self):
+        # GIVEN
+        prices = synthetic_close_prices(60, TICKERS, mean=0.001,
+                                        vol=0.02)
+        returns = prices.pct_change().iloc[1:]
+        window = RollingStats(returns.to_numpy())
+
+        for first, last in [(0, 20), (5, 30), (12, 50), (52, 59)]:
+            # WHEN
+            mean, cov = window.move(first, last).stats()
+
+            # THEN
+            expected = returns.iloc[first:last]
+            np.testing.assert_allclose(mean, expected.mean(), atol=1e-15)
+            np.testing.assert_allclose(cov, expected.cov(), atol=1e-15)
+
+    def test_window_cannot_move_backwards(self):
+        window = RollingStats(np.zeros((10, 2))).move(5, 8)
+        with self.assertRaises(ValueError):
+            window.move(4, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from datetime import date
+from core.cdataframe import CDataFramesJoined
+from core.data_service import DataService, DataServiceParams
+from core.synthetic import (synthetic_close_prices, synthetic_yahoo_frame,
+                            YAHOO_FIELDS)
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_synthetic_frame_shape(self):
+        frame = synthetic_yahoo_frame(num_tickers=3, num_days=20)
+
+        self.assertEqual(frame.shape, (20, 3 * len(YAHOO_FIELDS)))
+        self.assertEqual(list(frame.columns.levels[0]), YAHOO_FIELDS)
+        self.assertTrue((frame["High"] >= frame["Low"]).all().all())
+
+    def test_synthetic_close_prices(self):
+        prices = synthetic_close_prices(30, 3, seed=1)
+
+        self.assertEqual(list(prices.columns), ["T0", "T1", "T2"])
+        self.assertEqual(prices.index.name, "Date")
+        self.assertTrue(prices.equals(synthetic_close_prices(30, 3, seed=1)))
+
+    def test_data_service_loads_synthetic_frame(self):
+        # GIVEN
+        frame = synthetic_yahoo_frame(num_tickers=4, num_days=50)
+        tickers = list(frame["Close"].columns)
+        params = DataServiceParams(tickers=tickers, start_date=date.today())
+        data_service = DataService(params=params)
+        data_service.build_callbacks(data_reader_func=lambda t, s: frame)
+
+        # WHEN
+        data_service.load()
+
+        # THEN
+        joined = CDataFramesJoined(data_service.cdataframes).join()
+        self.assertEqual(joined.shape, (50, 4))
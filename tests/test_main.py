@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = ["matplotlib", "yfinance", "pandas_datareader"]
+
+
+def imported_modules(code):
+    script = f"{code}\nimport sys\nprint(' '.join(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script],
+                            capture_output=True, text=True, check=True)
+    return set(output.stdout.split())
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_cli_does_not_import_heavy_modules(self):
+        modules = imported_modules("import main")
+        for module in HEAVY_MODULES + ["pandas", "numpy", "core.markowitz"]:
+            self.assertNotIn(module, modules)
+
+    def test_markowitz_loads_plot_and_yahoo_lazily(self):
+        modules = imported_modules("import core.markowitz")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_data_service_loads_yahoo_lazily(self):
+        modules = imported_modules("import core.data_service")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_help_runs(self):
+        output = subprocess.run([sys.executable, "main.py", "--help"],
+                                capture_output=True, text=True)
+        self.assertEqual(output.returncode, 0)
+        self.assertIn("markowitz", output.stdout)